@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so session/auth queries are counted too; see api/instrumentation.py
+    'api.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,7 +44,7 @@ ROOT_URLCONF = 'advanced_api_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'api.instrumentation.TimedDjangoTemplates',  # DjangoTemplates, timed for Server-Timing
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +69,28 @@ DATABASES = {
     }
 }
 
+# Cache
+# Local-memory by default; point API_RESPONSE_CACHE['ALIAS'] at a shared backend in production
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'advanced-api-project',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Read-through cache for BookListView/BookDetailView responses (see api/cache.py)
+API_RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,  # Seconds; writes invalidate immediately via generation bumps
+}
+
+# Batch sizes for /api/books/bulk/ (see api/serializers.py)
+API_BULK = {
+    'BATCH_SIZE': 500,  # Rows per INSERT/UPDATE statement
+    'MAX_ITEMS': 10000,  # Largest list accepted in one request
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,4 +133,6 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',  # Enable text-based search
         'rest_framework.filters.OrderingFilter',  # Enable ordering by fields
     ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',  # Index-friendly cursor paging
+    'PAGE_SIZE': 50,
 }
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Async (ASGI) versions of the read-only Book endpoints.
+
+    GET /api/async/books/          AsyncBookListView    (same as BookListView)
+    GET /api/async/books/<id>/     AsyncBookDetailView  (same as BookDetailView)
+    GET /api/async/books/export/   AsyncBookExportView  (same as BookExportView)
+
+Each one answers like its sync counterpart: the same filters, search,
+ordering, cursors, JSON, ETags and response cache (keyed on its own URL).
+The database is only reached through the async ORM (afirst, aget,
+aiterator, async for), so under an ASGI server (advanced_api_project/asgi.py)
+a request waiting on the database does not hold a server worker thread.
+Django still runs every query in a thread (sync_to_async, one per request),
+so a single query costs the same as before; what changes is how many
+requests can be in flight at once. `benchmark_asgi` measures both deployments.
+
+DRF views are sync only, so these are plain Django async views: there is no
+authentication (the endpoints are AllowAny), only JSON is rendered, and DRF
+errors such as bad filters or cursors are sent with the body DRF would send.
+"""
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from rest_framework.exceptions import APIException, NotAcceptable, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache import acount, aget_generation, get_cache, get_config, make_cache_key
+from .conditional import aget_catalog_version, make_etag
+from .models import Book
+from .renderers import NDJSONRenderer
+from .search import aget_search_backend
+from .serializers import BookSerializer, get_values_serializer
+from .views import BookExportView, BookListView
+
+
+# ===============================
+# ASYNC BASE VIEW
+# ===============================
+class AsyncAPIView(View):
+    """
+    Async JSON view. Subclasses implement `async get_data(request, ...)`, where
+    `request` is a DRF Request (for query_params) that is never authenticated.
+    """
+    renderer = JSONRenderer()
+    media_type = 'application/json'
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            return await self.respond(Request(request), *args, **kwargs)
+        except APIException as exc:
+            # What rest_framework.views.exception_handler would send
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(data, status=exc.status_code)
+
+    async def respond(self, request, *args, **kwargs):
+        return self.render(await self.get_data(request, *args, **kwargs))
+
+    async def get_data(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def render(self, data, status=200):
+        return HttpResponse(self.renderer.render(data, self.media_type), content_type=self.media_type, status=status)
+
+
+class AsyncConditionalCachedMixin:
+    """
+    ConditionalGetMixin and CachedResponseMixin for AsyncAPIView: a 304 when
+    the validators match, else the cached data, else get_data(). Views
+    implement `async get_validators(request, ...) -> (etag_parts, last_modified)`.
+    """
+    cache_namespace = 'books'
+
+    async def respond(self, request, *args, **kwargs):
+        etag_parts, last_modified = await self.get_validators(request, *args, **kwargs)
+        # Same representation key as the sync views' JSON responses, so the ETags match theirs
+        etag = make_etag(*etag_parts, self.media_type) if etag_parts else None
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await self.cached_response(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag:
+                response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    async def get_validators(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    async def cached_response(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = make_cache_key(request, self.cache_namespace, await aget_generation())
+        data = await cache.aget(key)
+        if data is not None:
+            await acount('hits')
+            response = self.render(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        await acount('misses')
+        data = await self.get_data(request, *args, **kwargs)
+        await cache.aset(key, data, get_config()['TIMEOUT'])
+        response = self.render(data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+# ===============================
+# ASYNC BOOK LIST VIEW
+# ===============================
+class AsyncBookListView(AsyncConditionalCachedMixin, AsyncAPIView):
+    """
+    GET /api/async/books/
+    BookListView on the async ORM. Filtering, search, ordering and cursor
+    pagination are BookListView's own; only the page is fetched here.
+    """
+    list_view_class = BookListView
+    # The catalog version once per write and the page
+    query_budget = 2
+
+    async def get_validators(self, request, *args, **kwargs):
+        return await aget_catalog_version(), None
+
+    async def get_data(self, request, *args, **kwargs):
+        view = self.list_view_class(request=request, args=args, kwargs=kwargs, format_kwarg=None)
+        await aget_search_backend()  # so BookSearchFilter finds it resolved
+        serializer, queryset, extra = view.get_values_queryset()
+        page = await view.paginator.apaginate_queryset(queryset, request, view=view)
+        if page is None:
+            return view.serialize_rows(serializer, [row async for row in queryset], extra)
+        return view.paginator.get_paginated_data(view.serialize_rows(serializer, page, extra))
+
+
+# ===============================
+# ASYNC BOOK DETAIL VIEW
+# ===============================
+class AsyncBookDetailView(AsyncConditionalCachedMixin, AsyncAPIView):
+    """
+    GET /api/async/books/<id>/
+    BookDetailView on the async ORM; the book is read as a values() row.
+    """
+    # updated_at for the validators, then the row
+    query_budget = 2
+
+    async def get_validators(self, request, pk):
+        updated_at = await Book.objects.filter(pk=pk).values_list('updated_at', flat=True).afirst()
+        if updated_at is None:
+            return None, None
+        return (pk, updated_at), updated_at
+
+    async def get_data(self, request, pk):
+        serializer = get_values_serializer(BookSerializer)
+        try:
+            row = await Book.objects.values(*serializer.columns).aget(pk=pk)
+        except Book.DoesNotExist:
+            raise NotFound(f'No {Book._meta.object_name} matches the given query.')
+        return serializer.to_representation([row])[0]
+
+
+# ===============================
+# ASYNC BOOK EXPORT VIEW
+# ===============================
+class AsyncBookExportView(AsyncAPIView):
+    """
+    GET /api/async/books/export/
+    BookExportView streamed from an async generator over values().aiterator().
+    Same ?format= / Accept negotiation: NDJSON by default, or a JSON array.
+    """
+    fields = BookExportView.fields
+    chunk_size = BookExportView.chunk_size
+    formats = {NDJSONRenderer.format: NDJSONRenderer.media_type, 'json': 'application/json'}
+
+    async def respond(self, request, *args, **kwargs):
+        export_format = self.get_format(request)
+        rows = Book.objects.order_by('pk').values(*self.fields).aiterator(chunk_size=self.chunk_size)
+        if export_format == 'json':
+            stream = self.stream_json_array(rows)
+        else:
+            stream = self.stream_ndjson(rows)
+        response = StreamingHttpResponse(stream, content_type=f'{self.formats[export_format]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
+
+    def get_format(self, request):
+        requested = request.query_params.get('format')
+        if requested:
+            if requested not in self.formats:
+                raise NotFound()
+            return requested
+        media_type = request._request.get_preferred_type(list(self.formats.values()))
+        if media_type is None:
+            raise NotAcceptable()
+        return next(name for name, value in self.formats.items() if value == media_type)
+
+    async def encode_chunks(self, rows, separator):
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        chunk = []
+        async for row in rows:
+            chunk.append(dumps(row))
+            if len(chunk) >= self.chunk_size:
+                yield separator.join(chunk)
+                chunk = []
+        if chunk:
+            yield separator.join(chunk)
+
+    async def stream_ndjson(self, rows):
+        async for chunk in self.encode_chunks(rows, '\n'):
+            yield chunk + '\n'
+
+    async def stream_json_array(self, rows):
+        yield '['
+        first = True
+        async for chunk in self.encode_chunks(rows, ','):
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
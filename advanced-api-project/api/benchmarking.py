@@ -0,0 +1,353 @@
+"""
+Throughput/latency harness used by the `benchmark_api` and `benchmark_asgi`
+management commands.
+
+Requests are sent through two drivers:
+
+* `client`: django.test.Client, in process, no sockets. This measures the
+  view stack alone.
+* `wsgi`: a threaded WSGI server (the one runserver uses) on a free local
+  port, hit over HTTP with http.client. This adds request parsing, the
+  WSGI layer and the socket round trip.
+
+Query counts come from the Server-Timing header written by
+api.instrumentation.RequestMetricsMiddleware, so both drivers report them.
+
+Results are plain JSON: one entry per (scenario, driver), with p50/p99/mean
+latency in ms, requests/sec, rows/sec and queries per request. A later run
+can be compared against a saved file with `compare_results`.
+
+`benchmark_asgi` instead starts real servers (gunicorn for WSGI, uvicorn for
+ASGI) as subprocesses (`ServerProcess`) and drives them with `run_load`:
+many concurrent asyncio clients, one connection per request.
+"""
+import asyncio
+import http.client
+import json
+import math
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.utils import timezone
+
+from .models import Author, Book
+from .search import get_search_backend
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class Scenario:
+    """
+    One endpoint to benchmark. `request(n)` returns (method, path, body) for
+    the n-th iteration, so scenarios can walk ids or vary filters.
+    `rows(payload)` counts the rows a response carried.
+    """
+
+    def __init__(self, name, request, rows=None, expected_status=200):
+        self.name = name
+        self.request = request
+        self.rows = rows or count_rows
+        self.expected_status = expected_status
+
+
+def count_rows(payload):
+    if isinstance(payload, dict) and isinstance(payload.get('results'), list):
+        return len(payload['results'])
+    if isinstance(payload, list):
+        return len(payload)
+    return 1
+
+
+@contextmanager
+def benchmark_database(path, keepdb):
+    """Run the block against a fresh (or, with keepdb, reused) SQLite test database at `path`."""
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def seed_catalog(count):
+    """
+    Fill the database with `count` books (one author per ten) unless it
+    already holds exactly that many. Returns True if it seeded.
+    """
+    if Book.objects.count() == count and Author.objects.exists():
+        return False
+    qn = connection.ops.quote_name
+    authors = max(count // 10, 1)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {qn(Book._meta.db_table)}')
+        cursor.execute(f'DELETE FROM {qn(Author._meta.db_table)}')
+        # Plain executemany: an order of magnitude faster than bulk_create at 1M rows.
+        cursor.executemany(
+            f'INSERT INTO {qn(Author._meta.db_table)} (id, name, updated_at) VALUES (%s, %s, %s)',
+            [(i, f'Author {i:07d}', now) for i in range(1, authors + 1)],
+        )
+        for start in range(0, count, 50_000):
+            cursor.executemany(
+                f'INSERT INTO {qn(Book._meta.db_table)} (id, title, publication_year, author_id, search_text, updated_at) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    (i, f'Book {i:07d}', 1900 + i % 125, i % authors + 1,
+                     f'book {i:07d} author {i % authors + 1:07d}', now)
+                    for i in range(start + 1, min(start + 50_000, count) + 1)
+                ],
+            )
+        get_search_backend().rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return True
+
+
+def make_client(headers):
+    # SERVER_NAME: outside the test runner ALLOWED_HOSTS does not include 'testserver'.
+    return Client(headers={'Accept': 'application/json', **headers}, SERVER_NAME='localhost')
+
+
+class ClientDriver:
+    name = 'client'
+
+    def __init__(self, headers):
+        self.client = make_client(headers)
+
+    def send(self, method, path, body):
+        kwargs = {'content_type': 'application/json', 'data': json.dumps(body)} if body is not None else {}
+        response = getattr(self.client, method.lower())(path, **kwargs)
+        return response.status_code, response.content, response.get('Server-Timing', '')
+
+    def close(self):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGIDriver:
+    name = 'wsgi'
+
+    def __init__(self, headers):
+        self.headers = {'Accept': 'application/json', **headers}
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        self.server.set_app(WSGIHandler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1])
+
+    def send(self, method, path, body):
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        # The runserver handler closes after every response
+        self.connection.close()
+        return response.status, content, response.getheader('Server-Timing', '')
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        connections.close_all()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """
+    An HTTP server started as a subprocess (`command` is its argv), with
+    start() returning once it accepts connections on 127.0.0.1:`port`.
+    """
+
+    def __init__(self, name, command, port, env=None, cwd=None, startup_timeout=30):
+        self.name = name
+        self.command = command
+        self.port = port
+        self.env = env
+        self.cwd = cwd
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.log = None
+
+    def start(self):
+        # A file, not a pipe: a full pipe would block a chatty server mid-benchmark
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            self.command, env=self.env, cwd=self.cwd, stdout=subprocess.DEVNULL, stderr=self.log,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                self.log.seek(0)
+                raise RuntimeError(f'{self.name} exited on startup: {self.log.read().decode()[-2000:]}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f'{self.name} did not start listening on port {self.port}')
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.log:
+            self.log.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+async def fetch(port, path, timeout):
+    """One HTTP/1.1 GET on a new connection; returns the status code."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: application/json\r\n'
+            'Connection: close\r\n\r\n'.encode('ascii')
+        )
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+
+
+async def _load(port, path_for, clients, requests, timeout):
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for n in remaining:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path_for(n), timeout)
+            except (OSError, asyncio.TimeoutError):
+                status = 0
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_load(port, path_for, clients, requests, timeout=30):
+    """
+    Send `requests` GETs (the n-th to `path_for(n)`) from `clients` concurrent
+    connections and return throughput and latency. Anything but a 200, a
+    refused connection or a timeout counts as an error.
+    """
+    latencies, errors, elapsed = asyncio.run(_load(port, path_for, clients, requests, timeout))
+    result = {'requests': requests, 'clients': clients, 'errors': errors}
+    if latencies:
+        result.update({
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+            'requests_per_sec': round(len(latencies) / elapsed, 1),
+        })
+    return result
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def run_scenario(driver, scenario, requests, warmup):
+    latencies, queries, rows = [], [], 0
+    for n in range(warmup + requests):
+        method, path, body = scenario.request(n)
+        started = time.perf_counter()
+        status, content, timing = driver.send(method, path, body)
+        elapsed = time.perf_counter() - started
+        if status != scenario.expected_status:
+            raise RuntimeError(f'{scenario.name}: {method} {path} returned {status}: {content[:200]!r}')
+        if n < warmup:
+            continue
+        latencies.append(elapsed)
+        match = QUERIES_RE.search(timing)
+        if match:
+            queries.append(int(match.group(1)))
+        rows += scenario.rows(json.loads(content)) if content else 0
+    total = sum(latencies)
+    return {
+        'scenario': scenario.name,
+        'driver': driver.name,
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'requests_per_sec': round(requests / total, 1),
+        'rows_per_sec': round(rows / total, 1),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connections['default'].vendor,
+        'platform': platform.platform(),
+    }
+
+
+def compare_results(current, baseline, tolerance):
+    """
+    Return a message for every (scenario, driver) whose p50 grew by more than
+    `tolerance` (0.2 = 20%) or that now runs more queries per request.
+    """
+    previous = {(r['scenario'], r['driver']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['scenario'], result['driver']))
+        if before is None:
+            continue
+        if result['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']} [{result['driver']}]: p50 {before['p50_ms']} -> {result['p50_ms']} ms"
+            )
+        if (result['queries_per_request'] or 0) > (before['queries_per_request'] or 0):
+            regressions.append(
+                f"{result['scenario']} [{result['driver']}]: queries/request "
+                f"{before['queries_per_request']} -> {result['queries_per_request']}"
+            )
+    return regressions
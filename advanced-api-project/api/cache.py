@@ -0,0 +1,194 @@
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+# ===============================
+# RESPONSE CACHE SETTINGS
+# ===============================
+# API_RESPONSE_CACHE = {'ALIAS': 'default', 'TIMEOUT': 300} in settings.py.
+# ALIAS picks any backend from CACHES, so locmem can be swapped for Redis/Memcached.
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'api-response',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def _key(*parts):
+    return ':'.join([get_config()['KEY_PREFIX'], *map(str, parts)])
+
+
+# ===============================
+# GENERATION-BASED INVALIDATION
+# ===============================
+# Every cached response key embeds the current generation. Writes bump the
+# generation instead of hunting down keys, so old entries simply stop being
+# read and age out via TIMEOUT.
+
+def get_generation():
+    cache = get_cache()
+    key = _key('generation')
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock: if the counter is ever evicted, the new value
+        # can never collide with a generation that already has entries.
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+async def aget_generation():
+    cache = get_cache()
+    key = _key('generation')
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached API response. Called on Book/Author writes."""
+    cache = get_cache()
+    key = _key('generation')
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key)
+
+
+def get_for_generation(name, compute):
+    """
+    Return compute() cached under the current generation, so it is recomputed
+    once after every Book/Author write rather than once per request.
+    """
+    cache = get_cache()
+    key = _key(name, get_generation())
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, get_config()['TIMEOUT'])
+    return value
+
+
+async def aget_for_generation(name, compute):
+    """get_for_generation for async views; compute() is sync and runs in a thread on a miss."""
+    cache = get_cache()
+    key = _key(name, await aget_generation())
+    value = await cache.aget(key)
+    if value is None:
+        value = await sync_to_async(compute)()
+        await cache.aset(key, value, get_config()['TIMEOUT'])
+    return value
+
+
+def invalidate(using=None):
+    """
+    Bump once right away so readers stop using the old entries, and again on
+    commit so nothing cached from pre-commit data during the write survives.
+    Writes that bypass model signals (bulk_create/bulk_update) call this directly.
+    """
+    bump_generation()
+    transaction.on_commit(bump_generation, using=using)
+
+
+# ===============================
+# HIT / MISS COUNTERS
+# ===============================
+def _count(name):
+    cache = get_cache()
+    key = _key('stats', name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def acount(name):
+    """_count for async views."""
+    cache = get_cache()
+    key = _key('stats', name)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(_key('stats', 'hits'), 0)
+    misses = cache.get(_key('stats', 'misses'), 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+        'generation': get_generation(),
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([_key('stats', 'hits'), _key('stats', 'misses')])
+
+
+# ===============================
+# READ-THROUGH VIEW MIXIN
+# ===============================
+def make_cache_key(request, namespace, generation=None):
+    """
+    Key on host + path + the query string normalized by sorting parameters
+    and their values, so `?b=2&a=1` and `?a=1&b=2` share one entry.
+    Async callers pass the generation they read with aget_generation().
+    """
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    ))
+    if generation is None:
+        generation = get_generation()
+    return _key(namespace, generation, request.get_host(), request.path, query)
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for GET responses of read-only views.
+    Only successful responses are stored; the serialized `response.data` is
+    cached so filtering, ordering and serialization are skipped on a hit.
+    Responses carry `X-Cache: HIT` or `X-Cache: MISS`.
+    """
+    cache_namespace = 'books'
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = make_cache_key(request, self.cache_namespace)
+        data = cache.get(key)
+        if data is not None:
+            _count('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count('misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, get_config()['TIMEOUT'])
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,85 @@
+"""
+Conditional GET (ETag / Last-Modified) for the read endpoints.
+
+Polling clients send back the validators from their last response in
+If-None-Match / If-Modified-Since. When nothing changed, the view answers
+304 Not Modified right after authentication and content negotiation,
+before the response cache, the queryset or any serializer runs.
+
+Validators come from Book.updated_at:
+
+* book detail: the book's updated_at (ETag and Last-Modified), one query;
+* book list: book count and MAX(updated_at) over the whole table (ETag
+  only, since a delete does not move MAX(updated_at)). One query, cached per
+  response cache generation (api/cache.py), so a warm 304 runs none.
+
+Author renames change ?author__name= and ?search= results, so they bump the
+updated_at of the author's books (api.search.refresh_search_text).
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import aget_for_generation, get_for_generation
+from .models import Book
+
+
+def make_etag(*parts):
+    return '"{}"'.format(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GETs with 304 before the view does any work.
+    Views implement get_validators() -> (etag_parts, last_modified); either
+    may be None, e.g. when the object does not exist and the view should 404.
+    """
+
+    def get(self, request, *args, **kwargs):
+        etag_parts, last_modified = self.get_validators(request, *args, **kwargs)
+        etag = make_etag(*etag_parts, *self.get_representation_key(request)) if etag_parts else None
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag:
+                response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_validators(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get_representation_key(self, request):
+        # JSON and the browsable API differ for one URL; the latter also embeds the
+        # user and a CSRF token. Both come from headers already parsed, no queries.
+        key = [request.accepted_media_type]
+        if request.accepted_renderer.format == 'api':
+            key += [request.COOKIES.get(settings.SESSION_COOKIE_NAME), request.COOKIES.get(settings.CSRF_COOKIE_NAME)]
+        return key
+
+
+def compute_catalog_version():
+    # Two scalar subqueries, not aggregate(Count, Max): together in one SELECT they
+    # force a full scan, while apart COUNT(*) is a b-tree count and MAX a single
+    # probe of api_book_updated_at_idx. The raw value is only hashed into the ETag.
+    connection = connections[router.db_for_read(Book)]
+    table = connection.ops.quote_name(Book._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT (SELECT COUNT(*) FROM {table}), (SELECT MAX(updated_at) FROM {table})')
+        return tuple(cursor.fetchone())
+
+
+def get_catalog_version():
+    """(book count, latest Book.updated_at) in one query, cached until the next write."""
+    return get_for_generation('catalog-version', compute_catalog_version)
+
+
+async def aget_catalog_version():
+    """get_catalog_version for async views; shares its cache entry, so also its ETags."""
+    return await aget_for_generation('catalog-version', compute_catalog_version)
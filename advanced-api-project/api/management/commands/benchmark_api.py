@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from api.benchmarking import (
+    ClientDriver, Scenario, WSGIDriver, benchmark_database, compare_results, environment, make_client, run_scenario,
+    seed_catalog,
+)
+from api.models import Author, Book
+
+DRIVERS = {'client': ClientDriver, 'wsgi': WSGIDriver}
+CREATED_TITLE = 'Benchmark create'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the book API (list with filters/search/ordering, detail, create, update) through the '
+        'Django test client and an in-process WSGI server. Seeds a separate SQLite database, reports '
+        'p50/p99 latency, queries per request and rows/sec, and can save or compare JSON results.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10_000, help='Books to seed (authors = books / 10).')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario and driver.')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests before each run.')
+        parser.add_argument('--drivers', default='client,wsgi', help='Comma-separated: client, wsgi.')
+        parser.add_argument('--scenario', action='append', default=[], help='Only run scenarios containing this text.')
+        parser.add_argument(
+            '--database', default=os.path.join(tempfile.gettempdir(), 'advanced_api_benchmark.sqlite3'),
+            help='SQLite file to seed (never the project database).',
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the seeded database between runs.')
+        parser.add_argument('--with-response-cache', action='store_true', help='Leave the API response cache on.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Fail if results regress against this JSON file.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p50 slowdown vs the baseline.')
+
+    def handle(self, *args, **options):
+        drivers = [name.strip() for name in options['drivers'].split(',') if name.strip()]
+        unknown = set(drivers) - set(DRIVERS)
+        if unknown:
+            raise CommandError(f'Unknown drivers: {", ".join(sorted(unknown))}')
+        if connection.vendor != 'sqlite':
+            raise CommandError('benchmark_api seeds a SQLite database; the default database must be SQLite.')
+
+        with benchmark_database(options['database'], options['keepdb']):
+            with self.response_cache(options['with_response_cache']):
+                results = self.benchmark(options, drivers)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                regressions = compare_results(results, json.load(fh), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def response_cache(self, enabled):
+        if enabled:
+            return override_settings()
+        # Point the response cache at a dummy backend so every request reaches the database.
+        return override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'benchmark-off': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            },
+            API_RESPONSE_CACHE={'ALIAS': 'benchmark-off'},
+        )
+
+    def benchmark(self, options, drivers):
+        self.seed(options['books'])
+        user, _ = User.objects.get_or_create(username='benchmark')
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+
+        scenarios = [
+            scenario for scenario in self.scenarios(headers)
+            if not options['scenario'] or any(text in scenario.name for text in options['scenario'])
+        ]
+        results = []
+        for driver_name in drivers:
+            driver = DRIVERS[driver_name](headers)
+            try:
+                for scenario in scenarios:
+                    result = run_scenario(driver, scenario, options['requests'], options['warmup'])
+                    results.append(result)
+                    self.report(result)
+            finally:
+                driver.close()
+        Book.objects.filter(title__startswith=CREATED_TITLE).delete()
+        return {'books': options['books'], 'environment': environment(), 'results': results}
+
+    def seed(self, count):
+        if seed_catalog(count):
+            self.stdout.write(f'Seeded {count} books.')
+
+    def scenarios(self, headers):
+        count = Book.objects.count()
+        authors = Author.objects.count()
+
+        def book_id(n):
+            # Spread lookups over the table instead of re-reading one hot row.
+            return (n * 7919) % count + 1
+
+        next_page = json.loads(make_client(headers).get('/api/books/').content)['next']
+        next_path = next_page[next_page.index('/api/'):] if next_page else '/api/books/'
+
+        return [
+            Scenario('books: list', lambda n: ('GET', '/api/books/', None)),
+            Scenario('books: second page', lambda n: ('GET', next_path, None)),
+            Scenario('books: ?title=', lambda n: ('GET', f'/api/books/?title=Book%20{book_id(n):07d}', None)),
+            Scenario(
+                'books: ?author__name=',
+                lambda n: ('GET', f'/api/books/?author__name=Author%20{n % authors + 1:07d}', None),
+            ),
+            Scenario(
+                'books: ?publication_year=',
+                lambda n: ('GET', f'/api/books/?publication_year={1900 + n % 125}', None),
+            ),
+            Scenario('books: ?search=', lambda n: ('GET', f'/api/books/?search={book_id(n):07d}', None)),
+            Scenario('books: ?ordering=-publication_year', lambda n: ('GET', '/api/books/?ordering=-publication_year', None)),
+            Scenario('books: detail', lambda n: ('GET', f'/api/books/{book_id(n)}/', None)),
+            Scenario(
+                'books: create',
+                lambda n: ('POST', '/api/books/create/',
+                           {'title': f'{CREATED_TITLE} {n}', 'publication_year': 2000, 'author': n % authors + 1}),
+                expected_status=201,
+            ),
+            Scenario(
+                'books: update',
+                lambda n: ('PUT', f'/api/books/{book_id(n)}/update/',
+                           {'title': f'Book {book_id(n):07d}', 'publication_year': 1900 + book_id(n) % 125,
+                            'author': book_id(n) % authors + 1}),
+            ),
+        ]
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['scenario']:<36} {result['driver']:<6} "
+            f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+            f"{result['requests_per_sec']:8.1f} req/s  {result['rows_per_sec']:10.1f} rows/s  "
+            f"{result['queries_per_request']} queries/req"
+        )
@@ -0,0 +1,145 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmarking import ServerProcess, benchmark_database, environment, free_port, run_load, seed_catalog
+from api.models import Book
+
+SERVERS = {'wsgi': 'gunicorn', 'asgi': 'uvicorn'}
+VIEWS = {'sync': '/api/books/', 'async': '/api/async/books/'}
+
+SETTINGS_TEMPLATE = '''\
+from advanced_api_project.settings import *
+
+DEBUG = False
+ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+DATABASES['default']['NAME'] = {database!r}
+{cache}
+LOGGING = {{
+    'version': 1,
+    'disable_existing_loggers': False,
+    'loggers': {{'api.instrumentation': {{'level': 'ERROR'}}}},
+}}
+'''
+CACHE_OFF = '''\
+# Every request reaches the database
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput of the read-only book endpoints under a WSGI deployment (gunicorn, gthread '
+        'workers) and an ASGI deployment (uvicorn), for the sync views (/api/books/) and the async views '
+        '(/api/async/books/), with many concurrent clients. Seeds a separate SQLite database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10_000, help='Books to seed (authors = books / 10).')
+        parser.add_argument('--clients', type=int, default=1000, help='Concurrent client connections.')
+        parser.add_argument('--requests', type=int, default=5000, help='Timed requests per run.')
+        parser.add_argument('--warmup', type=int, default=100, help='Untimed requests before each run.')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds before a request counts as an error.')
+        parser.add_argument('--workers', type=int, default=1, help='Server processes per deployment.')
+        parser.add_argument('--threads', type=int, default=32, help='Threads per gunicorn worker.')
+        parser.add_argument('--deployments', default='wsgi,asgi', help='Comma-separated: wsgi, asgi.')
+        parser.add_argument('--views', default='sync,async', help='Comma-separated: sync, async.')
+        parser.add_argument('--scenario', action='append', default=[], help='Only run scenarios containing this text.')
+        parser.add_argument(
+            '--database', default=os.path.join(tempfile.gettempdir(), 'advanced_api_benchmark.sqlite3'),
+            help='SQLite file to seed (never the project database).',
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the seeded database between runs.')
+        parser.add_argument('--with-response-cache', action='store_true', help='Leave the API response cache on.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        deployments = self.choices(options['deployments'], SERVERS, 'deployments')
+        views = self.choices(options['views'], VIEWS, 'views')
+        missing = [SERVERS[name] for name in deployments if importlib.util.find_spec(SERVERS[name]) is None]
+        if missing:
+            raise CommandError(f'Install {" and ".join(missing)} to benchmark this deployment.')
+        if connection.vendor != 'sqlite':
+            raise CommandError('benchmark_asgi seeds a SQLite database; the default database must be SQLite.')
+
+        with benchmark_database(options['database'], options['keepdb']):
+            if seed_catalog(options['books']):
+                self.stdout.write(f'Seeded {options["books"]} books.')
+            count = Book.objects.count()
+            connection.close()  # The servers open their own connections
+            with tempfile.TemporaryDirectory() as settings_dir:
+                with open(os.path.join(settings_dir, 'benchmark_settings.py'), 'w') as fh:
+                    fh.write(SETTINGS_TEMPLATE.format(
+                        database=options['database'], cache='' if options['with_response_cache'] else CACHE_OFF,
+                    ))
+                results = []
+                for deployment in deployments:
+                    with self.server(deployment, settings_dir, options) as server:
+                        for view in views:
+                            for scenario, path_for in self.scenarios(VIEWS[view], count):
+                                if options['scenario'] and not any(text in scenario for text in options['scenario']):
+                                    continue
+                                result = self.run(server, path_for, options)
+                                result.update({'deployment': deployment, 'views': view, 'scenario': scenario})
+                                results.append(result)
+                                self.report(result)
+
+        results = {'books': options['books'], 'environment': environment(), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def choices(self, value, known, label):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(names) - set(known)
+        if unknown:
+            raise CommandError(f'Unknown {label}: {", ".join(sorted(unknown))}')
+        return names
+
+    def server(self, deployment, settings_dir, options):
+        port = free_port()
+        if deployment == 'wsgi':
+            command = [
+                sys.executable, '-m', 'gunicorn', 'advanced_api_project.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+                '--worker-class', 'gthread', '--threads', str(options['threads']),
+                '--backlog', '2048', '--log-level', 'warning',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'uvicorn', 'advanced_api_project.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--workers', str(options['workers']),
+                '--backlog', '2048', '--no-access-log', '--log-level', 'warning',
+            ]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'benchmark_settings',
+            'PYTHONPATH': os.pathsep.join([settings_dir, str(settings.BASE_DIR)]),
+        }
+        return ServerProcess(SERVERS[deployment], command, port, env=env, cwd=settings.BASE_DIR)
+
+    def scenarios(self, prefix, count):
+        return [
+            ('list filtered by year', lambda n: f'{prefix}?publication_year={1900 + n % 125}'),
+            ('detail', lambda n: f'{prefix}{n % count + 1}/'),
+        ]
+
+    def run(self, server, path_for, options):
+        run_load(server.port, path_for, min(options['clients'], 50), options['warmup'], options['timeout'])
+        return run_load(server.port, path_for, options['clients'], options['requests'], options['timeout'])
+
+    def report(self, result):
+        line = f"{result['deployment']:<5} {result['views']:<6} {result['scenario']:<22}"
+        if 'requests_per_sec' in result:
+            line += (
+                f" {result['requests_per_sec']:>8} req/s  p50 {result['p50_ms']:>9} ms  "
+                f"p99 {result['p99_ms']:>9} ms"
+            )
+        self.stdout.write(f"{line}  errors {result['errors']}/{result['requests']}")
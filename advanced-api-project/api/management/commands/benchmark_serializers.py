@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Author, Book
+from api.serializers import BookSerializer, ValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark BookSerializer(many=True) against the values()-based fast path. '
+        'Seeds books inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path; the best is reported.')
+
+    def handle(self, *args, **options):
+        count = options['books']
+        with transaction.atomic():
+            authors = Author.objects.bulk_create(Author(name=f'Author {i}') for i in range(max(count // 10, 1)))
+            Book.objects.bulk_create(
+                (
+                    Book(title=f'Book {i:07d}', publication_year=1900 + i % 120, author=authors[i % len(authors)])
+                    for i in range(count)
+                ),
+                batch_size=1000,
+            )
+            queryset = Book.objects.order_by('title', 'id')
+            fast = ValuesSerializer(BookSerializer)
+            renderer = JSONRenderer()
+
+            def serializer_path():
+                return renderer.render(BookSerializer(queryset.all(), many=True).data)
+
+            def values_path():
+                return renderer.render(fast.to_representation(queryset.values(*fast.columns)))
+
+            if serializer_path() != values_path():
+                raise CommandError('Fast path output differs from BookSerializer output.')
+
+            for label, func in (('BookSerializer', serializer_path), ('ValuesSerializer', values_path)):
+                best = min(self.time(func) for _ in range(options['repeat']))
+                self.stdout.write(f'{label:>16}: {count / best:12,.0f} rows/sec  ({best * 1000:.1f} ms for {count} rows)')
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def time(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
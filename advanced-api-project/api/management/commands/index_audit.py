@@ -0,0 +1,89 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.views import AuthorListView, BookDetailView, BookListView
+
+# SQLite: "SCAN api_book" is a table scan; "SCAN ... USING [COVERING] INDEX" walks an index.
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING| VIRTUAL TABLE)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def view_queryset(view_class, params=None, **kwargs):
+    """The queryset `view_class` would run for GET ?params, ordered and sliced like a page."""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    view = view_class(request=request, args=(), kwargs=kwargs, format_kwarg=None)
+    queryset = view.filter_queryset(view.get_queryset())
+    if kwargs:
+        return queryset.filter(**kwargs)
+    paginator = view.paginator
+    if paginator is not None:
+        ordering = paginator.get_ordering(request, queryset, view)
+        queryset = queryset.order_by(*ordering)[:paginator.get_page_size(request) + 1]
+    return queryset
+
+
+def audited_querysets():
+    """
+    (label, queryset) for every indexed lookup the API serves, including
+    ?search= through the search index (api/search.py).
+    """
+    return [
+        ('books: default page', view_queryset(BookListView)),
+        ('books: ?title=', view_queryset(BookListView, {'title': 'Dune'})),
+        ('books: ?publication_year=', view_queryset(BookListView, {'publication_year': 1965})),
+        ('books: ?author__name=', view_queryset(BookListView, {'author__name': 'Frank Herbert'})),
+        ('books: ?ordering=publication_year', view_queryset(BookListView, {'ordering': 'publication_year'})),
+        ('books: ?ordering=-title', view_queryset(BookListView, {'ordering': '-title'})),
+        ('books: ?search=', view_queryset(BookListView, {'search': 'herbert dune'})),
+        ('book detail', view_queryset(BookDetailView, pk=1)),
+        ('authors: default page', view_queryset(AuthorListView)),
+    ]
+
+
+def full_scans(queryset):
+    """
+    Tables the planner reads in full for `queryset`, or None if the backend
+    is not supported. PostgreSQL is told to avoid sequential scans, so one
+    only shows up when no index can serve the query at all (and a handful of
+    test rows can't make a seq scan look cheaper).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        plan = queryset.explain()
+        return plan, SQLITE_SCAN.findall(plan)
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=queryset.db):
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        return plan, POSTGRES_SCAN.findall(plan)
+    return None, None
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the querysets behind the API views and fail if any of them scans a table in full. "
+        "Runs in the test suite, so a filter or ordering that loses its index breaks the build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true', help='Print every query plan.')
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in audited_querysets():
+            plan, scans = full_scans(queryset)
+            if plan is None:
+                self.stdout.write(f'Skipping index audit: {connections[queryset.db].vendor} is not supported.')
+                return
+            if options['show_plans']:
+                self.stdout.write(f'{label}:\n{plan}\n')
+            if scans:
+                failures.append(f"{label}: full scan of {', '.join(sorted(set(scans)))}")
+        if failures:
+            raise CommandError('Full table scans found:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No full table scans.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate
+from api.models import Book
+from api.search import get_search_backend, refresh_search_text
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute Book.search_text and rebuild the search index. Needed after writes that bypass '
+        'save() and the bulk serializer, such as QuerySet.update() on title or author.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Books per UPDATE batch.')
+
+    def handle(self, *args, **options):
+        refresh_search_text(Book.objects.all(), batch_size=options['batch_size'])
+        get_search_backend().rebuild()
+        invalidate()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search index for {Book.objects.count()} books.'))
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:07
+
+import unicodedata
+
+from django.db import migrations, models, transaction
+from django.db.utils import DatabaseError
+
+FTS_TABLE = 'api_book_fts'
+TRIGRAM_INDEX = 'api_book_search_text_trgm'
+
+
+def normalize_search_text(value):
+    # Frozen copy of api.models.normalize_search_text
+    decomposed = unicodedata.normalize('NFKD', value)
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return ' '.join(folded.split())
+
+
+def backfill_search_text(apps, schema_editor):
+    Book = apps.get_model('api', 'Book')
+    db = schema_editor.connection.alias
+    batch = []
+    for book in Book.objects.using(db).select_related('author').iterator(chunk_size=1000):
+        book.search_text = normalize_search_text(f'{book.title} {book.author.name}')
+        batch.append(book)
+        if len(batch) == 1000:
+            Book.objects.using(db).bulk_update(batch, ['search_text'])
+            batch = []
+    Book.objects.using(db).bulk_update(batch, ['search_text'])
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            # Needs SQLite 3.34+ for the trigram tokenizer; otherwise search scans search_text.
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(search_text, tokenize='trigram')")
+        except DatabaseError:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, search_text) SELECT id, search_text FROM api_book')
+    elif connection.vendor == 'postgresql':
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                    cursor.execute(
+                        f'CREATE INDEX {TRIGRAM_INDEX} ON api_book USING gin (search_text gin_trgm_ops)'
+                    )
+        except DatabaseError:
+            # Without the extension (or the rights to create it) search scans search_text.
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_author_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,14 +1,29 @@
+import unicodedata
+
 from django.db import models
 
+
+def normalize_search_text(value):
+    """Lowercase, strip accents and collapse whitespace: 'Café  Noir' -> 'cafe noir'."""
+    decomposed = unicodedata.normalize('NFKD', value)
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return ' '.join(folded.split())
+
+
 # Author model to store information about authors
 class Author(models.Model):
     name = models.CharField(max_length=100)  # Stores the author's name, max length of 100 characters
+    updated_at = models.DateTimeField(auto_now=True)  # Last change to the author row
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['name']  # Orders authors alphabetically by name
+        indexes = [
+            # Serves ?author__name= on books and the (name, id) keyset of the author list
+            models.Index(fields=['name', 'id'], name='api_author_name_id_idx'),
+        ]
 
 # Book model to store information about books
 class Book(models.Model):
@@ -19,10 +34,36 @@ class Book(models.Model):
         on_delete=models.CASCADE,  # Deletes books if the associated author is deleted
         related_name='books'  # Allows reverse lookup from Author to Books (e.g., author.books)
     )
+    # Normalized "title author name" that ?search= matches against (see api/search.py).
+    # Kept in sync by save(), the bulk serializer and the Author signal.
+    search_text = models.TextField(default='', editable=False)
+    # Validator for conditional GETs (see api/conditional.py). auto_now does not apply to
+    # bulk_update() or QuerySet.update(); those writers set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
+    def build_search_text(self):
+        return normalize_search_text(f'{self.title} {self.author.name}')
+
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = {'updated_at'}
+            if {'title', 'author', 'author_id'} & set(update_fields):
+                extra.add('search_text')
+            kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['title']  # Orders books alphabetically by title
+        indexes = [
+            # Keyset pagination keys: every page is a range scan on (ordering field, id)
+            models.Index(fields=['title', 'id'], name='api_book_title_id_idx'),
+            models.Index(fields=['publication_year', 'id'], name='api_book_pubyear_id_idx'),
+            # MAX(updated_at) for the list validators is a single index probe
+            models.Index(fields=['updated_at'], name='api_book_updated_at_idx'),
+        ]
 
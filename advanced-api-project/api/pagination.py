@@ -0,0 +1,267 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ===============================
+# KEYSET (CURSOR) PAGINATION
+# ===============================
+class KeysetCursorPagination(BasePagination):
+    """
+    Cursor pagination keyed on the view's ordering plus the primary key.
+
+    DRF's CursorPagination only keys on the first ordering field and falls back
+    to an OFFSET for rows sharing that value, which degrades badly when ordering
+    on a low-cardinality field such as publication_year. Here the cursor stores
+    the full (ordering values..., pk) tuple of the boundary row, so every page is
+    a `WHERE (key) > (cursor) ORDER BY key LIMIT n` query that a composite index
+    on the same columns can answer with a range scan.
+
+    The ordering comes from OrderingFilter when the view uses it (so ?ordering=
+    keeps working), otherwise from `view.ordering`, then from `ordering` below.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('pk',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views: the page is fetched with the async ORM."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request, view):
+        """The sliced queryset for the requested page, or None when paging is off."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.pk_name = queryset.model._meta.pk.attname
+        self.position, self.reverse = self.decode_cursor(request, queryset)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.build_keyset_filter(ordering, self.position))
+
+        # Fetch one extra row to know whether another page exists in this direction.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                value = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if value > 0:
+                    return min(value, self.max_page_size) if self.max_page_size else value
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the ordering as a list of field names, always ending with the pk
+        so that the key is unique and the cursor position is unambiguous.
+        """
+        ordering = None
+        ordering_filters = [
+            backend for backend in getattr(view, 'filter_backends', [])
+            if issubclass(backend, OrderingFilter)
+        ]
+        if ordering_filters:
+            ordering = ordering_filters[0]().get_ordering(request, queryset, view)
+        if not ordering:
+            ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        ordering = [self._normalize(field, queryset) for field in ordering]
+        if not any(field.lstrip('-') == 'pk' for field in ordering):
+            # The tie-breaker follows the leading direction so one index scan serves both.
+            descending = ordering[0].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def build_keyset_filter(self, ordering, position):
+        """
+        Build `(f1, f2, ..., pk) > (v1, v2, ..., id)` for a mixed-direction key
+        as an OR of prefix-equality terms. The leading field is also bounded on
+        its own so the planner can turn it into an index range.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        first = ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': position[0]}) & condition
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # A reverse walk ran past the start; resume from the top.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            # values() rows, as produced for the fast list path
+            return [
+                instance[self.pk_name if name == 'pk' else name]
+                for name in (field.lstrip('-') for field in self.ordering)
+            ]
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, instance, reverse):
+        payload = {'p': self.get_position(instance)}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':'), default=str)
+        token = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, queryset):
+        token = request.query_params.get(self.cursor_query_param)
+        if token is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            # Cursors minted under another ?ordering= cannot be reused.
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                self.get_key_field(field, queryset).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            # Keys are never null in a cursor this class minted, and None cannot be compared
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_key_field(self, field, queryset):
+        """The model (or annotation) field behind an ordering entry, to type-check cursor values."""
+        name = field.lstrip('-')
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        opts = queryset.model._meta
+        if name == 'pk':
+            return opts.pk
+        *relations, name = name.split('__')
+        try:
+            for relation in relations:
+                opts = opts.get_field(relation).related_model._meta
+            return opts.get_field(name)
+        except (FieldDoesNotExist, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_html(self):
+        return ''
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _normalize(field, queryset):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        if name == queryset.model._meta.pk.name:
+            name = 'pk'
+        return f'-{name}' if descending else name
@@ -0,0 +1,24 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+# ===============================
+# NDJSON RENDERER
+# ===============================
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON: one JSON document per line.
+    Used for content negotiation on export endpoints (?format=ndjson or
+    Accept: application/x-ndjson); large exports stream rows themselves.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+        return ''.join(json.dumps(item, separators=(',', ':')) + '\n' for item in data).encode(self.charset)
@@ -0,0 +1,188 @@
+"""
+Indexed ?search= for the Book API.
+
+SearchFilter turns `search_fields = ['title', 'author__name']` into
+`icontains` ORs across the author join, which no index can serve. Here
+every book carries `search_text`: its title and author name, lowercased and
+accent-folded (see api.models.normalize_search_text). A search matches
+books whose search_text contains every term, which is the same contract as
+before, except that accents no longer matter.
+
+Backends:
+
+* SQLiteTrigramSearchBackend mirrors search_text into the FTS5 table
+  `api_book_fts` with the trigram tokenizer, so substring matches of 3+
+  characters are index lookups. Shorter terms fall back to scanning the column.
+* ColumnSearchBackend filters search_text with LIKE '%term%'. On PostgreSQL
+  the migration puts a pg_trgm GIN index on the column, which serves exactly
+  that query. Anywhere else it is a single-table scan, but without the join.
+
+API_BOOK_SEARCH = {'BACKEND': 'dotted.path'} in settings overrides the
+automatic choice. Results are ranked by `search_rank` (see rank_queryset)
+unless the client asks for an explicit ?ordering=.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+from .models import Book, normalize_search_text
+
+FTS_TABLE = 'api_book_fts'
+TRIGRAM_LENGTH = 3
+
+_available_tables = {}
+
+
+class ColumnSearchBackend:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def filter(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(search_text__contains=term)
+        return queryset
+
+    def index(self, book_ids):
+        pass
+
+    def remove(self, book_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteTrigramSearchBackend(ColumnSearchBackend):
+    @staticmethod
+    def to_match(terms):
+        # Quote every term so user input can never be parsed as FTS5 syntax.
+        return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+    def filter(self, queryset, terms):
+        indexed = [term for term in terms if len(term) >= TRIGRAM_LENGTH]
+        if indexed:
+            queryset = queryset.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.to_match(indexed)],
+            ))
+        short = [term for term in terms if len(term) < TRIGRAM_LENGTH]
+        return super().filter(queryset, short)
+
+    def index(self, book_ids):
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        self.remove(book_ids)
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, search_text) '
+                f'SELECT id, search_text FROM {Book._meta.db_table} WHERE id IN ({placeholders})',
+                book_ids,
+            )
+
+    def remove(self, book_ids):
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', book_ids)
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, search_text) SELECT id, search_text FROM {Book._meta.db_table}'
+            )
+
+
+def get_search_backend(using=None):
+    using = using or router.db_for_read(Book)
+    connection = connections[using]
+    configured = getattr(settings, 'API_BOOK_SEARCH', {}).get('BACKEND')
+    if configured:
+        return import_string(configured)(connection)
+    if connection.vendor == 'sqlite':
+        if using not in _available_tables:
+            # The migration skips the FTS table when SQLite lacks the trigram tokenizer.
+            _available_tables[using] = FTS_TABLE in connection.introspection.table_names()
+        if _available_tables[using]:
+            return SQLiteTrigramSearchBackend(connection)
+    return ColumnSearchBackend(connection)
+
+
+async def aget_search_backend(using=None):
+    """get_search_backend for async views; the one-off table lookup runs in a thread."""
+    using = using or router.db_for_read(Book)
+    if using not in _available_tables:
+        return await sync_to_async(get_search_backend)(using)
+    return get_search_backend(using)
+
+
+def get_search_terms(value):
+    """Split ?search= like SearchFilter does, then normalize each term."""
+    terms = (normalize_search_text(term) for term in value.replace('\x00', '').replace(',', ' ').split())
+    return [term for term in terms if term]
+
+
+def rank_queryset(queryset, query):
+    """
+    Annotate `search_rank`: 0 when the title starts with the query (the
+    typeahead case), 1 when a word starts with it, 2 for any other match.
+    Only matched rows are ranked, so the CASE costs nothing on the index path.
+    """
+    return queryset.annotate(search_rank=Case(
+        When(search_text__startswith=query, then=Value(0)),
+        When(search_text__contains=f' {query}', then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    ))
+
+
+def refresh_search_text(queryset, batch_size=1000):
+    """
+    Recompute search_text for `queryset` (e.g. after an author rename) and re-index it.
+    updated_at is bumped too: ?author__name= and ?search= results change with it.
+    """
+    backend = get_search_backend(queryset.db)
+    books = queryset.select_related('author')
+    now = timezone.now()
+    batch = []
+    for book in books.iterator(chunk_size=batch_size):
+        book.search_text = book.build_search_text()
+        book.updated_at = now
+        batch.append(book)
+        if len(batch) >= batch_size:
+            Book.objects.using(queryset.db).bulk_update(batch, ['search_text', 'updated_at'])
+            backend.index(book.pk for book in batch)
+            batch = []
+    if batch:
+        Book.objects.using(queryset.db).bulk_update(batch, ['search_text', 'updated_at'])
+        backend.index(book.pk for book in batch)
+
+
+class BookSearchFilter(SearchFilter):
+    """Drop-in for SearchFilter on Book views, backed by the search index."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = get_search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+        queryset = get_search_backend(queryset.db).filter(queryset, terms)
+        return rank_queryset(queryset, ' '.join(terms))
+
+
+class RelevanceOrderingFilter(OrderingFilter):
+    """OrderingFilter whose default ordering puts the best matches first while searching."""
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        search_param = SearchFilter.search_param
+        if ordering and get_search_terms(view.request.query_params.get(search_param, '')):
+            return ('search_rank', *ordering)
+        return ordering
@@ -1,33 +1,225 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 from rest_framework import serializers
+from .cache import invalidate
+from .instrumentation import TimedListSerializer, TimedSerializerMixin, timed
 from .models import Author, Book
+from .search import get_search_backend
 from django.utils import timezone
 
+# Bulk write settings; override with API_BULK = {...} in settings.py
+BULK_DEFAULTS = {
+    'BATCH_SIZE': 500,  # Rows per INSERT/UPDATE statement
+    'MAX_ITEMS': 10000,  # Largest list accepted in one request
+}
+
+
+def get_bulk_config():
+    return {**BULK_DEFAULTS, **getattr(settings, 'API_BULK', {})}
+
+
+# Primary key field that resolves authors from a per-batch lookup when one is available
+class AuthorPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        authors = self.context.get('authors')
+        if authors is not None and not isinstance(data, bool):
+            try:
+                author = authors.get(int(data))
+            except (TypeError, ValueError):
+                author = None
+            if author is not None:
+                return author
+        # Unknown or malformed ids fall through to the regular lookup and its error messages
+        return super().to_internal_value(data)
+
+
+# List serializer used for bulk writes (BookSerializer(many=True))
+class BookListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """
+    Validates a whole batch of books with per-batch work done once:
+    - the current year for validate_publication_year is computed once
+    - all referenced authors are fetched in a single query
+    Saves with bulk_create/bulk_update in BATCH_SIZE chunks inside one transaction.
+    For updates, `instance` is a dict of {id: Book} and every item must carry its `id`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', get_bulk_config()['MAX_ITEMS'])
+        super().__init__(*args, **kwargs)
+
+    def run_validation(self, data=serializers.empty):
+        self.context['current_year'] = timezone.now().year
+        author_ids = set()
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and isinstance(item.get('author'), (int, str)):
+                    try:
+                        author_ids.add(int(item['author']))
+                    except ValueError:
+                        pass
+        self.context['authors'] = Author.objects.in_bulk(author_ids)
+        return super().run_validation(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        book = self.instance.get(data.get('id')) if isinstance(data, dict) else None
+        if book is None:
+            raise serializers.ValidationError({'id': ['No book with this id.']})
+        self.child.instance = book
+        self.child.initial_data = data
+        attrs = super().run_child_validation(data)
+        attrs['id'] = book.pk
+        return attrs
+
+    def create(self, validated_data):
+        books = [Book(**attrs) for attrs in validated_data]
+        for book in books:
+            book.search_text = book.build_search_text()
+        with transaction.atomic():
+            Book.objects.bulk_create(books, batch_size=get_bulk_config()['BATCH_SIZE'])
+            # bulk_create sends no post_save signals
+            get_search_backend().index(book.pk for book in books)
+            invalidate()
+        return books
+
+    def update(self, instance, validated_data):
+        books, fields = [], set()
+        for attrs in validated_data:
+            book = instance[attrs.pop('id')]
+            for field, value in attrs.items():
+                setattr(book, field, value)
+            fields.update(attrs)
+            books.append(book)
+        reindex = bool(fields & {'title', 'author'})
+        if reindex:
+            fields.add('search_text')
+            for book in books:
+                book.search_text = book.build_search_text()
+        if fields:
+            # bulk_update() skips auto_now
+            fields.add('updated_at')
+            now = timezone.now()
+            for book in books:
+                book.updated_at = now
+            with transaction.atomic():
+                Book.objects.bulk_update(books, sorted(fields), batch_size=get_bulk_config()['BATCH_SIZE'])
+                # bulk_update sends no post_save signals
+                if reindex:
+                    get_search_backend().index(book.pk for book in books)
+                invalidate()
+        return books
+
+
 # Serializer for the Book model
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    author = AuthorPrimaryKeyField(queryset=Author.objects.all())
+
     class Meta:
         model = Book
         fields = ['id', 'title', 'publication_year', 'author']  # Serialize all fields of the Book model
+        list_serializer_class = BookListSerializer
 
     def validate_publication_year(self, value):
         """
         Custom validation to ensure the publication year is not in the future.
+        Bulk validation computes the current year once per batch and passes it in the context.
         """
-        current_year = timezone.now().year
+        current_year = self.context.get('current_year') or timezone.now().year
         if value > current_year:
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
 
+# Mixin that lets callers trim a serializer down to a subset of its fields
+class SparseFieldsetMixin:
+    """
+    Accepts an optional `fields` keyword argument (an iterable of field names).
+    Fields not listed are dropped before serialization, so nested serializers
+    that are left out cost nothing. Unknown names are ignored.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 # Serializer for the Author model with nested BookSerializer
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     books = BookSerializer(many=True, read_only=True)  # Nested serializer to include related books
 
     class Meta:
         model = Author
         fields = ['id', 'name', 'books']  # Include author's name and related books
+        list_serializer_class = TimedListSerializer
 
     """
     The 'books' field uses the BookSerializer to dynamically serialize all books related to an author
     through the ForeignKey relationship (author.books). The 'many=True' argument indicates that
     multiple Book instances can be serialized. The 'read_only=True' ensures that books are only
     retrieved and not modified through this serializer.
-    """
\ No newline at end of file
+    """
+
+
+# Read-only fast path for large listings
+class ValuesSerializer:
+    """
+    Serializes `QuerySet.values()` rows with the same output as `serializer_class`.
+
+    Field introspection happens once, at construction: each readable field is
+    mapped to the column it reads and, only when needed, to the field's own
+    to_representation. Plain columns (ints, strings, booleans, primary keys)
+    are taken as-is, so when every field is plain the values() rows are already
+    the response and no per-row work is done at all.
+
+    Only flat model fields are supported; nested serializers, method fields and
+    dotted sources raise ImproperlyConfigured.
+    """
+    passthrough_fields = (
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+    )
+
+    def __init__(self, serializer_class):
+        self.names, self.columns, self.converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                  serializers.ManyRelatedField)) or field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} cannot be serialized from values() rows.'
+                )
+            self.names.append(name)
+            self.columns.append(field.source)
+            self.converters.append(None if self.is_passthrough(field) else field.to_representation)
+        self.is_identity = self.names == self.columns and not any(self.converters)
+
+    def is_passthrough(self, field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # values() already yields the raw foreign key, which is what the field outputs.
+            return field.pk_field is None
+        return isinstance(field, self.passthrough_fields)
+
+    @timed('serialize')
+    def to_representation(self, rows):
+        if self.is_identity:
+            return rows if isinstance(rows, list) else list(rows)
+        accessors = list(zip(self.names, self.columns, self.converters))
+        return [
+            {
+                name: row[column] if convert is None or row[column] is None else convert(row[column])
+                for name, column, convert in accessors
+            }
+            for row in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
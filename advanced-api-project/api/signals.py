@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import Author, Book
+from .search import get_search_backend, refresh_search_text
+
+
+# Any Book/Author write invalidates the cached API responses (see api/cache.py).
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_response_cache(sender, **kwargs):
+    invalidate(using=kwargs.get('using'))
+
+
+# Keep the search index in step with single-object writes; the bulk paths in
+# api/serializers.py index explicitly.
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, using, **kwargs):
+    get_search_backend(using).index([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, using, **kwargs):
+    get_search_backend(using).remove([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created, using, **kwargs):
+    if not created:
+        refresh_search_text(Book.objects.using(using).filter(author=instance))
@@ -3,6 +3,42 @@ from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
 from .models import Book, Author
+from .serializers import AuthorSerializer, BookSerializer, ValuesSerializer, get_values_serializer
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from .views import BookExportView, BookListView
+from .async_views import AsyncBookExportView, AsyncBookListView
+from asgiref.sync import async_to_sync
+from .cache import get_cache, get_stats
+from .benchmarking import compare_results, free_port, percentile, run_load
+from .instrumentation import QueryBudgetTestMixin
+import base64
+import json
+import time
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from io import StringIO
+from .management.commands.index_audit import full_scans
+from .search import get_search_backend
+
+
+def forged_cursor(*position):
+    """A well-formed cursor token carrying arbitrary position values."""
+    raw = json.dumps({"p": list(position)}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+# Well-formed cursors whose values do not fit the ordering's columns
+FORGED_CURSOR_QUERIES = [
+    f"?cursor={forged_cursor('T1', 'abc')}",
+    f"?cursor={forged_cursor(None, None)}",
+    f"?cursor={forged_cursor('T1', None)}",
+    f"?cursor={forged_cursor(['T1'], {'id': 1})}",
+    f"?ordering=-publication_year&cursor={forged_cursor('soon', 1)}",
+]
 
 
 class BookAPITestCase(APITestCase):
@@ -36,7 +72,7 @@ class BookAPITestCase(APITestCase):
         url = reverse("book-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_retrieve_book(self):
         url = reverse("book-detail", args=[self.book1.id])
@@ -110,19 +146,737 @@ class BookAPITestCase(APITestCase):
         url = reverse("book-list") + f"?author__name={self.author1.name}"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "Alpha Book")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "Alpha Book")
 
     def test_search_books_by_title(self):
         url = reverse("book-list") + "?search=Beta"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "Beta Book")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "Beta Book")
 
     def test_order_books_by_year(self):
         url = reverse("book-list") + "?ordering=publication_year"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        years = [book["publication_year"] for book in response.data]
+        years = [book["publication_year"] for book in response.data["results"]]
         self.assertEqual(years, sorted(years))
+
+    # ----------------------------
+    # PAGINATION TESTS
+    # ----------------------------
+    def collect_pages(self, url):
+        titles, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [book["title"] for book in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return titles, pages
+
+    def test_paginate_books_by_cursor(self):
+        for i in range(3):
+            Book.objects.create(title="Alpha Book", author=self.author2, publication_year=1990 + i)
+        titles, pages = self.collect_pages(reverse("book-list") + "?page_size=2")
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, ["Alpha Book"] * 4 + ["Beta Book"])
+
+    def test_paginate_books_with_ordering_ties(self):
+        # Many rows share a publication_year; the id tie-breaker must keep pages disjoint.
+        for i in range(5):
+            Book.objects.create(title=f"Tied {i}", author=self.author1, publication_year=1999)
+        titles, _ = self.collect_pages(reverse("book-list") + "?ordering=-publication_year&page_size=2")
+        self.assertEqual(len(titles), len(set(titles)))
+        self.assertEqual(titles[0], "Alpha Book")
+        self.assertEqual(len(titles), Book.objects.count())
+
+    def test_paginate_books_previous_link(self):
+        response = self.client.get(reverse("book-list") + "?page_size=1")
+        self.assertIsNone(response.data["previous"])
+        second = self.client.get(response.data["next"])
+        self.assertEqual(second.data["results"][0]["title"], "Beta Book")
+        first = self.client.get(second.data["previous"])
+        self.assertEqual(first.data["results"][0]["title"], "Alpha Book")
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("book-list") + "?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_forged_cursor_values_are_not_found(self):
+        for query in FORGED_CURSOR_QUERIES:
+            with self.subTest(query=query):
+                response = self.client.get(reverse("book-list") + query)
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                self.assertEqual(response.data, {"detail": "Invalid cursor"})
+
+
+class BookExportTestCase(APITestCase):
+    """
+    Unit tests for the streaming export endpoint
+    """
+
+    def setUp(self):
+        author = Author.objects.create(name="Author One")
+        for i in range(5):
+            Book.objects.create(title=f"Book {i}", author=author, publication_year=2000 + i)
+        self.expected = BookSerializer(Book.objects.order_by("pk"), many=True).data
+        self.url = reverse("book-export")
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_ndjson(self):
+        body = self.read(self.client.get(self.url))
+        lines = body.splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected)
+
+    def test_export_json_array(self):
+        body = self.read(self.client.get(self.url + "?format=json"))
+        self.assertEqual(json.loads(body), self.expected)
+
+    def test_export_json_array_across_chunks(self):
+        with mock.patch.object(BookExportView, "chunk_size", 2):
+            response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+            self.assertEqual(json.loads(self.read(response)), self.expected)
+
+    def test_export_empty_catalog(self):
+        Book.objects.all().delete()
+        self.assertEqual(json.loads(self.read(self.client.get(self.url + "?format=json"))), [])
+        self.assertEqual(self.read(self.client.get(self.url)), "")
+
+
+class BookResponseCacheTestCase(APITestCase):
+    """
+    Unit tests for the read-through response cache on list/detail views
+    - Hits skip the database entirely
+    - Writes through the API or the ORM invalidate cached responses
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author = Author.objects.create(name="Author One")
+        self.book = Book.objects.create(title="Alpha Book", author=self.author, publication_year=2001)
+
+    def test_list_hit_runs_no_queries(self):
+        url = reverse("book-list")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["results"][0]["title"], "Alpha Book")
+
+    def test_query_string_is_normalized(self):
+        url = reverse("book-list")
+        self.client.get(url + "?search=Alpha&ordering=title")
+        response = self.client.get(url + "?ordering=title&search=Alpha")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(self.client.get(url + "?ordering=-title")["X-Cache"], "MISS")
+
+    def test_create_invalidates_list(self):
+        url = reverse("book-list")
+        self.client.get(url)
+        self.client.login(username="testuser", password="testpass")
+        data = {"title": "Beta Book", "author": self.author.id, "publication_year": 2010}
+        self.client.post(reverse("book-create"), data, format="json")
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_update_invalidates_detail(self):
+        url = reverse("book-detail", args=[self.book.id])
+        self.client.get(url)
+        self.client.login(username="testuser", password="testpass")
+        self.client.patch(reverse("book-update", args=[self.book.id]), {"title": "Renamed"}, format="json")
+        self.assertEqual(self.client.get(url).data["title"], "Renamed")
+
+    def test_delete_invalidates_detail(self):
+        url = reverse("book-detail", args=[self.book.id])
+        self.client.get(url)
+        self.client.login(username="testuser", password="testpass")
+        self.client.delete(reverse("book-delete", args=[self.book.id]))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_author_change_invalidates_list(self):
+        url = reverse("book-list") + "?author__name=Author One"
+        self.client.get(url)
+        self.author.delete()
+        self.assertEqual(self.client.get(url).data["results"], [])
+
+    def test_stats(self):
+        url = reverse("book-detail", args=[self.book.id])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(get_stats()["hits"], 1)
+        self.assertEqual(get_stats()["misses"], 1)
+
+        self.assertEqual(self.client.get(reverse("cache-stats")).status_code, status.HTTP_401_UNAUTHORIZED)
+        User.objects.create_user(username="admin", password="adminpass", is_staff=True)
+        self.client.login(username="admin", password="adminpass")
+        response = self.client.get(reverse("cache-stats"))
+        self.assertEqual(response.data["hits"], 1)
+        self.assertEqual(response.data["hit_ratio"], 0.5)
+
+
+class ConditionalGetTestCase(APITestCase):
+    """
+    Unit tests for ETag/Last-Modified on the read endpoints (api/conditional.py)
+    - A matching If-None-Match/If-Modified-Since gets a 304 with no serializer work
+    - Every kind of write changes the validators
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author = Author.objects.create(name="Author One")
+        self.book = Book.objects.create(title="Alpha Book", author=self.author, publication_year=2001)
+        self.list_url = reverse("book-list")
+        self.detail_url = reverse("book-detail", args=[self.book.id])
+
+    def test_list_not_modified_skips_serialization(self):
+        response = self.client.get(self.list_url)
+        etag = response["ETag"]
+        self.assertNotIn("Last-Modified", response)
+
+        get_cache().clear()
+        with mock.patch("api.views.get_values_serializer") as values_serializer, self.assertNumQueries(1):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        values_serializer.assert_not_called()
+
+        # The catalog version is cached until the next write
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_not_modified_skips_serialization(self):
+        response = self.client.get(self.detail_url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        with mock.patch.object(BookSerializer, "to_representation") as to_representation, self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_representation.assert_not_called()
+
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_list_etag(self):
+        etags = {self.client.get(self.list_url)["ETag"]}
+
+        def changed():
+            etag = self.client.get(self.list_url)["ETag"]
+            self.assertNotIn(etag, etags)
+            etags.add(etag)
+
+        other = Book.objects.create(title="Beta Book", author=self.author, publication_year=2002)
+        changed()
+        self.client.force_authenticate(self.user)
+        self.client.patch(reverse("book-bulk"), [{"id": other.id, "publication_year": 2003}], format="json")
+        self.client.force_authenticate(None)
+        changed()
+        self.author.name = "Renamed Author"
+        self.author.save()
+        changed()
+        other.delete()
+        changed()
+
+    def test_update_changes_detail_validators(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.book.title = "Renamed"
+        self.book.save(update_fields=["title"])
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], "Renamed")
+
+    def test_missing_book_is_404(self):
+        response = self.client.get(reverse("book-detail", args=[self.book.id + 1]), HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_representations_have_different_etags(self):
+        json_etag = self.client.get(self.detail_url)["ETag"]
+        html_etag = self.client.get(self.detail_url, HTTP_ACCEPT="text/html")["ETag"]
+        self.assertNotEqual(json_etag, html_etag)
+
+
+class AuthorAPITestCase(APITestCase):
+    """
+    Unit tests for the author endpoints
+    - Nested books are prefetched: the query count does not depend on the number of authors
+    - ?fields= sparse fieldsets
+    """
+
+    def create_authors(self, count):
+        for i in range(count):
+            author = Author.objects.create(name=f"Author {i:02d}")
+            for year in (1990, 2000, 2010):
+                Book.objects.create(title=f"Book {i}-{year}", author=author, publication_year=year)
+
+    def test_list_query_count_is_constant(self):
+        url = reverse("author-list")
+        self.create_authors(2)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 2)
+
+        self.create_authors(20)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 22)
+        self.assertEqual(len(response.data["results"][0]["books"]), 3)
+
+    def test_detail_query_count(self):
+        self.create_authors(1)
+        author = Author.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("author-detail", args=[author.id]))
+        self.assertEqual(response.data["name"], "Author 00")
+        self.assertEqual([book["publication_year"] for book in response.data["books"]], [1990, 2000, 2010])
+
+    def test_sparse_fieldset_skips_books(self):
+        self.create_authors(5)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("author-list") + "?fields=id,name")
+        self.assertEqual(set(response.data["results"][0]), {"id", "name"})
+
+    def test_sparse_fieldset_ignores_unknown_fields(self):
+        self.create_authors(1)
+        author = Author.objects.get()
+        response = self.client.get(reverse("author-detail", args=[author.id]) + "?fields=name,nope")
+        self.assertEqual(response.data, {"name": "Author 00"})
+
+
+class BookBulkAPITestCase(APITestCase):
+    """
+    Unit tests for /api/books/bulk/
+    - Batched create/update/delete with constant query counts
+    - Per-item errors reported by index, nothing written on error
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.author1 = Author.objects.create(name="Author One")
+        self.author2 = Author.objects.create(name="Author Two")
+        self.url = reverse("book-bulk")
+        self.client.force_authenticate(self.user)
+
+    def payload(self, count):
+        return [
+            {"title": f"Bulk {i}", "publication_year": 2000, "author": (self.author1, self.author2)[i % 2].id}
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        with self.settings(API_BULK={"BATCH_SIZE": 10}):
+            response = self.client.post(self.url, self.payload(25), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Book.objects.count(), 25)
+        self.assertEqual(len(response.data), 25)
+        self.assertTrue(all(book["id"] for book in response.data))
+
+    def test_bulk_create_query_count_is_constant(self):
+        # authors lookup + savepoints/inserts; no per-row author SELECT or INSERT
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, self.payload(5), format="json")
+        # 150 rows still fit SQLite's 999-parameter limit for a single INSERT
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, self.payload(150), format="json")
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_bulk_create_reports_errors_by_index(self):
+        payload = self.payload(4)
+        payload[1]["publication_year"] = 9999
+        payload[3]["author"] = 123456
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["errors"]), {"1", "3"})
+        self.assertIn("publication_year", response.data["errors"]["1"])
+        self.assertIn("author", response.data["errors"]["3"])
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post(self.url, {"title": "x"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_partial_update(self):
+        books = [Book.objects.create(title=f"Old {i}", author=self.author1, publication_year=1990) for i in range(3)]
+        payload = [{"id": book.id, "title": f"New {i}"} for i, book in enumerate(books)]
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(Book.objects.order_by("id").values_list("title", "publication_year")),
+            [("New 0", 1990), ("New 1", 1990), ("New 2", 1990)],
+        )
+
+    def test_bulk_update_unknown_id(self):
+        book = Book.objects.create(title="Old", author=self.author1, publication_year=1990)
+        payload = [{"id": book.id, "title": "New"}, {"id": 987654, "title": "Ghost"}]
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["errors"]), {"1"})
+        book.refresh_from_db()
+        self.assertEqual(book.title, "Old")
+
+    def test_bulk_delete(self):
+        books = [Book.objects.create(title=f"B {i}", author=self.author1, publication_year=1990) for i in range(3)]
+        response = self.client.delete(self.url, [books[0].id, books[2].id], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["deleted"], 2)
+        self.assertEqual(list(Book.objects.values_list("id", flat=True)), [books[1].id])
+
+    def test_bulk_delete_unknown_id(self):
+        book = Book.objects.create(title="B", author=self.author1, publication_year=1990)
+        response = self.client.delete(self.url, [book.id, 987654], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["errors"]), {"1"})
+        self.assertTrue(Book.objects.filter(pk=book.pk).exists())
+
+    def test_bulk_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, self.payload(1), format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_create_invalidates_cache(self):
+        get_cache().clear()
+        self.client.get(reverse("book-list"))
+        self.client.post(self.url, self.payload(2), format="json")
+        self.assertEqual(len(self.client.get(reverse("book-list")).data["results"]), 2)
+
+
+class ValuesSerializerTestCase(APITestCase):
+    """
+    Unit tests for the values()-based fast list path
+    - Output is byte-identical to BookSerializer
+    """
+
+    def setUp(self):
+        author = Author.objects.create(name="Author One")
+        other = Author.objects.create(name="Автор Два")
+        for i, title in enumerate(["Alpha", "Ünïcode “quoted”", "Zeta \\ slash", "Beta"]):
+            Book.objects.create(title=title, author=(author, other)[i % 2], publication_year=1990 + i)
+
+    def test_output_matches_book_serializer(self):
+        queryset = Book.objects.order_by("title", "id")
+        fast = ValuesSerializer(BookSerializer)
+        expected = JSONRenderer().render(BookSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(fast.to_representation(queryset.values(*fast.columns)))
+        self.assertEqual(actual, expected)
+
+    def test_list_response_matches_book_serializer(self):
+        response = self.client.get(reverse("book-list") + "?format=json&ordering=-publication_year")
+        page = response.json()["results"]
+        expected = BookSerializer(Book.objects.order_by("-publication_year", "-id"), many=True).data
+        self.assertEqual(JSONRenderer().render(page), JSONRenderer().render(expected))
+
+    def test_converting_fields(self):
+        class RenamedSerializer(serializers.ModelSerializer):
+            name = serializers.CharField(source="title")
+            year = serializers.FloatField(source="publication_year")
+
+            class Meta:
+                model = Book
+                fields = ["id", "name", "year"]
+
+        fast = ValuesSerializer(RenamedSerializer)
+        self.assertFalse(fast.is_identity)
+        queryset = Book.objects.order_by("id")
+        self.assertEqual(
+            fast.to_representation(queryset.values(*fast.columns)),
+            RenamedSerializer(queryset, many=True).data,
+        )
+
+    def test_rejects_nested_fields(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(AuthorSerializer)
+
+
+class BookSearchTestCase(APITestCase):
+    """
+    ?search= through the search index (api/search.py)
+    - Accent- and case-insensitive, every term must match title or author
+    - Best matches first unless ?ordering= is given
+    - Index kept in sync with saves, bulk writes and author renames
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.herbert = Author.objects.create(name="Frank Herbert")
+        self.borges = Author.objects.create(name="Jorge Luis Borges")
+        Book.objects.create(title="Children of Dune", publication_year=1976, author=self.herbert)
+        Book.objects.create(title="Dune", publication_year=1965, author=self.herbert)
+        Book.objects.create(title="Café Society", publication_year=1990, author=self.borges)
+        Book.objects.create(title="Ficciones", publication_year=1944, author=self.borges)
+        self.url = reverse("book-list")
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {"search": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["title"] for book in response.data["results"]]
+
+    def test_search_ignores_accents_and_case(self):
+        self.assertEqual(self.search("CAFE"), ["Café Society"])
+        self.assertEqual(self.search("café"), ["Café Society"])
+
+    def test_every_term_must_match_title_or_author(self):
+        self.assertEqual(self.search("herbert children"), ["Children of Dune"])
+        self.assertEqual(self.search("borges, fic"), ["Ficciones"])
+        self.assertEqual(self.search("herbert ficciones"), [])
+
+    def test_short_terms(self):
+        self.assertEqual(self.search("du of"), ["Children of Dune"])
+
+    def test_title_prefix_ranks_first(self):
+        self.assertEqual(self.search("dune"), ["Dune", "Children of Dune"])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(self.search("dune", ordering="-publication_year"), ["Children of Dune", "Dune"])
+
+    def test_cursor_pagination_while_searching(self):
+        for i in range(12):
+            Book.objects.create(title=f"Dune Messiah {i:02d}", publication_year=1969, author=self.herbert)
+        titles, params = [], {"search": "dune"}
+        while True:
+            response = self.client.get(self.url, params)
+            titles += [book["title"] for book in response.data["results"]]
+            if not response.data["next"]:
+                break
+            params = {"cursor": response.data["next"].split("cursor=")[1].split("&")[0], "search": "dune"}
+        self.assertEqual(len(titles), 14)
+        self.assertEqual(len(set(titles)), 14)
+        self.assertEqual(titles[0], "Dune")
+        self.assertEqual(titles[-1], "Children of Dune")
+
+    def test_index_follows_writes(self):
+        book = Book.objects.get(title="Ficciones")
+        book.title = "El Aleph"
+        book.save()
+        self.assertEqual(self.search("ficciones"), [])
+        self.assertEqual(self.search("aleph"), ["El Aleph"])
+
+        self.borges.name = "J. L. Borges"
+        self.borges.save()
+        self.assertEqual(self.search("jorge"), [])
+        self.assertEqual(self.search("j. l."), ["Café Society", "El Aleph"])
+
+        book.delete()
+        self.assertEqual(self.search("aleph"), [])
+
+    def test_bulk_writes_are_indexed(self):
+        user = User.objects.create_user(username="bulk", password="pass")
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse("book-bulk"), [
+            {"title": "Labyrinths", "publication_year": 1962, "author": self.borges.id},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.search("labyrinth"), ["Labyrinths"])
+
+        book_id = response.data[0]["id"]
+        self.client.patch(reverse("book-bulk"), [{"id": book_id, "title": "Dreamtigers"}], format="json")
+        self.assertEqual(self.search("labyrinth"), [])
+        self.assertEqual(self.search("dreamtigers"), ["Dreamtigers"])
+
+    def test_rebuild_command(self):
+        Book.objects.filter(author=self.borges).update(search_text="")
+        get_search_backend().rebuild()
+        self.assertEqual(self.search("borges"), [])
+        call_command("rebuild_book_search", stdout=StringIO())
+        self.assertEqual(self.search("borges"), ["Café Society", "Ficciones"])
+
+
+class IndexAuditTestCase(APITestCase):
+    """The API's querysets must stay index-backed; see the index_audit command."""
+
+    def test_views_do_not_scan_tables(self):
+        out = StringIO()
+        call_command('index_audit', stdout=out)
+        self.assertIn('No full table scans.', out.getvalue())
+
+    def test_unindexed_lookup_is_flagged(self):
+        plan, scans = full_scans(Book.objects.filter(title__icontains='dune').order_by('pk'))
+        if plan is None:
+            self.skipTest('index audit does not support this database backend')
+        self.assertEqual(scans, ['api_book'])
+
+
+class RequestMetricsTestCase(QueryBudgetTestMixin, APITestCase):
+    """Query budgets declared on the views, enforced through RequestMetricsMiddleware."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(username='reader', password='pass')
+        author = Author.objects.create(name='Frank Herbert')
+        for i in range(5):
+            Book.objects.create(title=f'Dune {i}', publication_year=1965 + i, author=author)
+        self.client.login(username='reader', password='pass')
+
+    def test_views_stay_within_declared_budgets(self):
+        self.assertWithinQueryBudget(self.client.get(reverse('book-list')))
+        self.assertWithinQueryBudget(self.client.get(reverse('book-list'), {'author__name': 'Frank Herbert'}))
+        self.assertWithinQueryBudget(self.client.get(reverse('author-list')))
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('book-list'))
+        metrics = response.wsgi_request.request_metrics
+        self.assertEqual(metrics['budget'], BookListView.query_budget)
+        self.assertEqual(metrics['status'], 200)
+        self.assertIn(f'desc="{metrics["queries"]} queries"', response['Server-Timing'])
+        self.assertGreaterEqual(metrics['render_ms'], 0)
+        self.assertRegex(response['Server-Timing'], r'serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=')
+
+    def assertSerializationTimed(self, url, patch):
+        with patch:
+            metrics = self.client.get(url).wsgi_request.request_metrics
+        self.assertGreaterEqual(metrics['serialize_ms'], 20)
+        # Serialization happens in the view, before rendering starts
+        self.assertLess(metrics['render_ms'], 20)
+
+    def slow_to_representation(self, serializer_class):
+        to_representation = serializer_class.to_representation
+
+        def slow(serializer, data):
+            time.sleep(0.02)
+            return to_representation(serializer, data)
+        return mock.patch.object(serializer_class, 'to_representation', slow)
+
+    def test_serialization_is_timed(self):
+        book = Book.objects.first()
+        self.assertSerializationTimed(reverse('book-detail', kwargs={'pk': book.pk}),
+                                      self.slow_to_representation(BookSerializer))
+        self.assertSerializationTimed(reverse('author-list'), self.slow_to_representation(AuthorSerializer))
+
+        def slow_id(value):
+            time.sleep(0.005)
+            return value
+        values_serializer = get_values_serializer(BookSerializer)
+        # Five rows through a slow converter
+        self.assertSerializationTimed(reverse('book-list'), mock.patch.multiple(
+            values_serializer, is_identity=False, converters=[slow_id] + values_serializer.converters[1:],
+        ))
+
+    def test_over_budget_fails(self):
+        response = self.client.get(reverse('author-list'))
+        with self.assertRaises(AssertionError):
+            self.assertWithinQueryBudget(response, budget=0)
+
+
+class BenchmarkHarnessTestCase(APITestCase):
+    """Sanity checks for the statistics behind the benchmark_api and benchmark_asgi commands."""
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_compare_results_flags_slowdowns_and_extra_queries(self):
+        baseline = {'results': [
+            {'scenario': 'books: list', 'driver': 'client', 'p50_ms': 2.0, 'queries_per_request': 2.0},
+        ]}
+        current = {'results': [
+            {'scenario': 'books: list', 'driver': 'client', 'p50_ms': 2.3, 'queries_per_request': 2.0},
+        ]}
+        self.assertEqual(compare_results(current, baseline, tolerance=0.2), [])
+        current['results'][0].update(p50_ms=3.0, queries_per_request=3.0)
+        self.assertEqual(len(compare_results(current, baseline, tolerance=0.2)), 2)
+
+    def test_run_load_counts_failed_requests_as_errors(self):
+        # Nothing listens on the port, so every connection is refused
+        result = run_load(free_port(), lambda n: '/api/books/', clients=3, requests=5, timeout=1)
+        self.assertEqual(result, {'requests': 5, 'clients': 3, 'errors': 5})
+
+
+class AsyncBookViewsTestCase(APITestCase):
+    """
+    Unit tests for the async (ASGI) read endpoints (api/async_views.py)
+    - Same responses, ETags and errors as the sync views
+    - Database work goes through the async ORM, within the query budgets
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.author = Author.objects.create(name="Frank Herbert")
+        self.other = Author.objects.create(name="Ursula Le Guin")
+        for i in range(4):
+            Book.objects.create(title=f"Dune {i}", publication_year=1965 + i, author=self.author)
+        Book.objects.create(title="The Dispossessed", publication_year=1974, author=self.other)
+        self.book = Book.objects.order_by("pk").first()
+
+    def aget(self, path, **headers):
+        return async_to_sync(self.async_client.get)(path, headers=headers)
+
+    def read_stream(self, response):
+        async def collect():
+            return b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return async_to_sync(collect)().decode("utf-8")
+
+    def assertSameAsSync(self, sync_path, async_path):
+        expected = self.client.get(sync_path)
+        response = self.aget(async_path)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        return response
+
+    def test_list_matches_sync_view(self):
+        sync_url, async_url = reverse("book-list"), reverse("async-book-list")
+        for query in ("", "?ordering=-publication_year", "?search=dune", "?author__name=Ursula%20Le%20Guin",
+                      "?publication_year=1966", "?publication_year=soon", "?cursor=bogus"):
+            self.assertSameAsSync(sync_url + query, async_url + query)
+
+    def test_forged_cursor_values_are_not_found(self):
+        for query in FORGED_CURSOR_QUERIES:
+            with self.subTest(query=query):
+                response = self.assertSameAsSync(reverse("book-list") + query, reverse("async-book-list") + query)
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_cursor_pages(self):
+        page = json.loads(self.aget(reverse("async-book-list") + "?page_size=2").content)
+        titles = [book["title"] for book in page["results"]]
+        while page["next"]:
+            page = json.loads(self.aget(page["next"]).content)
+            titles += [book["title"] for book in page["results"]]
+        self.assertEqual(titles, sorted(Book.objects.values_list("title", flat=True)))
+
+    def test_detail_matches_sync_view(self):
+        self.assertSameAsSync(reverse("book-detail", args=[self.book.pk]), reverse("async-book-detail", args=[self.book.pk]))
+        self.assertSameAsSync(reverse("book-detail", args=[999]), reverse("async-book-detail", args=[999]))
+
+    def test_etags_match_sync_views(self):
+        for sync_url, async_url in (
+            (reverse("book-list"), reverse("async-book-list")),
+            (reverse("book-detail", args=[self.book.pk]), reverse("async-book-detail", args=[self.book.pk])),
+        ):
+            etag = self.client.get(sync_url)["ETag"]
+            response = self.aget(async_url, **{"If-None-Match": etag})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response["ETag"], etag)
+
+    def test_list_queries_and_cache(self):
+        url = reverse("async-book-list")
+        with self.assertNumQueries(2):
+            response = self.aget(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        metrics = response.asgi_request.request_metrics
+        self.assertEqual((metrics["queries"], metrics["budget"]), (2, AsyncBookListView.query_budget))
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.aget(url)["X-Cache"], "HIT")
+        Book.objects.create(title="Children of Dune", publication_year=1976, author=self.author)
+        self.assertEqual(len(json.loads(self.aget(url).content)["results"]), 6)
+
+    def test_export_matches_sync_view(self):
+        sync_url, async_url = reverse("book-export"), reverse("async-book-export")
+        expected = b"".join(self.client.get(sync_url).streaming_content).decode("utf-8")
+        self.assertEqual(self.read_stream(self.aget(async_url)), expected)
+        with mock.patch.object(AsyncBookExportView, "chunk_size", 2):
+            body = self.read_stream(self.aget(async_url, Accept="application/json"))
+        self.assertEqual(json.loads(body), [json.loads(line) for line in expected.splitlines()])
+        self.assertEqual(self.aget(async_url + "?format=xml").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.aget(async_url, Accept="text/csv").status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
@@ -1,18 +1,31 @@
 from django.urls import path
-from .views import BookListView, BookDetailView, BookUpdateView, BookDeleteView, BookCreateView
+from .views import BookListView, BookDetailView, BookUpdateView, BookDeleteView, BookCreateView, BookExportView, CacheStatsView
+from .views import AuthorListView, AuthorDetailView, BookBulkView
+from .async_views import AsyncBookDetailView, AsyncBookExportView, AsyncBookListView
 
 # URL patterns for the API app
-app_name = 'api'
-
 urlpatterns = [
     # Endpoint for listing all books and creating a new book
     path('books/', BookListView.as_view(), name='book-list'),
     # Endpoint for retrieving, updating, or deleting a specific book by ID
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
-    # Endpoint for updating a book via POST (requires 'id' in request body)
-    path('books/update/', BookUpdateView.as_view(), name='book-update'),
-    # Endpoint for deleting a book via POST (requires 'id' in request body)
-    path('books/delete/', BookDeleteView.as_view(), name='book-delete'),
+    # Endpoint for updating a specific book (PUT/PATCH)
+    path('books/<int:pk>/update/', BookUpdateView.as_view(), name='book-update'),
+    # Endpoint for deleting a specific book (DELETE)
+    path('books/<int:pk>/delete/', BookDeleteView.as_view(), name='book-delete'),
+    # Endpoint for streaming the full catalog as NDJSON or a JSON array
+    path('books/export/', BookExportView.as_view(), name='book-export'),
     # Endpoint for creating a book via POST
     path('books/create/', BookCreateView.as_view(), name='book-create'),
+    # Endpoint for creating, updating or deleting many books in one request
+    path('books/bulk/', BookBulkView.as_view(), name='book-bulk'),
+    # Endpoints for listing authors and retrieving one author, with nested books
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
+    # Async (ASGI) versions of the read-only book endpoints, same responses
+    path('async/books/', AsyncBookListView.as_view(), name='async-book-list'),
+    path('async/books/<int:pk>/', AsyncBookDetailView.as_view(), name='async-book-detail'),
+    path('async/books/export/', AsyncBookExportView.as_view(), name='async-book-export'),
+    # Endpoint for response cache hit/miss counters (admin only)
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
 ]
\ No newline at end of file
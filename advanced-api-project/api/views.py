@@ -1,45 +1,294 @@
-from rest_framework import generics, filters
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
+import json
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters import rest_framework as filters_backend   # 👈 this matches your requirement
-from .models import Book
-from .serializers import BookSerializer
+from .cache import CachedResponseMixin, get_stats
+from .conditional import ConditionalGetMixin, get_catalog_version
+from .models import Author, Book
+from .pagination import KeysetCursorPagination
+from .renderers import NDJSONRenderer
+from .search import BookSearchFilter, RelevanceOrderingFilter
+from .serializers import AuthorSerializer, BookSerializer, get_values_serializer
+
+
+# ===============================
+# FAST LIST MIXIN
+# ===============================
+class ValuesListMixin:
+    """
+    Read-only list() that serializes QuerySet.values() rows through a
+    ValuesSerializer instead of building model instances and running DRF field
+    introspection per object. The JSON output is identical to serializer_class.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer, queryset, extra = self.get_values_queryset()
+        page = self.paginate_queryset(queryset)
+        data = self.serialize_rows(serializer, queryset if page is None else page, extra)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_values_queryset(self):
+        """(ValuesSerializer, filtered values() queryset, annotation columns to drop)."""
+        serializer = get_values_serializer(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset())
+        # Annotations such as search_rank stay in the rows so cursor positions can
+        # read them, and are dropped again before serializing.
+        extra = [name for name in queryset.query.annotations if name not in serializer.columns]
+        return serializer, queryset.values(*serializer.columns, *extra), extra
+
+    def serialize_rows(self, serializer, rows, extra):
+        if extra:
+            rows = [{column: row[column] for column in serializer.columns} for row in rows]
+        return serializer.to_representation(rows)
 
 
 # ===============================
 # BOOK LIST VIEW
 # ===============================
-class BookListView(generics.ListAPIView):
+class BookListView(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, generics.ListAPIView):
     """
     GET /api/books/
     Retrieves a list of all books with support for:
     - Filtering by title, author name, and publication_year
     - Searching by title and author name
     - Ordering by title or publication_year
+    - Cursor pagination keyed on the ordering plus id (?cursor=, ?page_size=)
+    Responses are cached per normalized query string until a Book/Author changes.
+    Rows are serialized from values() (ValuesListMixin), not model instances.
+    Sends an ETag for the whole catalog; If-None-Match gets a 304 (api/conditional.py).
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetCursorPagination
 
     # Enable filtering, searching, ordering
-    filter_backends = [filters_backend.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ?search= goes through the search index (api/search.py); results are ranked by
+    # relevance unless ?ordering= is given.
+    filter_backends = [filters_backend.DjangoFilterBackend, BookSearchFilter, RelevanceOrderingFilter]
     filterset_fields = ['title', 'author__name', 'publication_year']
-    search_fields = ['title', 'author__name']
+    search_fields = ['title', 'author__name']  # what search_text is built from
     ordering_fields = ['title', 'publication_year']
     ordering = ['title']
+    # Session, user, the catalog version once per write (api/conditional.py) and the page
+    query_budget = 4
+
+    def get_validators(self, request, *args, **kwargs):
+        return get_catalog_version(), None
 
 
 # ===============================
 # BOOK DETAIL VIEW
 # ===============================
-class BookDetailView(generics.RetrieveAPIView):
+class BookDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
     """
     GET /api/books/<id>/
-    Retrieves a single book by its ID.
+    Retrieves a single book by its ID (cached like BookListView).
+    ETag and Last-Modified come from Book.updated_at.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [AllowAny]
+
+    def get_validators(self, request, *args, **kwargs):
+        updated_at = Book.objects.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return (kwargs['pk'], updated_at), updated_at
+
+
+# ===============================
+# RESPONSE CACHE STATS VIEW
+# ===============================
+class CacheStatsView(APIView):
+    """
+    GET /api/cache/stats/
+    Admin-only hit/miss counters and current generation of the response cache.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_stats())
+
+
+# ===============================
+# BOOK EXPORT VIEW
+# ===============================
+class BookExportView(APIView):
+    """
+    GET /api/books/export/
+    Streams the whole catalog for bulk consumers (nightly ETL).
+    - ?format=ndjson (default) or Accept: application/x-ndjson: one book per line
+    - ?format=json or Accept: application/json: a single JSON array, sent in chunks
+    Rows come from values().iterator(), so neither model instances nor
+    serializers are built and memory stays flat regardless of table size.
+    Each row has the same keys and values as BookSerializer.
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [NDJSONRenderer, JSONRenderer]
+    fields = ['id', 'title', 'publication_year', 'author']  # Same shape as BookSerializer
+    chunk_size = 2000  # Rows fetched per database round trip and per streamed chunk
+
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        rows = Book.objects.order_by('pk').values(*self.fields).iterator(chunk_size=self.chunk_size)
+        if renderer.format == 'json':
+            stream = self.stream_json_array(rows)
+        else:
+            stream = self.stream_ndjson(rows)
+        response = StreamingHttpResponse(stream, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="books.{renderer.format}"'
+        return response
+
+    def encode_chunks(self, rows, separator):
+        # Join a chunk of rows per yield to keep per-row overhead out of the WSGI server.
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        chunk = []
+        for row in rows:
+            chunk.append(dumps(row))
+            if len(chunk) >= self.chunk_size:
+                yield separator.join(chunk)
+                chunk = []
+        if chunk:
+            yield separator.join(chunk)
+
+    def stream_ndjson(self, rows):
+        for chunk in self.encode_chunks(rows, '\n'):
+            yield chunk + '\n'
+
+    def stream_json_array(self, rows):
+        yield '['
+        first = True
+        for chunk in self.encode_chunks(rows, ','):
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+
+
+# ===============================
+# BOOK BULK VIEW
+# ===============================
+class BookBulkView(generics.GenericAPIView):
+    """
+    /api/books/bulk/ - batch writes for catalog loads (authenticated users only)
+    - POST   [{title, publication_year, author}, ...]       -> bulk create
+    - PATCH  [{id, <fields to change>}, ...]                  -> bulk partial update
+    - PUT    [{id, title, publication_year, author}, ...]     -> bulk full update
+    - DELETE [id, ...]                                        -> bulk delete
+    The whole request is validated first; if any item is invalid nothing is
+    written and a 400 lists the errors by item index: {"errors": {"3": {...}}}.
+    Writes use bulk_create/bulk_update in API_BULK['BATCH_SIZE'] chunks inside one transaction.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        return self.save(serializer, status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        return self.update(request, partial=False)
+
+    def patch(self, request, *args, **kwargs):
+        return self.update(request, partial=True)
+
+    def update(self, request, partial):
+        ids = [item.get('id') for item in request.data if isinstance(item, dict)] if isinstance(request.data, list) else []
+        # Authors come along so search_text can be rebuilt without a query per book
+        books = self.get_queryset().select_related('author').in_bulk([pk for pk in ids if isinstance(pk, int)])
+        serializer = self.get_serializer(books, data=request.data, many=True, partial=partial)
+        return self.save(serializer, status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return self.invalid({'non_field_errors': ['Expected a list of book ids.']})
+        existing = set(self.get_queryset().filter(
+            pk__in=[pk for pk in request.data if isinstance(pk, int)]
+        ).values_list('pk', flat=True))
+        errors = {
+            str(index): ['No book with this id.']
+            for index, pk in enumerate(request.data)
+            if not isinstance(pk, int) or pk not in existing
+        }
+        if errors:
+            return self.invalid(errors)
+        with transaction.atomic():
+            deleted, _ = self.get_queryset().filter(pk__in=existing).delete()
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
+    def save(self, serializer, success_status):
+        if not serializer.is_valid():
+            errors = serializer.errors
+            # Older DRF reports list errors positionally, newer DRF as {index: errors}
+            if isinstance(errors, list):
+                errors = dict(enumerate(errors))
+            return self.invalid({str(key): item for key, item in errors.items() if item})
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=success_status)
+
+    def invalid(self, errors):
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# ===============================
+# AUTHOR VIEWS
+# ===============================
+class AuthorQueryMixin:
+    """
+    Shared queryset/serializer setup for the author endpoints.
+    - Nested books are loaded with one IN query for the whole page of authors
+      (prefetch_related), so the query count does not grow with the page size.
+    - ?fields=id,name returns a sparse fieldset; leaving out `books` also skips
+      the prefetch entirely.
+    """
+    serializer_class = AuthorSerializer
     permission_classes = [AllowAny]
 
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(',') if name.strip()]
+
+    def get_queryset(self):
+        queryset = Author.objects.all()
+        fields = self.get_requested_fields()
+        if fields is None or 'books' in fields:
+            queryset = queryset.prefetch_related('books')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+
+class AuthorListView(AuthorQueryMixin, generics.ListAPIView):
+    """
+    GET /api/authors/
+    Lists authors with their nested books, ordered by name.
+    """
+    ordering_fields = ['name']
+    ordering = ['name']
+    # Session, user, the author page and one prefetch for their books
+    query_budget = 4
+
+
+class AuthorDetailView(AuthorQueryMixin, generics.RetrieveAPIView):
+    """
+    GET /api/authors/<id>/
+    Retrieves a single author with their nested books.
+    """
+
 
 # ===============================
 # BOOK CREATE VIEW
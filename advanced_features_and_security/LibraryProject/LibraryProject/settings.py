@@ -36,7 +36,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles'
+    'django.contrib.staticfiles',
     'relationship_app',
     'bookshelf',
 ]
@@ -68,7 +68,6 @@ TEMPLATES = [
         },
     },
 ]
-]
 
 WSGI_APPLICATION = 'LibraryProject.wsgi.application'
 
@@ -126,6 +125,27 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Permission checks go through the cached per-user access snapshot
+# (relationship_app/access.py) instead of querying groups/perms per request.
+AUTHENTICATION_BACKENDS = ['relationship_app.access.CachedModelBackend']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library-project',
+    }
+}
+
+# Role/permission snapshots (relationship_app.access). Signals invalidate them on
+# any change, but only in caches every process shares; in a per-process
+# LocMemCache they are kept for ACCESS_CACHE_LOCAL_TIMEOUT seconds instead.
+ACCESS_CACHE_ALIAS = 'default'
+ACCESS_CACHE_TIMEOUT = 3600  # seconds, for a shared cache
+ACCESS_CACHE_LOCAL_TIMEOUT = 5  # seconds, the staleness window between processes
+
+# Serve sessions from the cache, falling back to the database on a miss
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = "DENY"
@@ -146,4 +166,18 @@ X_FRAME_OPTIONS = "DENY"  # ✅ Prevent clickjacking
 SECURE_CONTENT_TYPE_NOSNIFF = True  # ✅ Prevent MIME sniffing
 SECURE_BROWSER_XSS_FILTER = True  # ✅ Mitigate reflected XSS
 
-SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
\ No newline at end of file
+SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Profile photo uploads (bookshelf/images.py): streamed to disk and dropped
+# past MAX_UPLOAD_SIZE, checked from the image header, thumbnailed to WebP +
+# JPEG/PNG in a thread pool.
+FILE_UPLOAD_HANDLERS = ['bookshelf.images.StreamingImageUploadHandler']
+BOOKSHELF_IMAGES = {
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,
+    'MAX_DIMENSION': 4096,
+    'SIZES': {'small': 64, 'medium': 256},
+    'WORKERS': 2,
+}
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .images import rejected_upload_errors
+from .models import Book, CustomUser
 
 
 class CustomUserAdmin(UserAdmin):
@@ -13,5 +14,25 @@ class CustomUserAdmin(UserAdmin):
         (None, {"fields": ("date_of_birth", "profile_photo")}),
     )
 
+    def get_form(self, request, obj=None, **kwargs):
+        form_class = super().get_form(request, obj, **kwargs)
+
+        class UploadCheckedForm(form_class):
+            def clean(self):
+                # Photos over the upload limit never reach the form; say why.
+                for field_name, message in rejected_upload_errors(request).items():
+                    if field_name in self.fields:
+                        self.add_error(field_name, message)
+                return super().clean()
+
+        return UploadCheckedForm
+
+
+class BookAdmin(admin.ModelAdmin):
+    list_display = ("title", "author", "published_date", "isbn")
+    search_fields = ("title", "author", "=isbn")
+    ordering = ("title",)
+
 
 admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(Book, BookAdmin)
@@ -0,0 +1,251 @@
+"""
+Upload pipeline for CustomUser.profile_photo, the same one django_blog uses
+for profile pictures.
+
+* StreamingImageUploadHandler (installed through FILE_UPLOAD_HANDLERS) writes
+  uploads to a temporary file on disk chunk by chunk and abandons a file as
+  soon as it passes MAX_UPLOAD_SIZE, instead of buffering it whole first.
+* validate_image checks format and dimensions from the image header only
+  (Pillow's Image.open does not decode pixels), so an oversized or
+  decompression-bomb image is rejected without being decoded.
+* Once the row is committed, fixed-size square thumbnails are rendered in a
+  thread pool, so the request returns immediately. Each size is stored as
+  WebP plus a JPEG (or PNG, for transparent images) fallback, and the stored
+  names are written to `<field>_thumbnails` on the model. Until the worker
+  finishes, thumbnail_urls() falls back to the original.
+
+BOOKSHELF_IMAGES in settings.py overrides DEFAULTS; WORKERS = 0 renders inline.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import close_old_connections, connections, transaction
+from django.db.models.signals import post_init, post_save, pre_save
+from django.utils.deconstruct import deconstructible
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,  # bytes
+    'MAX_DIMENSION': 4096,  # px, either side
+    'FORMATS': ('JPEG', 'PNG', 'GIF', 'WEBP'),
+    'SIZES': {'small': 64, 'medium': 256},  # square thumbnails, px
+    'QUALITY': 85,
+    'WORKERS': 2,  # thumbnail threads; 0 renders inline
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BOOKSHELF_IMAGES', {})}
+
+
+def size_error_message(max_size):
+    return f'Images must be at most {max_size // (1024 * 1024)} MB.'
+
+
+class StreamingImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file to disk. A file that grows past
+    MAX_UPLOAD_SIZE is dropped mid-stream and its field name recorded in
+    `rejected`; forms report it through rejected_upload_errors().
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = get_config()['MAX_UPLOAD_SIZE']
+        self.rejected = []
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.file.close()  # removes the temporary file
+            self.rejected.append(self.field_name)
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def rejected_upload_errors(request):
+    """{field name: message} for uploads StreamingImageUploadHandler dropped."""
+    errors = {}
+    for handler in request.upload_handlers:
+        for field_name in getattr(handler, 'rejected', ()):
+            errors[field_name] = size_error_message(handler.max_size)
+    return errors
+
+
+@deconstructible
+class ImageValidator:
+    """Model field validator for new uploads; stored files are not re-read."""
+
+    def __call__(self, value):
+        if getattr(value, '_committed', True):
+            return
+        validate_image(value.file)
+
+    def __eq__(self, other):
+        return isinstance(other, ImageValidator)
+
+
+def validate_image(file):
+    config = get_config()
+    if file.size > config['MAX_UPLOAD_SIZE']:
+        raise ValidationError(size_error_message(config['MAX_UPLOAD_SIZE']), code='file_too_large')
+    file.seek(0)
+    try:
+        with Image.open(file) as image:  # reads the header only
+            image_format, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    finally:
+        file.seek(0)
+    if image_format not in config['FORMATS']:
+        raise ValidationError(
+            'Unsupported image format %(format)s.', code='invalid_format', params={'format': image_format},
+        )
+    if max(width, height) > config['MAX_DIMENSION']:
+        raise ValidationError(
+            'Images must be at most %(limit)d pixels wide and high.', code='image_too_large',
+            params={'limit': config['MAX_DIMENSION']},
+        )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(get_config()['WORKERS'], thread_name_prefix='bookshelf-images')
+        return _executor
+
+
+def run_job(func, *args):
+    # Worker threads get their own database connections; close them after each job.
+    close_old_connections()
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('Image job %s%r failed', func.__name__, args)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args):
+    """Run func(*args) in the thread pool; returns its Future, or None when run inline."""
+    if not get_config()['WORKERS']:
+        func(*args)
+        return None
+    return get_executor().submit(run_job, func, *args)
+
+
+def thumbnail_name(name, label, extension):
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, 'thumbs', f'{os.path.splitext(filename)[0]}_{label}.{extension}')
+
+
+def render_thumbnails(storage, name):
+    """Render every configured size of the stored image `name`; returns {label: {ext: name}}."""
+    config = get_config()
+    largest = max(config['SIZES'].values())
+    with storage.open(name) as file, Image.open(file) as image:
+        # JPEG can decode straight at a reduced scale instead of full resolution
+        image.draft('RGB', (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        transparent = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+        fallback = ('PNG', 'png') if transparent else ('JPEG', 'jpg')
+        variants = {}
+        for label, size in config['SIZES'].items():
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            variants[label] = {}
+            for image_format, extension in (('WEBP', 'webp'), fallback):
+                buffer = BytesIO()
+                thumbnail.save(buffer, image_format, quality=config['QUALITY'])
+                variants[label][extension] = storage.save(
+                    thumbnail_name(name, label, extension), ContentFile(buffer.getvalue()),
+                )
+    return variants
+
+
+def delete_thumbnails(storage, variants):
+    for names in variants.values():
+        for name in names.values():
+            storage.delete(name)
+
+
+def make_thumbnails(model, pk, field_name, name):
+    storage = model._meta.get_field(field_name).storage
+    variants = render_thumbnails(storage, name)
+    # Only record them if the photo was not replaced while we worked
+    updated = model._default_manager.filter(pk=pk, **{field_name: name}).update(
+        **{f'{field_name}_thumbnails': variants},
+    )
+    if not updated:
+        delete_thumbnails(storage, variants)
+    return variants
+
+
+def thumbnail_urls(instance, field_name, label):
+    """{'webp': url or None, 'src': url} for `label`, or None without a photo."""
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    names = getattr(instance, f'{field_name}_thumbnails').get(label)
+    if not names:
+        return {'webp': None, 'src': field_file.url}
+    storage = field_file.storage
+    fallback = names.get('jpg') or names.get('png')
+    return {'webp': storage.url(names['webp']), 'src': storage.url(fallback)}
+
+
+def track_image_field(model, field_name):
+    """
+    Render thumbnails whenever `model.<field_name>` gets a new image, and
+    drop the old thumbnails. The model needs a `<field_name>_thumbnails`
+    JSONField next to the image field.
+    """
+    thumbnails_field = f'{field_name}_thumbnails'
+    uid = f'{__name__}:{model._meta.label}.{field_name}'
+
+    def remember_image(sender, instance, **kwargs):
+        # Deferred loads are skipped: reading the field would cost a query
+        if field_name not in instance.get_deferred_fields():
+            instance.__dict__[uid] = (getattr(instance, field_name).name, getattr(instance, thumbnails_field))
+
+    def detect_change(sender, instance, **kwargs):
+        if field_name in instance.get_deferred_fields():
+            return
+        field_file = getattr(instance, field_name)
+        old_name, old_variants = instance.__dict__.get(uid, (None, {}))
+        # An uncommitted file is a fresh upload, even if it reuses the old name
+        if (field_file and not field_file._committed) or field_file.name != old_name:
+            setattr(instance, thumbnails_field, {})
+            instance.__dict__[uid + ':changed'] = old_variants
+
+    def schedule_thumbnails(sender, instance, using, **kwargs):
+        old_variants = instance.__dict__.pop(uid + ':changed', None)
+        if old_variants is None:
+            return
+        storage = model._meta.get_field(field_name).storage
+        name = getattr(instance, field_name).name
+        remember_image(sender, instance)
+
+        def start():
+            if old_variants:
+                submit(delete_thumbnails, storage, old_variants)
+            if name:
+                submit(make_thumbnails, model, instance.pk, field_name, name)
+        transaction.on_commit(start, using=using)
+
+    post_init.connect(remember_image, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(detect_change, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(schedule_thumbnails, sender=model, weak=False, dispatch_uid=uid)
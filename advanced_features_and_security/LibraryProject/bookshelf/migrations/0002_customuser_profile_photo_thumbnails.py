@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:26
+
+import bookshelf.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookshelf', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_photo_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_photo',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_photos/', validators=[bookshelf.images.ImageValidator()]),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .images import ImageValidator, thumbnail_urls
+
 
 class CustomUserManager(BaseUserManager):
     """Custom manager for CustomUser with email as unique identifier."""
@@ -32,13 +34,21 @@ class CustomUser(AbstractUser):
 
     email = models.EmailField(unique=True)
     date_of_birth = models.DateField(null=True, blank=True)
-    profile_photo = models.ImageField(upload_to="profile_photos/", null=True, blank=True)
+    profile_photo = models.ImageField(
+        upload_to="profile_photos/", null=True, blank=True, validators=[ImageValidator()]
+    )
+    # Filled in by the thumbnail workers (bookshelf/images.py): {size: {extension: stored name}}
+    profile_photo_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     objects = CustomUserManager()
 
     def __str__(self):
         return self.username
 
+    @property
+    def avatar(self):
+        return thumbnail_urls(self, "profile_photo", "medium")
+
 
 class Book(models.Model):
     """Model representing a book."""
@@ -53,6 +63,11 @@ class Book(models.Model):
             ("can_create", "Can create book"),
             ("can_delete", "Can delete book"),
         ]
+        indexes = [
+            # Admin changelist ordering and exact title/author lookups
+            models.Index(fields=["title"], name="bookshelf_book_title_idx"),
+            models.Index(fields=["author"], name="bookshelf_book_author_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.author}"
@@ -0,0 +1,5 @@
+from .images import track_image_field
+from .models import CustomUser
+
+# Thumbnails for uploaded profile photos (bookshelf.images)
+track_image_field(CustomUser, 'profile_photo')
@@ -1,3 +1,71 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from .images import StreamingImageUploadHandler, rejected_upload_errors
+from .models import CustomUser
+
+
+def make_image(size, mode="RGB", name="photo.png"):
+    buffer = BytesIO()
+    Image.new(mode, size, "blue").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ProfilePhotoTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root, BOOKSHELF_IMAGES={"WORKERS": 0, "MAX_UPLOAD_SIZE": 1024 * 1024}
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = CustomUser.objects.create_user(username="reader", email="reader@example.com", password="pw")
+
+    def save_photo(self, photo):
+        self.user.profile_photo = photo
+        self.user.full_clean()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    def test_thumbnails_are_rendered_after_commit(self):
+        self.assertIsNone(self.user.avatar)
+        self.save_photo(make_image((640, 480)))
+        user = CustomUser.objects.get(pk=self.user.pk)
+        storage = user.profile_photo.storage
+        with storage.open(user.profile_photo_thumbnails["small"]["webp"]) as file, Image.open(file) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (64, 64)))
+        self.assertEqual(user.avatar["src"], storage.url(user.profile_photo_thumbnails["medium"]["jpg"]))
+
+    def test_unrelated_saves_keep_thumbnails(self):
+        self.save_photo(make_image((100, 100)))
+        user = CustomUser.objects.get(pk=self.user.pk)
+        thumbnails = user.profile_photo_thumbnails
+        user.first_name = "Ada"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user.save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).profile_photo_thumbnails, thumbnails)
+
+    def test_invalid_images_are_rejected(self):
+        for photo, code in (
+            (make_image((5000, 10)), "image_too_large"),
+            (SimpleUploadedFile("fake.png", b"not an image"), "invalid_image"),
+        ):
+            self.user.profile_photo = photo
+            with self.assertRaises(ValidationError) as ctx:
+                self.user.full_clean()
+            self.assertEqual(ctx.exception.error_dict["profile_photo"][0].code, code)
+
+    def test_large_upload_is_dropped_while_streaming(self):
+        photo = SimpleUploadedFile("big.png", b"\0" * (1024 * 1024 + 1))
+        request = RequestFactory().post("/", {"profile_photo": photo})
+        request.upload_handlers = [StreamingImageUploadHandler(request)]
+        self.assertNotIn("profile_photo", request.FILES)
+        self.assertEqual(rejected_upload_errors(request), {"profile_photo": "Images must be at most 1 MB."})
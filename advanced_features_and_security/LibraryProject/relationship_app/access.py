@@ -0,0 +1,112 @@
+"""
+Per-user cache of everything the role views and permission checks ask about:
+the UserProfile role, group names and the full permission set.
+
+Without it `is_admin` runs a group query on every request and each
+`permission_required` check rebuilds the user's permission sets (two queries)
+for every request. With it, a warm user costs one cache read per request and
+no database queries. Entries are dropped by the signal handlers in
+relationship_app.signals whenever any of the inputs change.
+
+Signals only reach the process that made the change, and they only delete
+from the cache that process can see. Snapshots are kept in the cache named
+by ACCESS_CACHE_ALIAS: when that is a shared cache (Redis, Memcached, the
+database or file cache) one delete invalidates every process, and entries
+live for ACCESS_CACHE_TIMEOUT seconds. A LocMemCache is private to each
+process, so a role or permission revoked in one worker stays in effect on
+the others until their copy expires; snapshots in a local cache are
+therefore kept for at most ACCESS_CACHE_LOCAL_TIMEOUT seconds, which is the
+cross-process staleness window. Changes that send no signals (queryset
+update(), raw SQL) are picked up on expiry in either case.
+
+ACCESS_CACHE_ALIAS = 'default', ACCESS_CACHE_TIMEOUT = 3600 and
+ACCESS_CACHE_LOCAL_TIMEOUT = 5 in settings.py.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+CACHE_KEY = 'relationship_app:access:{}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'ACCESS_CACHE_ALIAS', 'default')]
+
+
+def get_timeout(cache):
+    """Seconds to keep a snapshot in `cache`; short when other processes cannot see deletes."""
+    timeout = getattr(settings, 'ACCESS_CACHE_TIMEOUT', 3600)
+    if isinstance(cache, LocMemCache):
+        local_timeout = getattr(settings, 'ACCESS_CACHE_LOCAL_TIMEOUT', 5)
+        if timeout is None or timeout > local_timeout:
+            return local_timeout
+    return timeout
+
+
+def load_access(user):
+    """Build the access snapshot for `user` from the database."""
+    from .models import UserProfile
+
+    backend = ModelBackend()
+    role = UserProfile.objects.filter(user=user).values_list('role', flat=True).first()
+    return {
+        'role': role,
+        'groups': frozenset(user.groups.values_list('name', flat=True)),
+        'user_perms': frozenset(backend.get_user_permissions(user)),
+        'group_perms': frozenset(backend.get_group_permissions(user)),
+    }
+
+
+def get_access(user):
+    """
+    Return the cached access snapshot for an active, authenticated user,
+    or None for anonymous/inactive users (who have no role, groups or perms).
+    The snapshot is also memoized on the user object for the rest of the request.
+    """
+    if not user.is_authenticated or not user.is_active:
+        return None
+    access = getattr(user, '_access_cache', None)
+    if access is None:
+        cache = get_cache()
+        key = CACHE_KEY.format(user.pk)
+        access = cache.get(key)
+        if access is None:
+            access = load_access(user)
+            cache.set(key, access, get_timeout(cache))
+        user._access_cache = access
+    return access
+
+
+def invalidate_access(*user_ids):
+    get_cache().delete_many([CACHE_KEY.format(pk) for pk in user_ids])
+
+
+def get_role(user):
+    access = get_access(user)
+    return access['role'] if access else None
+
+
+def in_group(user, name):
+    access = get_access(user)
+    return bool(access) and name in access['groups']
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose permission lookups read the cached snapshot instead of
+    querying user/group permissions on every request. Authentication itself is
+    unchanged.
+    """
+
+    def get_user_permissions(self, user_obj, obj=None):
+        access = get_access(user_obj) if obj is None else None
+        return set(access['user_perms']) if access else set()
+
+    def get_group_permissions(self, user_obj, obj=None):
+        access = get_access(user_obj) if obj is None else None
+        return set(access['group_perms']) if access else set()
+
+    def get_all_permissions(self, user_obj, obj=None):
+        access = get_access(user_obj) if obj is None else None
+        return set(access['user_perms'] | access['group_perms']) if access else set()
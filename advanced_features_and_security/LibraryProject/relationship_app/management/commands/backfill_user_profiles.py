@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from relationship_app.models import UserProfile
+
+class Command(BaseCommand):
+    help = (
+        'Create a UserProfile for every user that has none, e.g. after a bulk user import. '
+        'Runs as a single INSERT ... SELECT, so existing profiles are never touched.'
+    )
+
+    def add_arguments(self, parser):
+        role_choices = [value for value, _ in UserProfile.ROLE_CHOICES]
+        parser.add_argument('--role', default='Member', choices=role_choices, help='Role for the new profiles.')
+
+    def handle(self, *args, **options):
+        created = UserProfile.objects.create_missing(role=options['role'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} user profiles.'))
@@ -0,0 +1,107 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from relationship_app import services
+from relationship_app.models import Author, Book, Librarian, Library
+
+
+def two_query_books_by_author(author_name):
+    # The original query_samples lookup, kept as the baseline.
+    author = Author.objects.get(name=author_name)
+    return [book.title for book in Book.objects.filter(author=author)]
+
+
+def two_query_librarian_for_library(library_name):
+    library = Library.objects.get(name=library_name)
+    return Librarian.objects.get(library=library).name
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the two-query query_samples lookups against relationship_app.services '
+        '(single-query and batch). Seeds data inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=2_000)
+        parser.add_argument('--books-per-author', type=int, default=10)
+        parser.add_argument('--libraries', type=int, default=500)
+        parser.add_argument('--lookups', type=int, default=200, help='Names looked up per timed run.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path; the best is reported.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors, libraries = self.seed(options)
+            lookups = options['lookups']
+            author_sample = authors[:: max(len(authors) // lookups, 1)][:lookups]
+            library_sample = libraries[:: max(len(libraries) // lookups, 1)][:lookups]
+            author_names = [author.name for author in author_sample]
+            library_names = [library.name for library in library_sample]
+
+            paths = [
+                ('books: two queries each', lambda: [two_query_books_by_author(n) for n in author_names],
+                 [two_query_books_by_author(n) for n in author_names]),
+                ('books: one query each', lambda: [services.books_by_author(n) for n in author_names], None),
+                ('books: one batch query', lambda: list(services.books_by_authors(a.pk for a in author_sample).values()), None),
+                ('librarian: two queries each', lambda: [two_query_librarian_for_library(n) for n in library_names],
+                 [two_query_librarian_for_library(n) for n in library_names]),
+                ('librarian: one query each', lambda: [services.librarian_for_library(n)[1] for n in library_names], None),
+                ('librarian: one batch query',
+                 lambda: list(services.librarians_for_libraries(lib.pk for lib in library_sample).values()), None),
+            ]
+
+            expected = None
+            for label, func, baseline in paths:
+                if baseline is not None:
+                    expected = baseline
+                elif func() != expected:
+                    raise CommandError(f'{label} returned different results from the baseline.')
+                with CaptureQueriesContext(connection) as queries:
+                    func()
+                best = min(self.time(func) for _ in range(options['repeat']))
+                self.stdout.write(
+                    f'{label:>28}: {best * 1000:8.1f} ms for {lookups} lookups, {len(queries)} queries'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        authors = Author.objects.bulk_create(
+            (Author(name=f'Author {i:06d}') for i in range(options['authors'])), batch_size=1000
+        )
+        per_author = options['books_per_author']
+        books = Book.objects.bulk_create(
+            (
+                Book(title=f'Book {i:06d}-{j:03d}', author=author)
+                for i, author in enumerate(authors)
+                for j in range(per_author)
+            ),
+            batch_size=1000,
+        )
+        libraries = Library.objects.bulk_create(
+            (Library(name=f'Library {i:05d}') for i in range(options['libraries'])), batch_size=1000
+        )
+        Librarian.objects.bulk_create(
+            (Librarian(name=f'Librarian {i:05d}', library=library) for i, library in enumerate(libraries)),
+            batch_size=1000,
+        )
+        if not books:
+            raise CommandError('Nothing to benchmark; pass --books-per-author > 0.')
+        Library.books.through.objects.bulk_create(
+            (
+                Library.books.through(library_id=library.pk, book_id=books[(i * 7 + k) % len(books)].pk)
+                for i, library in enumerate(libraries)
+                for k in range(20)
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        return authors, libraries
+
+    @staticmethod
+    def time(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
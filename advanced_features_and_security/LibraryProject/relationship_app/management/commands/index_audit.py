@@ -0,0 +1,82 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import RequestFactory
+
+from bookshelf.admin import BookAdmin
+from bookshelf.models import Book as ShelfBook
+from relationship_app.models import Author, Book, Librarian, Library
+from relationship_app.views import LIBRARY_BOOKS_PER_PAGE, LibraryDetailView, library_books
+
+# SQLite: "SCAN relationship_app_book" is a table scan; "SCAN ... USING [COVERING] INDEX" walks an index.
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING| VIRTUAL TABLE)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def audited_querysets():
+    """
+    (label, queryset) for the lookups in relationship_app.services and views and
+    the bookshelf admin changelist. Admin ?q= search is left out on purpose:
+    icontains cannot use a b-tree index on any backend.
+    """
+    detail = LibraryDetailView()
+    detail.setup(RequestFactory().get("/"), pk=1)
+    return [
+        ("author by name", Author.objects.filter(name="Jane Doe").values_list("books__title", flat=True)),
+        ("library by name", Library.objects.filter(name="City Library").values_list("books__title", flat=True)),
+        ("librarian by library name",
+         Library.objects.filter(name="City Library").values_list("librarian__name", flat=True)[:1]),
+        ("books for authors", Book.objects.filter(author_id__in=[1, 2]).values_list("author_id", "title")),
+        ("librarians for libraries", Librarian.objects.filter(library_id__in=[1, 2]).values_list("library_id", "name")),
+        ("library detail", detail.get_queryset().filter(pk=1)),
+        ("library detail: books page",
+         library_books(1).filter(book_id__gt=0).select_related("book__author")[:LIBRARY_BOOKS_PER_PAGE + 1]),
+        ("bookshelf admin changelist", ShelfBook.objects.order_by(*BookAdmin.ordering)[:BookAdmin.list_per_page]),
+        ("bookshelf book by author", ShelfBook.objects.filter(author="Jane Doe")),
+    ]
+
+
+def full_scans(queryset):
+    """
+    Return (plan, tables read in full) for `queryset`, or (None, None) if the
+    backend is not supported. PostgreSQL is told to avoid sequential scans, so
+    one only shows up when no index can serve the query at all (and a handful
+    of test rows can't make a seq scan look cheaper).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "sqlite":
+        plan = queryset.explain()
+        return plan, SQLITE_SCAN.findall(plan)
+    if connection.vendor == "postgresql":
+        with transaction.atomic(using=queryset.db):
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        return plan, POSTGRES_SCAN.findall(plan)
+    return None, None
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the querysets behind the library views, services and admin and fail if any of them "
+        "scans a table in full. Runs in the test suite, so a lookup that loses its index breaks the build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--show-plans", action="store_true", help="Print every query plan.")
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in audited_querysets():
+            plan, scans = full_scans(queryset)
+            if plan is None:
+                self.stdout.write(f"Skipping index audit: {connections[queryset.db].vendor} is not supported.")
+                return
+            if options["show_plans"]:
+                self.stdout.write(f"{label}:\n{plan}\n")
+            if scans:
+                failures.append(f"{label}: full scan of {', '.join(sorted(set(scans)))}")
+        if failures:
+            raise CommandError("Full table scans found:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No full table scans."))
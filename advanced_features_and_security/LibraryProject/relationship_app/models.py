@@ -1,5 +1,5 @@
-from django.db import models
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import connections, models, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -7,6 +7,10 @@ from django.dispatch import receiver
 class Author(models.Model):
     name = models.CharField(max_length=100)
 
+    class Meta:
+        # query_samples / services look authors up by name
+        indexes = [models.Index(fields=["name"], name="relationship_author_name_idx")]
+
     def __str__(self):
         return self.name
 
@@ -30,6 +34,9 @@ class Library(models.Model):
     name = models.CharField(max_length=100)
     books = models.ManyToManyField(Book, related_name="libraries")
 
+    class Meta:
+        indexes = [models.Index(fields=["name"], name="relationship_library_name_idx")]
+
     def __str__(self):
         return self.name
 
@@ -42,23 +49,84 @@ class Librarian(models.Model):
         return self.name
 
 
+class UserProfileManager(models.Manager):
+    def bulk_create_users(self, users, role='Member', batch_size=None):
+        """
+        Insert `users` with bulk_create and give each one a profile in a second
+        bulk insert. bulk_create sends no post_save, so this is the import path
+        that keeps the one-profile-per-user invariant without a query per row.
+        """
+        User = self.model._meta.get_field('user').related_model
+        with transaction.atomic(using=self.db):
+            users = User.objects.bulk_create(users, batch_size=batch_size)
+            self.bulk_create(
+                [self.model(user_id=user.pk, role=role) for user in users],
+                batch_size=batch_size,
+            )
+        return users
+
+    def create_missing(self, role='Member'):
+        """Create profiles for every user without one in a single INSERT ... SELECT."""
+        meta = self.model._meta
+        user_field = meta.get_field('user')
+        user_meta = user_field.related_model._meta
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        user_id, user_pk = qn(user_field.column), qn(user_meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {qn(meta.db_table)} ({user_id}, {qn(meta.get_field("role").column)}) '
+                f'SELECT u.{user_pk}, %s FROM {qn(user_meta.db_table)} u '
+                f'WHERE NOT EXISTS (SELECT 1 FROM {qn(meta.db_table)} p WHERE p.{user_id} = u.{user_pk})',
+                [role],
+            )
+            return cursor.rowcount
+
+
 class UserProfile(models.Model):
     ROLE_CHOICES = (
         ('Admin', 'Admin'),
         ('Librarian', 'Librarian'),
         ('Member', 'Member'),
     )
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='Member')
 
+    objects = UserProfileManager()
+
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+
+    def get_changed_fields(self):
+        """Field names edited since the profile was loaded or last saved."""
+        loaded = getattr(self, '_loaded_values', None)
+        fields = [f.attname for f in self._meta.concrete_fields if not f.primary_key]
+        if loaded is None:
+            return fields
+        return [name for name in fields if name in loaded and getattr(self, name) != loaded[name]]
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def save_user_profile(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
     if created:
         UserProfile.objects.create(user=instance)
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
\ No newline at end of file
+        return
+    # Persist edits made through user.userprofile before user.save(), but never
+    # fetch the profile just to re-save it: logins only touch last_login.
+    if type(instance).userprofile.is_cached(instance):
+        profile = instance.userprofile
+        changed = profile.get_changed_fields()
+        if changed:
+            profile.save(update_fields=changed)
@@ -1,33 +1,27 @@
-from relationship_app.models import Author, Book, Library, Librarian
+from relationship_app import services
 
 def query_books_by_author(author_name):
-    try:
-        author = Author.objects.get(name=author_name)
-        books = Book.objects.filter(author=author)
-        return [book.title for book in books]
-    except Author.DoesNotExist:
+    books = services.books_by_author(author_name)
+    if books is None:
         return f"No author found with name {author_name}"
+    return books
 
 def query_books_in_library(library_name):
-    try:
-        library = Library.objects.get(name=library_name)
-        books = library.books.all()
-        return [book.title for book in books]
-    except Library.DoesNotExist:
+    books = services.books_in_library(library_name)
+    if books is None:
         return f"No library found with name {library_name}"
+    return books
 
 def query_librarian_for_library(library_name):
-    try:
-        library = Library.objects.get(name=library_name)
-        librarian = Librarian.objects.get(library=library)
-        return librarian.name
-    except Library.DoesNotExist:
+    found, librarian = services.librarian_for_library(library_name)
+    if not found:
         return f"No library found with name {library_name}"
-    except Librarian.DoesNotExist:
+    if librarian is None:
         return f"No librarian assigned to {library_name}"
+    return librarian
 
 # Example usage
 if __name__ == "__main__":
     print("Books by Author 'Jane Doe':", query_books_by_author("Jane Doe"))
     print("Books in Library 'City Library':", query_books_in_library("City Library"))
-    print("Librarian for Library 'City Library':", query_librarian_for_library("City Library"))
\ No newline at end of file
+    print("Librarian for Library 'City Library':", query_librarian_for_library("City Library"))
@@ -0,0 +1,69 @@
+"""
+Inventory lookups for relationship_app, one query each.
+
+The query_samples versions fetch the parent row and then its children (two
+round trips per lookup). These join from the parent with values_list instead.
+The LEFT JOIN still tells "no such author/library" apart from "nothing
+related". The batch variants answer N lookups with one query and return dicts.
+"""
+from collections import defaultdict
+
+from .models import Author, Book, Librarian, Library
+
+
+def books_by_author(author_name):
+    """Titles by the named author, or None if there is no such author."""
+    rows = list(Author.objects.filter(name=author_name).values_list('books__title', flat=True))
+    if not rows:
+        return None
+    return [title for title in rows if title is not None]
+
+
+def books_in_library(library_name):
+    """Titles held by the named library, or None if there is no such library."""
+    rows = list(Library.objects.filter(name=library_name).values_list('books__title', flat=True))
+    if not rows:
+        return None
+    return [title for title in rows if title is not None]
+
+
+def librarian_for_library(library_name):
+    """
+    (library exists, librarian name) for the named library. The name is None
+    when the library has no librarian.
+    """
+    rows = list(Library.objects.filter(name=library_name).values_list('librarian__name', flat=True)[:1])
+    return (True, rows[0]) if rows else (False, None)
+
+
+def books_by_authors(author_ids):
+    """{author_id: [titles]} for every id given; authors without books map to []."""
+    author_ids = list(author_ids)
+    books = {author_id: [] for author_id in author_ids}
+    rows = Book.objects.filter(author_id__in=author_ids).order_by('author_id', 'pk').values_list('author_id', 'title')
+    for author_id, title in rows:
+        books[author_id].append(title)
+    return books
+
+
+def books_in_libraries(library_ids):
+    """{library_id: [titles]} for every id given, read from the M2M join in one query."""
+    library_ids = list(library_ids)
+    books = defaultdict(list)
+    rows = (
+        Library.books.through.objects
+        .filter(library_id__in=library_ids)
+        .order_by('library_id', 'book_id')
+        .values_list('library_id', 'book__title')
+    )
+    for library_id, title in rows:
+        books[library_id].append(title)
+    return {library_id: books[library_id] for library_id in library_ids}
+
+
+def librarians_for_libraries(library_ids):
+    """{library_id: librarian name or None} for every id given."""
+    library_ids = list(library_ids)
+    librarians = dict.fromkeys(library_ids)
+    librarians.update(Librarian.objects.filter(library_id__in=library_ids).values_list('library_id', 'name'))
+    return librarians
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .access import invalidate_access
+from .models import UserProfile
+
+User = get_user_model()
+
+
+def group_member_ids(group_ids):
+    return list(User.objects.filter(groups__in=group_ids).values_list('pk', flat=True).distinct())
+
+
+# Cached access snapshots (relationship_app.access) are dropped whenever a
+# user's role, groups, direct permissions or group permissions change.
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # is_active / is_superuser feed into the permission set; a login's
+    # last_login update changes neither.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_access(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_access(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_access(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear() / permission.user_set.clear(): members are unknown afterwards
+        invalidate_access(*instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_access(*pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_access(*group_member_ids([instance.pk]))
+    elif action == 'pre_clear':
+        invalidate_access(*group_member_ids(instance.group_set.values_list('pk', flat=True)))
+    else:
+        invalidate_access(*group_member_ids(pk_set))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Memberships are removed by cascade, which sends no m2m_changed
+    invalidate_access(*group_member_ids([instance.pk]))
@@ -1,3 +1,245 @@
-from django.test import TestCase
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import services
+from .access import get_access, get_cache, get_role, get_timeout
+from .models import Author, Book, Librarian, Library, UserProfile
+from .management.commands.index_audit import full_scans
+from .query_samples import query_books_by_author, query_books_in_library, query_librarian_for_library
+from .views import LIBRARY_BOOKS_PER_PAGE, is_admin
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AccessCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="reader", email="reader@example.com", password="pw"
+        )
+        self.add_perm = Permission.objects.get(codename="can_add_book")
+        self.admins = Group.objects.create(name="Admin")
+
+    def fresh_user(self):
+        # A new instance, like the one AuthenticationMiddleware loads per request
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_checks_are_query_free_after_warm_up(self):
+        self.user.user_permissions.add(self.add_perm)
+        get_access(self.fresh_user())
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm("relationship_app.can_add_book"))
+            self.assertFalse(user.has_perm("relationship_app.can_delete_book"))
+            self.assertFalse(is_admin(user))
+            self.assertEqual(get_role(user), "Member")
+
+    def test_role_view_skips_auth_queries_when_warm(self):
+        self.user.groups.add(self.admins)
+        self.client.force_login(self.user)
+        self.client.get(reverse("admin_view"))
+
+        # Only the request.user row is loaded; session, groups and role come from cache.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("admin_view"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_role_views_use_profile_role(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("member_view")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("librarian_view")).status_code, 302)
+
+        profile = self.user.userprofile
+        profile.role = "Librarian"
+        profile.save()
+        self.assertEqual(self.client.get(reverse("librarian_view")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("member_view")).status_code, 302)
+
+    def test_group_membership_invalidates(self):
+        self.assertFalse(is_admin(self.fresh_user()))
+        self.user.groups.add(self.admins)
+        self.assertTrue(is_admin(self.fresh_user()))
+        self.admins.user_set.clear()
+        self.assertFalse(is_admin(self.fresh_user()))
+
+    def test_group_permission_changes_invalidate(self):
+        self.user.groups.add(self.admins)
+        self.assertFalse(self.fresh_user().has_perm("relationship_app.can_add_book"))
+
+        self.admins.permissions.add(self.add_perm)
+        self.assertTrue(self.fresh_user().has_perm("relationship_app.can_add_book"))
+
+        self.add_perm.group_set.remove(self.admins)
+        self.assertFalse(self.fresh_user().has_perm("relationship_app.can_add_book"))
+
+        self.admins.permissions.add(self.add_perm)
+        self.fresh_user().has_perm("relationship_app.can_add_book")
+        self.admins.delete()
+        self.assertFalse(self.fresh_user().has_perm("relationship_app.can_add_book"))
+
+    def test_user_permission_changes_invalidate(self):
+        self.assertFalse(self.fresh_user().has_perm("relationship_app.can_add_book"))
+        self.add_perm.user_set.add(self.user)
+        self.assertTrue(self.fresh_user().has_perm("relationship_app.can_add_book"))
+        self.user.user_permissions.clear()
+        self.assertFalse(self.fresh_user().has_perm("relationship_app.can_add_book"))
+
+    def test_local_cache_keeps_snapshots_briefly(self):
+        # Another worker's LocMemCache never sees this process's invalidations
+        self.assertEqual(get_timeout(get_cache()), 5)
+        with override_settings(ACCESS_CACHE_TIMEOUT=None):
+            self.assertEqual(get_timeout(get_cache()), 5)
+        with override_settings(ACCESS_CACHE_TIMEOUT=2):
+            self.assertEqual(get_timeout(get_cache()), 2)
+
+    def test_shared_cache_uses_full_timeout(self):
+        shared = {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "access_cache",
+        }
+        with override_settings(
+            CACHES={**settings.CACHES, "shared": shared}, ACCESS_CACHE_ALIAS="shared"
+        ):
+            self.assertEqual(get_timeout(get_cache()), 3600)
+
+
+class UserProfileSignalTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="member", email="member@example.com", password="pw"
+        )
+
+    def test_create_user_creates_profile(self):
+        self.assertEqual(UserProfile.objects.get(user=self.user).role, "Member")
+
+    def test_login_save_does_not_touch_profile(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+
+    def test_unchanged_loaded_profile_is_not_rewritten(self):
+        user = get_user_model().objects.select_related("userprofile").get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_profile_edits_are_saved_with_user(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.userprofile.role = "Librarian"
+        with self.assertNumQueries(2):
+            user.save()
+        self.assertEqual(UserProfile.objects.get(user=user).role, "Librarian")
+
+    def test_bulk_create_users_adds_profiles(self):
+        User = get_user_model()
+        users = [User(username=f"import{i}", email=f"import{i}@example.com") for i in range(50)]
+        with CaptureQueriesContext(connection) as ctx:
+            UserProfile.objects.bulk_create_users(users, role="Librarian")
+        inserts = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(UserProfile.objects.filter(role="Librarian").count(), 50)
+
+    def test_backfill_command_creates_missing_profiles(self):
+        User = get_user_model()
+        User.objects.bulk_create(
+            [User(username=f"bare{i}", email=f"bare{i}@example.com") for i in range(5)]
+        )
+        out = StringIO()
+        call_command("backfill_user_profiles", stdout=out)
+        self.assertIn("Created 5 user profiles.", out.getvalue())
+        self.assertEqual(UserProfile.objects.count(), User.objects.count())
+        self.assertEqual(UserProfile.objects.create_missing(), 0)
+
+
+class InventoryServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.jane = Author.objects.create(name="Jane Doe")
+        cls.idle = Author.objects.create(name="No Books")
+        cls.books = [Book.objects.create(title=f"Book {i}", author=cls.jane) for i in range(3)]
+        cls.city = Library.objects.create(name="City Library")
+        cls.city.books.set(cls.books[:2])
+        cls.branch = Library.objects.create(name="Branch")
+        Librarian.objects.create(name="Ann", library=cls.city)
+
+    def test_single_lookups_use_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(query_books_by_author("Jane Doe"), ["Book 0", "Book 1", "Book 2"])
+        with self.assertNumQueries(1):
+            self.assertEqual(query_librarian_for_library("City Library"), "Ann")
+        with self.assertNumQueries(1):
+            self.assertEqual(sorted(query_books_in_library("City Library")), ["Book 0", "Book 1"])
+
+    def test_missing_rows_keep_messages(self):
+        self.assertEqual(query_books_by_author("No Books"), [])
+        self.assertEqual(query_books_by_author("Nobody"), "No author found with name Nobody")
+        self.assertEqual(query_librarian_for_library("Branch"), "No librarian assigned to Branch")
+        self.assertEqual(query_librarian_for_library("Nowhere"), "No library found with name Nowhere")
+
+    def test_batch_lookups_use_one_query(self):
+        with self.assertNumQueries(1):
+            books = services.books_by_authors([self.jane.pk, self.idle.pk])
+        self.assertEqual(books, {self.jane.pk: ["Book 0", "Book 1", "Book 2"], self.idle.pk: []})
+        with self.assertNumQueries(1):
+            librarians = services.librarians_for_libraries([self.city.pk, self.branch.pk])
+        self.assertEqual(librarians, {self.city.pk: "Ann", self.branch.pk: None})
+        with self.assertNumQueries(1):
+            holdings = services.books_in_libraries([self.city.pk, self.branch.pk])
+        self.assertEqual(holdings, {self.city.pk: ["Book 0", "Book 1"], self.branch.pk: []})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LibraryDetailViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name="Jane Doe")
+        cls.books = Book.objects.bulk_create(
+            Book(title=f"Book {i:03d}", author=author) for i in range(LIBRARY_BOOKS_PER_PAGE + 5)
+        )
+        cls.library = Library.objects.create(name="Branch")
+        cls.library.books.set(cls.books)
+
+    def test_pages_books_with_count_in_two_queries(self):
+        url = reverse("library_detail", args=[self.library.pk])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.context["library"].book_count, len(self.books))
+        self.assertEqual(len(response.context["books"]), LIBRARY_BOOKS_PER_PAGE)
+        next_after = response.context["next_after"]
+        self.assertEqual(next_after, self.books[LIBRARY_BOOKS_PER_PAGE - 1].pk)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"after": next_after})
+        self.assertEqual([b.pk for b in response.context["books"]], [b.pk for b in self.books[-5:]])
+        self.assertIsNone(response.context["next_after"])
+
+    def test_json_variant_streams_every_book(self):
+        response = self.client.get(reverse("library_books_json", args=[self.library.pk]))
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(data["book_count"], len(self.books))
+        self.assertEqual([b["id"] for b in data["books"]], [b.pk for b in self.books])
+        self.assertEqual(data["books"][0], {"id": self.books[0].pk, "title": "Book 000", "author": "Jane Doe"})
+
+
+class IndexAuditTests(TestCase):
+    def test_views_and_services_do_not_scan_tables(self):
+        out = StringIO()
+        call_command("index_audit", stdout=out)
+        self.assertIn("No full table scans.", out.getvalue())
+
+    def test_unindexed_lookup_is_flagged(self):
+        plan, scans = full_scans(Book.objects.filter(title="Dune"))
+        if plan is None:
+            self.skipTest("index audit does not support this database backend")
+        self.assertEqual(scans, ["relationship_app_book"])
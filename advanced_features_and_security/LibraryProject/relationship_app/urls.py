@@ -9,6 +9,7 @@ urlpatterns = [
 
     # Class-based view
     path("library/<int:pk>/", LibraryDetailView.as_view(), name="library_detail"),
+    path("library/<int:pk>/books.json", views.library_books_json, name="library_books_json"),
 
     # Authentication
     path("register/", views.register_view, name="register"),
@@ -30,7 +31,9 @@ urlpatterns = [
     
     # Admin-only view
     path("admin-only/", views.admin_view, name="admin_view"),
-    path('add_book/', add_book, name='add_book'),
-    path('edit_book/<int:pk>/', edit_book, name='edit_book'),
-    path('delete_book/<int:pk>/', delete_book, name='delete_book'),
+    path("librarian-only/", views.librarian_view, name="librarian_view"),
+    path("member-only/", views.member_view, name="member_view"),
+    path('add_book/', views.add_book, name='add_book'),
+    path('edit_book/<int:pk>/', views.edit_book, name='edit_book'),
+    path('delete_book/<int:pk>/', views.delete_book, name='delete_book'),
 ]
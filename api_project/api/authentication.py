@@ -0,0 +1,146 @@
+"""
+Token authentication with an in-process cache of token -> (user, token).
+
+DRF's TokenAuthentication runs `Token.objects.select_related('user').get(key=...)`
+on every authenticated request. CachedTokenAuthentication keeps the result
+in a TokenCache instead, so a repeated token costs no query at all:
+
+* entries expire TIMEOUT seconds after they were loaded;
+* at most MAX_SIZE tokens are kept, the least recently used going first;
+* deleting or replacing a token, and saving or deleting its user (which is
+  how a user is deactivated or has their permissions changed), drops the
+  cached entries through the model signals below.
+
+Each process has its own cache and only sees its own signals, so a change
+made elsewhere (another server process, or a queryset update() that sends
+no signals) is picked up when the entry expires. Keep TIMEOUT as short as
+that window may be. Every request gets its own copy of the cached user, so
+permission caches and attributes set during one request do not leak into
+the next.
+
+API_TOKEN_CACHE = {'TIMEOUT': 60, 'MAX_SIZE': 10000} in settings.py.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+
+DEFAULTS = {
+    'TIMEOUT': 60,  # seconds
+    'MAX_SIZE': 10000,  # tokens
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_TOKEN_CACHE', {})}
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> (user, token), with a TTL per entry."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires, user, token), least recently used first
+        self.user_keys = {}  # user pk -> {key, ...}, for invalidating by user
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation, so a lookup that raced one is not stored
+        self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, key, user, token, generation):
+        """Store a lookup started at `generation`, unless something was invalidated since."""
+        config = get_config()
+        with self.lock:
+            if generation != self.generation:
+                return
+            self._remove(key)
+            self.entries[key] = (time.monotonic() + config['TIMEOUT'], user, token)
+            self.user_keys.setdefault(user.pk, set()).add(key)
+            while len(self.entries) > config['MAX_SIZE']:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            self.generation += 1
+            self._remove(key)
+
+    def delete_user(self, user_pk):
+        with self.lock:
+            self.generation += 1
+            for key in list(self.user_keys.get(user_pk, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.user_keys.clear()
+            self.hits = self.misses = 0
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            keys = self.user_keys.get(entry[1].pk)
+            keys.discard(key)
+            if not keys:
+                del self.user_keys[entry[1].pk]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves each token from token_cache, going to
+    the database only on a miss. Unknown tokens and inactive users are never
+    cached, so they fail exactly as before.
+    """
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        generation = self.cache.generation
+        cached = self.cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            self.cache.set(key, user, token, generation)
+            cached = user, token
+        user, token = (copy.copy(obj) for obj in cached)
+        token.user = user
+        return user, token
+
+
+@receiver(post_save, sender='authtoken.Token', dispatch_uid='api.authentication.token_saved')
+def drop_replaced_tokens(sender, instance, **kwargs):
+    # A regenerated token is a new row; the user's old one may still be cached
+    token_cache.delete_user(instance.user_id)
+
+
+@receiver(post_delete, sender='authtoken.Token', dispatch_uid='api.authentication.token_deleted')
+def drop_deleted_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='api.authentication.user_saved')
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid='api.authentication.user_deleted')
+def drop_user_tokens(sender, instance, **kwargs):
+    token_cache.delete_user(instance.pk)
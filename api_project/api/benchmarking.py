@@ -0,0 +1,180 @@
+"""
+Throughput/latency harness used by the `benchmark_api` management command.
+
+Requests are sent through two drivers:
+
+* `client`: django.test.Client, in process, no sockets. This measures the
+  view stack alone.
+* `wsgi`: a threaded WSGI server (the one runserver uses) on a free local
+  port, hit over HTTP with http.client. This adds request parsing, the
+  WSGI layer and the socket round trip.
+
+Query counts come from the Server-Timing header written by
+api.instrumentation.RequestMetricsMiddleware, so both drivers report them.
+
+Results are plain JSON: one entry per (scenario, driver), with p50/p99/mean
+latency in ms, requests/sec, rows/sec and queries per request. A later run
+can be compared against a saved file with `compare_results`.
+"""
+import http.client
+import json
+import math
+import platform
+import re
+import statistics
+import threading
+import time
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.test import Client
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class Scenario:
+    """
+    One endpoint to benchmark. `request(n)` returns (method, path, body) for
+    the n-th iteration, so scenarios can walk ids or vary filters.
+    `rows(payload)` counts the rows a response carried.
+    """
+
+    def __init__(self, name, request, rows=None, expected_status=200):
+        self.name = name
+        self.request = request
+        self.rows = rows or count_rows
+        self.expected_status = expected_status
+
+
+def count_rows(payload):
+    if isinstance(payload, dict) and isinstance(payload.get('results'), list):
+        return len(payload['results'])
+    if isinstance(payload, list):
+        return len(payload)
+    return 1
+
+
+def make_client(headers):
+    # SERVER_NAME: outside the test runner ALLOWED_HOSTS does not include 'testserver'.
+    return Client(headers={'Accept': 'application/json', **headers}, SERVER_NAME='localhost')
+
+
+class ClientDriver:
+    name = 'client'
+
+    def __init__(self, headers):
+        self.client = make_client(headers)
+
+    def send(self, method, path, body):
+        kwargs = {'content_type': 'application/json', 'data': json.dumps(body)} if body is not None else {}
+        response = getattr(self.client, method.lower())(path, **kwargs)
+        return response.status_code, response.content, response.get('Server-Timing', '')
+
+    def close(self):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGIDriver:
+    name = 'wsgi'
+
+    def __init__(self, headers):
+        self.headers = {'Accept': 'application/json', **headers}
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        self.server.set_app(WSGIHandler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1])
+
+    def send(self, method, path, body):
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        # The runserver handler closes after every response
+        self.connection.close()
+        return response.status, content, response.getheader('Server-Timing', '')
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        connections.close_all()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def run_scenario(driver, scenario, requests, warmup):
+    latencies, queries, rows = [], [], 0
+    for n in range(warmup + requests):
+        method, path, body = scenario.request(n)
+        started = time.perf_counter()
+        status, content, timing = driver.send(method, path, body)
+        elapsed = time.perf_counter() - started
+        if status != scenario.expected_status:
+            raise RuntimeError(f'{scenario.name}: {method} {path} returned {status}: {content[:200]!r}')
+        if n < warmup:
+            continue
+        latencies.append(elapsed)
+        match = QUERIES_RE.search(timing)
+        if match:
+            queries.append(int(match.group(1)))
+        rows += scenario.rows(json.loads(content)) if content else 0
+    total = sum(latencies)
+    return {
+        'scenario': scenario.name,
+        'driver': driver.name,
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'requests_per_sec': round(requests / total, 1),
+        'rows_per_sec': round(rows / total, 1),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connections['default'].vendor,
+        'platform': platform.platform(),
+    }
+
+
+def compare_results(current, baseline, tolerance):
+    """
+    Return a message for every (scenario, driver) whose p50 grew by more than
+    `tolerance` (0.2 = 20%) or that now runs more queries per request.
+    """
+    previous = {(r['scenario'], r['driver']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['scenario'], result['driver']))
+        if before is None:
+            continue
+        if result['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']} [{result['driver']}]: p50 {before['p50_ms']} -> {result['p50_ms']} ms"
+            )
+        if (result['queries_per_request'] or 0) > (before['queries_per_request'] or 0):
+            regressions.append(
+                f"{result['scenario']} [{result['driver']}]: queries/request "
+                f"{before['queries_per_request']} -> {result['queries_per_request']}"
+            )
+    return regressions
@@ -0,0 +1,225 @@
+"""
+Per-request SQL and timing instrumentation.
+
+RequestMetricsMiddleware installs a QueryCollector as an execute wrapper on
+every database connection for the duration of a request. It then records:
+
+* the number of queries, total time spent in the database, and SQL
+  statements that ran more than once (usually an N+1);
+* the time spent serializing: `.data` of serializers built on
+  TimedSerializerMixin, and ValuesSerializer.to_representation;
+* the time spent rendering: from process_template_response to the
+  post-render callback (the DRF renderer, TemplateResponse), plus templates
+  rendered any other way, e.g. by render(), when TEMPLATES uses
+  TimedDjangoTemplates;
+* the total time in the view stack.
+
+Code outside the middleware adds to the current request's timings with
+`timed('serialize')` / `timed('render')`; the request is found through a
+context variable.
+
+The numbers go out as a `Server-Timing` header (visible in browser dev tools)
+and as one JSON log line per request on this module's logger. They are also
+stored on `request.request_metrics` for tests.
+
+Views declare how many queries they may run with `query_budget = N` on the
+class, or the `query_budget(N)` decorator for function views. Requests over
+budget are logged as warnings, and QueryBudgetTestMixin fails the test.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# The timings of the request being handled: {'render': s, 'serialize': s, 'active': {name, ...}}
+_current_timings = ContextVar('request_metrics_timings', default=None)
+
+
+class QueryCollector:
+    """connection.execute_wrapper callable that counts and times every query."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """{sql: times run} for statements executed more than once."""
+        return {sql: count for sql, count in self.statements.items() if count > 1}
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the current request's `name` timing.
+    A block inside another one of the same name counts once; outside a
+    request this does nothing.
+    """
+    timings = _current_timings.get()
+    if timings is None or name in timings['active']:
+        yield
+        return
+    timings['active'].add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] += time.perf_counter() - started
+        timings['active'].discard(name)
+
+
+class TimedSerializerMixin:
+    """Serializer mixin: building `.data` counts as serialization time."""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """list_serializer_class for serializers on TimedSerializerMixin, so many=True is timed too."""
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('render'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with every render counted as rendering time."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def query_budget(budget):
+    """Declare the maximum number of queries a function view may run."""
+    def decorator(view_func):
+        view_func.query_budget = budget
+        return view_func
+    return decorator
+
+
+def get_view_budget(view_func):
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        # as_view() functions carry their class as view_class (Django and DRF alike)
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    return budget
+
+
+class RequestMetricsMiddleware:
+    """
+    Collects per-request query/timing metrics. Place it first in MIDDLEWARE
+    so that session and authentication queries are counted too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        request._metrics_state = {'collector': collector, 'view': None, 'budget': None}
+        timings = {'render': 0.0, 'serialize': 0.0, 'active': set()}
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(collector))
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        total = time.perf_counter() - started
+
+        state = request._metrics_state
+        metrics = {
+            'method': request.method,
+            'path': request.path,
+            'view': state['view'],
+            'status': response.status_code,
+            'queries': collector.count,
+            'budget': state['budget'],
+            'db_ms': round(collector.duration * 1000, 2),
+            'serialize_ms': round(timings['serialize'] * 1000, 2),
+            'render_ms': round(timings['render'] * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'duplicate_queries': sum(count - 1 for count in collector.duplicates.values()),
+        }
+        request.request_metrics = metrics
+        request.query_collector = collector
+
+        if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'db;dur={metrics["db_ms"]};desc="{collector.count} queries", '
+                f'serialize;dur={metrics["serialize_ms"]}, '
+                f'render;dur={metrics["render_ms"]}, '
+                f'total;dur={metrics["total_ms"]}'
+            )
+        over_budget = metrics['budget'] is not None and metrics['queries'] > metrics['budget']
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(metrics))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = request._metrics_state
+        match = request.resolver_match
+        state['view'] = match.view_name if match else view_func.__qualname__
+        state['budget'] = get_view_budget(view_func)
+
+    def process_template_response(self, request, response):
+        # Runs after the view and right before render(); the callback runs right after.
+        # Marked active so the templates rendered in between are not counted twice.
+        timings = _current_timings.get()
+        if timings is None:
+            return response
+        timings['active'].add('render')
+        render_started = time.perf_counter()
+
+        def finished(rendered):
+            timings['render'] += time.perf_counter() - render_started
+            timings['active'].discard('render')
+
+        response.add_post_render_callback(finished)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin: assert a response stayed within its view's query budget."""
+
+    def assertWithinQueryBudget(self, response, budget=None):
+        metrics = getattr(response.wsgi_request, 'request_metrics', None)
+        if metrics is None:
+            self.fail('RequestMetricsMiddleware is not installed')
+        budget = metrics['budget'] if budget is None else budget
+        if budget is None:
+            self.fail(f'{metrics["view"]} declares no query_budget')
+        if metrics['queries'] > budget:
+            statements = response.wsgi_request.query_collector.statements
+            self.fail(
+                f'{metrics["view"]} ran {metrics["queries"]} queries, budget is {budget}:\n'
+                + '\n'.join(f'  {count}x {sql}' for sql, count in statements.most_common())
+            )
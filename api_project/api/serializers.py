@@ -1,7 +1,58 @@
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import serializers
+from .instrumentation import TimedListSerializer, TimedSerializerMixin, timed
 from .models import Book
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        list_serializer_class = TimedListSerializer
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer over QuerySet.values() rows with the same output as
+    `serializer_class`. Fields are introspected once; plain columns are passed
+    through, so rows are returned untouched when every field is plain.
+    """
+    passthrough_fields = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+
+    def __init__(self, serializer_class):
+        self.names, self.columns, self.converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                  serializers.ManyRelatedField)) or field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} cannot be serialized from values() rows.'
+                )
+            self.names.append(name)
+            self.columns.append(field.source)
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                passthrough = field.pk_field is None
+            else:
+                passthrough = isinstance(field, self.passthrough_fields)
+            self.converters.append(None if passthrough else field.to_representation)
+        self.is_identity = self.names == self.columns and not any(self.converters)
+
+    @timed('serialize')
+    def to_representation(self, rows):
+        if self.is_identity:
+            return rows if isinstance(rows, list) else list(rows)
+        accessors = list(zip(self.names, self.columns, self.converters))
+        return [
+            {
+                name: row[column] if convert is None or row[column] is None else convert(row[column])
+                for name, column, convert in accessors
+            }
+            for row in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
@@ -1,3 +1,138 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from .authentication import CachedTokenAuthentication, token_cache
+from .instrumentation import QueryBudgetTestMixin
+from .models import Book
+from .serializers import BookSerializer, ValuesSerializer
+
+
+class BookListFastPathTests(APITestCase):
+    def setUp(self):
+        for title, author in [("Dune", "Frank Herbert"), ("Ünïcode “quoted”", "Ана"), ("Back\\slash", "X")]:
+            Book.objects.create(title=title, author=author)
+        self.user = User.objects.create_user(username="reader", password="pass")
+
+    def test_values_serializer_matches_book_serializer(self):
+        fast = ValuesSerializer(BookSerializer)
+        queryset = Book.objects.order_by("id")
+        self.assertEqual(
+            JSONRenderer().render(fast.to_representation(queryset.values(*fast.columns))),
+            JSONRenderer().render(BookSerializer(queryset, many=True).data),
+        )
+
+    def test_book_list_response_is_unchanged(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("book-list"), HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = JSONRenderer().render(BookSerializer(Book.objects.all(), many=True).data)
+        self.assertEqual(response.content, expected)
+
+
+class RequestMetricsTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        Book.objects.create(title="Dune", author="Frank Herbert")
+        self.user = User.objects.create_user(username="reader", password="pass")
+        self.token = Token.objects.create(user=self.user)
+
+    def test_book_list_within_budget(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertWithinQueryBudget(response)
+        self.assertRegex(response["Server-Timing"], r"serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=")
+
+    def test_serialization_is_timed(self):
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        self.client.force_authenticate(admin)
+        to_representation = BookSerializer.to_representation
+
+        def slow(serializer, book):
+            time.sleep(0.02)
+            return to_representation(serializer, book)
+
+        with mock.patch.object(BookSerializer, "to_representation", slow):
+            response = self.client.get(reverse("book_all-detail", kwargs={"pk": Book.objects.get().pk}))
+        metrics = response.wsgi_request.request_metrics
+        self.assertGreaterEqual(metrics["serialize_ms"], 20)
+        self.assertLess(metrics["render_ms"], 20)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username="reader", password="pass")
+        self.token = Token.objects.create(user=self.user)
+
+    def get_books(self, key):
+        return self.client.get(reverse("book-list"), HTTP_AUTHORIZATION=f"Token {key}")
+
+    def test_repeated_token_skips_the_lookup_query(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_books(self.token.key).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            response = self.get_books(self.token.key)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.wsgi_request.user, self.user)
+        self.assertEqual((token_cache.hits, token_cache.misses), (1, 1))
+
+    def test_each_request_gets_its_own_user(self):
+        auth = CachedTokenAuthentication()
+        first, _ = auth.authenticate_credentials(self.token.key)
+        second, token = auth.authenticate_credentials(self.token.key)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertIs(token.user, second)
+
+    def test_unknown_token_is_rejected_and_not_cached(self):
+        self.assertEqual(self.get_books("0" * 40).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(token_cache), 0)
+
+    def test_deleted_token_is_rejected(self):
+        self.get_books(self.token.key)
+        self.token.delete()
+        self.assertEqual(self.get_books(self.token.key).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_regenerated_token_replaces_the_old_one(self):
+        self.get_books(self.token.key)
+        Token.objects.filter(user=self.user).delete()
+        new_token = Token.objects.create(user=self.user)
+        self.assertEqual(self.get_books(self.token.key).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get_books(new_token.key).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get_books(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_books(self.token.key).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_entries_expire(self):
+        with override_settings(API_TOKEN_CACHE={"TIMEOUT": 0}):
+            self.get_books(self.token.key)
+            with self.assertNumQueries(2):
+                self.get_books(self.token.key)
+
+    def test_least_recently_used_token_is_evicted(self):
+        keys = [self.token.key] + [
+            Token.objects.create(user=User.objects.create_user(username=f"user{i}")).key for i in range(2)
+        ]
+        with override_settings(API_TOKEN_CACHE={"MAX_SIZE": 2}):
+            for key in keys[:2]:
+                self.get_books(key)
+            self.get_books(keys[0])  # now more recent than keys[1]
+            self.get_books(keys[2])
+        self.assertEqual(list(token_cache.entries), [keys[0], keys[2]])
+
+    def test_lookup_racing_an_invalidation_is_not_stored(self):
+        generation = token_cache.generation
+        token_cache.delete_user(self.user.pk)
+        token_cache.set(self.token.key, self.user, self.token, generation)
+        self.assertEqual(len(token_cache), 0)
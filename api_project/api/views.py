@@ -1,13 +1,25 @@
 # api/views.py
 from rest_framework import generics, viewsets
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
 from .models import Book
-from .serializers import BookSerializer
+from .serializers import BookSerializer, get_values_serializer
 
 class BookList(generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]  # only logged-in users can list books
+    query_budget = 2  # token lookup on a cache miss + the book list (see api/instrumentation.py)
+
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path: serialize values() rows instead of model instances.
+        # Same JSON as BookSerializer(many=True), without per-object field introspection.
+        serializer = get_values_serializer(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
 
 class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so session/auth queries are counted too; see api/instrumentation.py
+    'api.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +58,7 @@ ROOT_URLCONF = 'api_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'api.instrumentation.TimedDjangoTemplates',  # DjangoTemplates, timed for Server-Timing
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -128,10 +130,17 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',  # TokenAuthentication without a query per request
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # default for all views
     ]
 }
+
+# Token lookups cached per process by api.authentication.CachedTokenAuthentication.
+# Token/user changes made in this process invalidate at once; elsewhere, after TIMEOUT.
+API_TOKEN_CACHE = {
+    'TIMEOUT': 60,  # seconds
+    'MAX_SIZE': 10000,  # tokens, least recently used evicted first
+}
@@ -0,0 +1,87 @@
+"""
+Rendered-fragment cache for post listings and the post page.
+
+Each post's markup (title, excerpt or content, byline, tags) is rendered once
+and stored under a key made of the fragment name, the post id and
+Post.updated_at. updated_at moves whenever the post, its tags or its comments
+change, or its author is renamed (see Post.updated_at), so an edit simply
+makes readers ask for a new key and the old entry ages out; nothing is
+deleted. Markup that depends on the visitor (edit/delete links) stays outside
+the fragments.
+
+On a fully cached page the tag prefetch is skipped as well; tags are loaded
+for the missed posts only. Hits and misses are counted in the cache and
+reported by get_stats() and the fragment_cache_stats view.
+
+BLOG_FRAGMENT_CACHE = {'ALIAS': 'default', 'TIMEOUT': 86400} in settings.py.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .models import EPOCH
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 60 * 24,
+}
+# Part of every key; bump it when a fragment template changes.
+FRAGMENT_VERSION = 1
+KEY_PREFIX = f'blog:fragment:v{FRAGMENT_VERSION}'
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_FRAGMENT_CACHE', {})}
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+def fragment_key(name, post):
+    version = (post.updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'{KEY_PREFIX}:{name}:{post.pk}:{version}'
+
+def render_post_fragments(posts, name, template_name):
+    """
+    Set `post.fragment` to `template_name` rendered for each post, from the
+    cache where possible. The template gets `post` only.
+    """
+    cache = get_cache()
+    keys = {fragment_key(name, post): post for post in posts}
+    fragments = cache.get_many(list(keys))
+    missed = [post for key, post in keys.items() if key not in fragments]
+    if missed:
+        prefetch_related_objects(missed, 'tags')
+        rendered = {fragment_key(name, post): render_to_string(template_name, {'post': post}) for post in missed}
+        cache.set_many(rendered, get_config()['TIMEOUT'])
+        fragments.update(rendered)
+    for key, post in keys.items():
+        post.fragment = mark_safe(fragments[key])
+    _count('hits', len(keys) - len(missed))
+    _count('misses', len(missed))
+    return posts
+
+def _count(name, amount):
+    if not amount:
+        return
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(f'{KEY_PREFIX}:stats:hits', 0)
+    misses = cache.get(f'{KEY_PREFIX}:stats:misses', 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+def reset_stats():
+    get_cache().delete_many([f'{KEY_PREFIX}:stats:hits', f'{KEY_PREFIX}:stats:misses'])
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from taggit.models import Tag
+
+from blog.models import Post, TaggedPost
+from blog.search import get_search_backend, legacy_search
+
+WORDS = (
+    'django python query index search cache database template model view form '
+    'signal migration admin deploy server client request response session token '
+    'async thread worker queue stream buffer latency throughput benchmark profile'
+).split()
+
+class Command(BaseCommand):
+    help = (
+        'Compare the legacy icontains search with the full-text index on a synthetic corpus. '
+        'Everything runs in a transaction that is rolled back, so no data is left behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backend = get_search_backend()
+        self.stdout.write(f'Search backend: {type(backend).__name__}')
+        with transaction.atomic():
+            self.seed(options['posts'], rng)
+            started = time.perf_counter()
+            backend.rebuild()
+            self.stdout.write(f'Indexed {options["posts"]} posts in {time.perf_counter() - started:.1f}s')
+
+            for query in ('django', 'cache latency', 'benchmark'):
+                legacy = self.time(lambda: self.first_page(legacy_search(query), options['per_page']), options['repeat'])
+                indexed = self.time(lambda: self.first_page(backend.search(query), options['per_page']), options['repeat'])
+                self.stdout.write(
+                    f'{query!r:>16}: legacy {legacy * 1000:8.1f} ms   '
+                    f'indexed {indexed * 1000:8.1f} ms   speedup {legacy / indexed:6.1f}x'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, count, rng):
+        author, _ = User.objects.get_or_create(username='search-benchmark')
+        posts = Post.objects.bulk_create(
+            Post(
+                title=' '.join(rng.choices(WORDS, k=5)).title(),
+                content=' '.join(rng.choices(WORDS, k=200)),
+                author=author,
+            )
+            for _ in range(count)
+        )
+        tags = [Tag.objects.get_or_create(name=word, defaults={'slug': word})[0] for word in WORDS[:10]]
+        TaggedPost.objects.bulk_create(
+            TaggedPost(tag=tag, content_object=post, published_date=post.published_date)
+            for post in posts
+            for tag in rng.sample(tags, 2)
+        )
+
+    @staticmethod
+    def first_page(results, per_page):
+        # What the search view does: a count for the paginator plus one page of posts.
+        page = Paginator(results, per_page).page(1)
+        return list(page.object_list)
+
+    @staticmethod
+    def time(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
@@ -0,0 +1,83 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from blog.models import Comment, COMMENTS_PER_PAGE, TagCount, encode_comment_cursor
+from blog.views import PopularPostListView, PostByTagListView, PostDetailView, PostListView
+
+# SQLite: "SCAN blog_post" is a table scan; "SCAN ... USING [COVERING] INDEX" walks an index.
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING| VIRTUAL TABLE)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+def view_queryset(view_class, params=None, limit=None, **kwargs):
+    """The queryset `view_class` would run for GET ?params with URL kwargs."""
+    view = view_class()
+    view.setup(RequestFactory().get('/', params or {}), **kwargs)
+    queryset = view.get_queryset()
+    if 'pk' in kwargs:
+        return queryset.filter(pk=kwargs['pk'])
+    return queryset[:limit] if limit else queryset
+
+def audited_querysets():
+    """
+    (label, queryset) for the indexed lookups behind the blog pages. Search
+    goes through blog.search, whose full-text index is checked there.
+    """
+    cursor = encode_comment_cursor(Comment(pk=1, created_at=timezone.now()))
+    return [
+        ('posts: newest', view_queryset(PostListView, limit=10)),
+        ('posts: ?sort=discussed', view_queryset(PostListView, {'sort': 'discussed'}, limit=10)),
+        ('posts: ?sort=active', view_queryset(PostListView, {'sort': 'active'}, limit=10)),
+        ('posts: popular', view_queryset(PopularPostListView, limit=10)),
+        ('posts: by tag', view_queryset(PostByTagListView, limit=10, tag_slug='django')),
+        ('tag cloud', TagCount.objects.most_used()),
+        ('post detail', view_queryset(PostDetailView, pk=1)),
+        ('comments: first page', Comment.objects.thread(1)[:COMMENTS_PER_PAGE + 1]),
+        ('comments: ?after=', Comment.objects.thread(1, cursor)[:COMMENTS_PER_PAGE + 1]),
+    ]
+
+def full_scans(queryset):
+    """
+    Return (plan, tables read in full) for `queryset`, or (None, None) if the
+    backend is not supported. PostgreSQL is told to avoid sequential scans, so
+    one only shows up when no index can serve the query at all (and a handful
+    of test rows can't make a seq scan look cheaper).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        plan = queryset.explain()
+        return plan, SQLITE_SCAN.findall(plan)
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=queryset.db):
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        return plan, POSTGRES_SCAN.findall(plan)
+    return None, None
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the querysets behind the blog views and fail if any of them scans a table in full. '
+        'Runs in the test suite, so a listing that loses its index breaks the build.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true', help='Print every query plan.')
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in audited_querysets():
+            plan, scans = full_scans(queryset)
+            if plan is None:
+                self.stdout.write(f'Skipping index audit: {connections[queryset.db].vendor} is not supported.')
+                return
+            if options['show_plans']:
+                self.stdout.write(f'{label}:\n{plan}\n')
+            if scans:
+                failures.append(f"{label}: full scan of {', '.join(sorted(set(scans)))}")
+        if failures:
+            raise CommandError('Full table scans found:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No full table scans.'))
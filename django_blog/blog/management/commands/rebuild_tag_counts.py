@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import TagCount
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the materialized per-tag post counts behind the tag cloud from blog_taggedpost. '
+        'Signals keep them current; this repairs drift, e.g. after raw SQL or bulk imports.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = TagCount.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt post counts for {rebuilt} tags.'))
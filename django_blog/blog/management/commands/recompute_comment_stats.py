@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from blog.models import Post
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the denormalized Post.comment_count and Post.last_comment_at from the comments table. '
+        'Runs one UPDATE per batch of post ids, so large tables are not locked in a single statement.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Posts per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('No posts to update.')
+            return
+        updated = 0
+        batch_size = options['batch_size']
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with transaction.atomic():
+                updated += Post.objects.filter(pk__gte=start, pk__lt=start + batch_size).recompute_comment_stats()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed comment stats for {updated} posts.'))
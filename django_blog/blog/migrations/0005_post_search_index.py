@@ -0,0 +1,63 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+POST_TAGS_SQL = """
+    SELECT ti.object_id AS post_id, t.name
+    FROM taggit_taggeditem ti
+    JOIN taggit_tag t ON t.id = ti.tag_id
+    JOIN django_content_type ct ON ct.id = ti.content_type_id
+    WHERE ct.app_label = 'blog' AND ct.model = 'post'
+"""
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE blog_post_fts USING fts5("
+                    "title, content, tags, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            except OperationalError:
+                # SQLite built without FTS5: search keeps using icontains.
+                return
+            cursor.execute(f"""
+                INSERT INTO blog_post_fts (rowid, title, content, tags)
+                SELECT p.id, p.title, p.content, COALESCE(
+                    (SELECT group_concat(pt.name, ' ') FROM ({POST_TAGS_SQL}) pt WHERE pt.post_id = p.id), ''
+                )
+                FROM blog_post p
+            """)
+        elif vendor == 'postgresql':
+            cursor.execute("""
+                CREATE TABLE blog_post_search (
+                    post_id bigint PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+                    document tsvector NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX blog_post_search_document_gin ON blog_post_search USING GIN (document)")
+            cursor.execute(f"""
+                INSERT INTO blog_post_search (post_id, document)
+                SELECT p.id,
+                    setweight(to_tsvector('english', p.title), 'A') ||
+                    setweight(to_tsvector('english', COALESCE(
+                        (SELECT string_agg(pt.name, ' ') FROM ({POST_TAGS_SQL}) pt WHERE pt.post_id = p.id), ''
+                    )), 'B') ||
+                    setweight(to_tsvector('english', p.content), 'C')
+                FROM blog_post p
+            """)
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS blog_post_fts')
+        cursor.execute('DROP TABLE IF EXISTS blog_post_search')
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0005_auto_20220424_2025'),
+        ('blog', '0004_taggablemanager'),
+    ]
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
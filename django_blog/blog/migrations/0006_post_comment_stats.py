@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+def backfill_comment_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(comments.values('post').annotate(n=Count('pk')).values('n')), Value(0)),
+        last_comment_at=Subquery(comments.order_by('-created_at').values('created_at')[:1]),
+    )
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0005_post_search_index'),
+    ]
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-comment_count', '-id'], name='blog_post_most_discussed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-last_comment_at', '-id'], name='blog_post_recent_activity_idx'),
+        ),
+        migrations.RunPython(backfill_comment_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,12 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0006_post_comment_stats'),
+    ]
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at', 'id'], name='blog_comment_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,12 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0007_comment_thread_index'),
+    ]
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-published_date', '-id'], name='blog_post_published_idx'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0008_post_published_index'),
+    ]
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
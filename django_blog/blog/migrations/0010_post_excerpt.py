@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+def backfill_excerpts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('pk', 'content').iterator(chunk_size=1000):
+        post.excerpt = Truncator(post.content).words(30, truncate=' …')
+        batch.append(post)
+        if len(batch) == 1000:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0009_post_updated_at'),
+    ]
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+import blog.images
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0010_post_excerpt'),
+    ]
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_pics/', validators=[blog.images.ImageValidator()]),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='profile_picture_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import django.db.models.deletion
+import taggit.managers
+from django.db import migrations, models
+
+def move_post_tags(apps, schema_editor):
+    # Post tags move from taggit's generic TaggedItem into blog_taggedpost.
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    Post = apps.get_model('blog', 'Post')
+    TaggedPost = apps.get_model('blog', 'TaggedPost')
+    TagCount = apps.get_model('blog', 'TagCount')
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is not None:
+        items = TaggedItem.objects.filter(content_type=content_type)
+        published = dict(Post.objects.values_list('pk', 'published_date'))
+        batch = []
+        for tag_id, object_id in items.values_list('tag_id', 'object_id').iterator(chunk_size=1000):
+            if object_id in published:
+                batch.append(TaggedPost(tag_id=tag_id, content_object_id=object_id, published_date=published[object_id]))
+            if len(batch) == 1000:
+                TaggedPost.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        TaggedPost.objects.bulk_create(batch, ignore_conflicts=True)
+        items.delete()
+    counts = TaggedPost.objects.values('tag').annotate(n=models.Count('pk')).order_by()
+    TagCount.objects.bulk_create(TagCount(tag_id=row['tag'], post_count=row['n']) for row in counts)
+
+def restore_post_tags(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TaggedPost = apps.get_model('blog', 'TaggedPost')
+    content_type, _ = ContentType.objects.get_or_create(app_label='blog', model='post')
+    TaggedItem.objects.bulk_create(
+        TaggedItem(tag_id=tag_id, content_type=content_type, object_id=post_id)
+        for tag_id, post_id in TaggedPost.objects.values_list('tag_id', 'content_object_id').iterator()
+    )
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('blog', '0011_profile_picture_thumbnails'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+    operations = [
+        migrations.CreateModel(
+            name='TaggedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_date', models.DateTimeField(editable=False)),
+                ('content_object', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tagged_items', to='blog.post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_object', 'tag'), name='blog_taggedpost_unique')],
+                'indexes': [models.Index(fields=['tag', '-published_date', '-content_object'], name='blog_taggedpost_listing_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='taggit.tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count', 'tag'], name='blog_tagcount_cloud_idx')],
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='tags',
+            field=taggit.managers.TaggableManager(help_text='A comma-separated list of tags.', through='blog.TaggedPost', to='taggit.Tag', verbose_name='Tags'),
+        ),
+        migrations.RunPython(move_post_tags, restore_post_tags),
+    ]
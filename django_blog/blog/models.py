@@ -1,25 +1,272 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from django.db import models
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Ln
 from django.contrib.auth.models import User
+from django.utils.text import Truncator
 from taggit.managers import TaggableManager
+from taggit.models import Tag, TaggedItemBase
+from .images import ImageValidator, thumbnail_urls
+
+EXCERPT_WORDS = 30
+# Posts per UPDATE when flushing view counts
+VIEW_COUNT_BATCH_SIZE = 500
+
+def make_excerpt(content):
+    """Same text as {{ content|truncatewords:30 }}, computed once at save time."""
+    return Truncator(content).words(EXCERPT_WORDS, truncate=' …')
+
+class PostQuerySet(models.QuerySet):
+    def with_list_relations(self):
+        """Load the author and tags that post listings render, in two queries total."""
+        # taggit rejects custom Prefetch querysets, so prefetch the manager as-is.
+        return self.select_related('author').prefetch_related('tags')
+
+    def touch(self):
+        """Mark these posts' pages as changed (see Post.updated_at)."""
+        return self.update(updated_at=datetime.now(timezone.utc))
+
+    def record_comment_added(self, post_id, created_at):
+        """Count a new comment in a single UPDATE, without reading the post first."""
+        return self.filter(pk=post_id).update(
+            comment_count=F('comment_count') + 1,
+            last_comment_at=Greatest(Coalesce('last_comment_at', Value(created_at)), Value(created_at)),
+            updated_at=datetime.now(timezone.utc),
+        )
+
+    def record_comment_removed(self, post_id):
+        return self.filter(pk=post_id).update(
+            comment_count=Greatest(F('comment_count') - 1, Value(0)),
+            last_comment_at=Subquery(latest_comment_at()),
+            updated_at=datetime.now(timezone.utc),
+        )
+
+    def recompute_comment_stats(self):
+        """Rebuild comment_count/last_comment_at from the comments table in one UPDATE."""
+        comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        return self.update(
+            comment_count=Coalesce(Subquery(comments.annotate(n=models.Count('pk')).values('n')), Value(0)),
+            last_comment_at=Subquery(latest_comment_at()),
+            updated_at=datetime.now(timezone.utc),
+        )
+
+    def add_views(self, counts):
+        """
+        Add {post id: views} to view_count in one UPDATE per VIEW_COUNT_BATCH_SIZE
+        posts: view_count + CASE, with one WHEN per distinct number of views.
+        updated_at is left alone; the count is not shown on cached pages.
+        """
+        post_ids, updated = list(counts), 0
+        for start in range(0, len(post_ids), VIEW_COUNT_BATCH_SIZE):
+            by_views = defaultdict(list)
+            for post_id in post_ids[start:start + VIEW_COUNT_BATCH_SIZE]:
+                by_views[counts[post_id]].append(post_id)
+            updated += self.filter(pk__in=post_ids[start:start + VIEW_COUNT_BATCH_SIZE]).update(
+                view_count=F('view_count') + Case(
+                    *(When(pk__in=ids, then=Value(views)) for views, ids in by_views.items()),
+                    default=Value(0), output_field=models.PositiveIntegerField(),
+                ),
+            )
+        return updated
+
+def latest_comment_at():
+    return Comment.objects.filter(post=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
 
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Listing excerpt, kept in step with content by save()
+    excerpt = models.TextField(blank=True, default='', editable=False)
     published_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
-    tags = TaggableManager()
+    tags = TaggableManager(through='TaggedPost')
+    # Denormalized from Comment; only ever written through PostQuerySet.record_comment_*
+    # or recompute_comment_stats, so listings can sort on them without aggregating.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_comment_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Page views, buffered in memory by blog.view_counts and only ever written
+    # through PostQuerySet.add_views.
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Last change to anything the post page shows: the post, its tags, its comments or
+    # its author's username. Bumped by save(), PostQuerySet.touch()/record_comment_* and
+    # blog.signals; it is
+    # the ETag/Last-Modified source for PostDetailView.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
+
+    COMMENT_STATS_FIELDS = ('comment_count', 'last_comment_at')
+    COUNTER_FIELDS = COMMENT_STATS_FIELDS + ('view_count',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-published_date', '-id'], name='blog_post_published_idx'),
+            models.Index(fields=['-comment_count', '-id'], name='blog_post_most_discussed_idx'),
+            models.Index(fields=['-last_comment_at', '-id'], name='blog_post_recent_activity_idx'),
+            models.Index(fields=['-view_count', '-id'], name='blog_post_popular_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.excerpt = make_excerpt(self.content)
+        if update_fields is not None:
+            # auto_now only reaches the database when updated_at is among the saved fields
+            extra = {'updated_at'}
+            if 'content' in update_fields:
+                extra.add('excerpt')
+            kwargs['update_fields'] = {*update_fields, *extra}
+        # Editing a post must not write back comment stats or view counts loaded
+        # before a concurrent comment or flush.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+class TaggedPost(TaggedItemBase):
+    """
+    Post.tags rows. Unlike taggit's generic TaggedItem (content type + text
+    object id), this has a real foreign key to the post and carries the post's
+    published_date, so a tag listing reads its posts newest first straight off
+    blog_taggedpost_listing_idx instead of sorting every tagged post.
+    """
+    content_object = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='tagged_items')
+    # Copied from the post on save; Post.published_date never changes.
+    published_date = models.DateTimeField(editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_object', 'tag'], name='blog_taggedpost_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-published_date', '-content_object'], name='blog_taggedpost_listing_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.published_date is None:
+            self.published_date = self.content_object.published_date
+        super().save(*args, **kwargs)
+
+TAG_CLOUD_SIZE = 50
+TAG_CLOUD_WEIGHTS = 5
+
+class TagCountQuerySet(models.QuerySet):
+    def record_added(self, tag_ids):
+        """Count one more post for each of `tag_ids`, creating missing rows."""
+        tag_ids = list(tag_ids)
+        if not tag_ids:
+            return 0
+        self.bulk_create([TagCount(tag_id=pk) for pk in tag_ids], ignore_conflicts=True)
+        return self.filter(tag_id__in=tag_ids).update(post_count=F('post_count') + 1)
+
+    def record_removed(self, tag_ids):
+        tag_ids = list(tag_ids)
+        if not tag_ids:
+            return 0
+        return self.filter(tag_id__in=tag_ids).update(post_count=Greatest(F('post_count') - 1, Value(0)))
+
+    def rebuild(self):
+        """Replace every row with a fresh GROUP BY over blog_taggedpost."""
+        counts = TaggedPost.objects.using(self.db).values('tag').annotate(n=models.Count('pk')).order_by()
+        self.all().delete()
+        return len(self.bulk_create(TagCount(tag_id=row['tag'], post_count=row['n']) for row in counts))
+
+    def most_used(self, size=TAG_CLOUD_SIZE):
+        """The `size` tags with the most posts, read in order off blog_tagcount_cloud_idx."""
+        return self.filter(post_count__gt=0).select_related('tag').order_by('-post_count', 'tag')[:size]
+
+    def cloud(self, size=TAG_CLOUD_SIZE):
+        """
+        most_used(size) alphabetically, each with a `weight` from 1 to
+        TAG_CLOUD_WEIGHTS on a log scale of its post count. One query.
+        """
+        counts = list(self.most_used(size).annotate(log_count=Ln('post_count')))
+        if counts:
+            low, high = counts[-1].log_count, counts[0].log_count
+            for count in counts:
+                share = (count.log_count - low) / (high - low) if high > low else 1
+                count.weight = 1 + round(share * (TAG_CLOUD_WEIGHTS - 1))
+        return sorted(counts, key=lambda count: count.tag.name.lower())
+
+class TagCount(models.Model):
+    """
+    Materialized number of posts per tag, for the tag cloud. Kept up to date
+    incrementally by blog.signals; TagCount.objects.rebuild() (the
+    rebuild_tag_counts command) recomputes it from scratch.
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    post_count = models.PositiveIntegerField(default=0)
+
+    objects = TagCountQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count', 'tag'], name='blog_tagcount_cloud_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag}: {self.post_count}'
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(blank=True)
-    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True, validators=[ImageValidator()])
+    # Filled in by the thumbnail workers (blog/images.py): {size: {extension: stored name}}
+    profile_picture_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.user.username}'s profile"
 
+    @property
+    def avatar(self):
+        return thumbnail_urls(self, 'profile_picture', 'medium')
+
+COMMENTS_PER_PAGE = 20
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Largest id a cursor may carry (BigAutoField)
+MAX_BIGINT = 2 ** 63 - 1
+
+def encode_comment_cursor(comment):
+    """Opaque position of a comment in its thread: '<created_at in µs since epoch>-<id>'."""
+    return f'{(comment.created_at - EPOCH) // timedelta(microseconds=1)}-{comment.pk}'
+
+def decode_comment_cursor(cursor):
+    """Inverse of encode_comment_cursor; raises ValueError for malformed cursors."""
+    micros, pk = cursor.rsplit('-', 1)
+    try:
+        created_at = EPOCH + timedelta(microseconds=int(micros))
+    except OverflowError:
+        raise ValueError(f'Comment cursor out of range: {cursor!r}')
+    pk = int(pk)
+    if not 0 < pk <= MAX_BIGINT:
+        raise ValueError(f'Comment cursor out of range: {cursor!r}')
+    return created_at, pk
+
+class CommentQuerySet(models.QuerySet):
+    def thread(self, post_id, cursor=None):
+        """A post's comments, oldest first, starting after `cursor`."""
+        comments = self.filter(post_id=post_id).select_related('author').order_by('created_at', 'id')
+        if cursor:
+            created_at, pk = decode_comment_cursor(cursor)
+            comments = comments.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        return comments
+
+    def thread_page(self, post_id, cursor=None, size=COMMENTS_PER_PAGE):
+        """
+        One page of a post's comments, oldest first, starting after `cursor`.
+        Walks the (post, created_at, id) index instead of OFFSET, so deep pages
+        cost the same as the first. Returns (comments, next_cursor or None).
+        """
+        comments = list(self.thread(post_id, cursor)[:size + 1])
+        next_cursor = encode_comment_cursor(comments[size - 1]) if len(comments) > size else None
+        return comments[:size], next_cursor
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -27,5 +274,12 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='blog_comment_thread_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Full-text search over blog posts.
+
+Posts are mirrored into a dedicated search index so `search` no longer ORs
+`icontains` across title, content and tags (a full scan plus a DISTINCT over
+the tag join). The index holds one row per post with its title, content and
+tag names:
+
+* SQLite: the FTS5 virtual table `blog_post_fts` (rowid = post id), ranked
+  with bm25.
+* PostgreSQL: `blog_post_search`, a weighted tsvector per post behind a GIN
+  index, ranked with ts_rank.
+
+Other backends, or a SQLite build without FTS5, fall back to the original
+`icontains` query. Signals in `blog.signals` keep the index in sync.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Post
+
+SQLITE_TABLE = 'blog_post_fts'
+POSTGRES_TABLE = 'blog_post_search'
+
+# Tag names per post, joined into one string; shared by every backend.
+TAGS_SQL = """
+    SELECT tp.content_object_id, t.name
+    FROM blog_taggedpost tp
+    JOIN taggit_tag t ON t.id = tp.tag_id
+    WHERE tp.content_object_id IN ({ids})
+"""
+
+# NUL ends an FTS5 string early and is rejected by PostgreSQL; no control
+# character can match indexed text, so they only separate terms.
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+_available_tables = {}
+
+
+def split_terms(query):
+    """The search terms in `query`, with control characters read as spaces."""
+    return CONTROL_CHARACTERS.sub(' ', query).split()
+
+
+def fetch_documents(connection, post_ids):
+    """Return [(id, title, content, tags)] for the given posts straight from the tables."""
+    if not post_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id, title, content FROM blog_post WHERE id IN ({placeholders})', post_ids
+        )
+        rows = cursor.fetchall()
+        cursor.execute(TAGS_SQL.format(ids=placeholders), post_ids)
+        tags = {}
+        for object_id, name in cursor.fetchall():
+            tags.setdefault(int(object_id), []).append(name)
+    return [(pk, title, content, ' '.join(tags.get(pk, []))) for pk, title, content in rows]
+
+
+class SearchResults:
+    """
+    Lazily evaluated, ranked search results.
+
+    Supports `count()` and slicing, which is all `Paginator` needs, so only the
+    requested page of ids is ranked and fetched.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if stop <= start:
+            return []
+        ids = self.backend.ranked_ids(self.query, limit=stop - start, offset=start)
+        posts = Post.objects.filter(pk__in=ids).with_list_relations().in_bulk()
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class BaseSearchBackend:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def search(self, query):
+        return SearchResults(self, query)
+
+    def index(self, post_ids):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def rebuild(self, batch_size=500):
+        """Re-index every post, `batch_size` posts per round trip."""
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM blog_post ORDER BY id')
+            ids = [row[0] for row in cursor.fetchall()]
+        self.clear()
+        for start in range(0, len(ids), batch_size):
+            self.index(ids[start:start + batch_size])
+
+    def clear(self):
+        pass
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """The original unindexed search; used when no full-text index exists."""
+
+    def search(self, query):
+        return legacy_search(query)
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    # bm25 column weights: a title hit outranks a tag hit, which outranks a content hit.
+    rank_sql = f'bm25({SQLITE_TABLE}, 10.0, 1.0, 5.0)'
+
+    @staticmethod
+    def to_match(query):
+        # Quote every term so user input can never be parsed as FTS5 syntax.
+        terms = ['"{}"'.format(term.replace('"', '""')) for term in split_terms(query)]
+        return ' '.join(terms)
+
+    def index(self, post_ids):
+        documents = fetch_documents(self.connection, list(post_ids))
+        self.remove(post_ids)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+                documents,
+            )
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+
+    def count(self, query):
+        match = self.to_match(query)
+        if not match:
+            return 0
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [match]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, limit, offset):
+        match = self.to_match(query)
+        if not match:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s '
+                f'ORDER BY {self.rank_sql}, rowid DESC LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    config = 'english'
+    document_sql = (
+        "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+        "setweight(to_tsvector(%s::regconfig, %s), 'C')"
+    )
+
+    def index(self, post_ids):
+        documents = fetch_documents(self.connection, list(post_ids))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {POSTGRES_TABLE} (post_id, document) VALUES (%s, {self.document_sql}) '
+                'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                [
+                    (pk, self.config, title, self.config, tags, self.config, content)
+                    for pk, title, content, tags in documents
+                ],
+            )
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE post_id = ANY(%s)', [post_ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+
+    @staticmethod
+    def to_query(query):
+        return ' '.join(split_terms(query))
+
+    def count(self, query):
+        query = self.to_query(query)
+        if not query:
+            return 0
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {POSTGRES_TABLE} '
+                'WHERE document @@ websearch_to_tsquery(%s::regconfig, %s)',
+                [self.config, query],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, limit, offset):
+        query = self.to_query(query)
+        if not query:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {POSTGRES_TABLE}, websearch_to_tsquery(%s::regconfig, %s) q '
+                'WHERE document @@ q ORDER BY ts_rank(document, q) DESC, post_id DESC '
+                'LIMIT %s OFFSET %s',
+                [self.config, query, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': (SQLITE_TABLE, SQLiteFTSSearchBackend),
+    'postgresql': (POSTGRES_TABLE, PostgresSearchBackend),
+}
+
+
+def get_search_backend(using=None):
+    using = using or router.db_for_read(Post)
+    connection = connections[using]
+    table, backend_class = BACKENDS.get(connection.vendor, (None, FallbackSearchBackend))
+    if table is None:
+        return FallbackSearchBackend(connection)
+    if using not in _available_tables:
+        # The migration skips the index when the database can't host it.
+        _available_tables[using] = table in connection.introspection.table_names()
+    if not _available_tables[using]:
+        return FallbackSearchBackend(connection)
+    return backend_class(connection)
+
+
+def legacy_search(query):
+    return Post.objects.filter(
+        Q(title__icontains=query) |
+        Q(content__icontains=query) |
+        Q(tags__name__icontains=query)
+    ).distinct().with_list_relations().order_by('-published_date')
+
+
+def search_posts(query):
+    """
+    Ranked posts matching `query`, best match first, as a paginatable sequence.
+    An empty query lists every post, newest first, like the original view.
+    """
+    if not query.split():
+        return Post.objects.with_list_relations().order_by('-published_date')
+    return get_search_backend().search(query)
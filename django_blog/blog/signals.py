@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from taggit.models import Tag
+from .images import track_image_field
+from .models import Post, Profile, TagCount, TaggedPost
+from .search import get_search_backend
+
+# Keep the full-text search index (blog.search) and Post.updated_at in step with
+# posts and their tags.
+
+def tags_changed(post_ids, using):
+    get_search_backend(using).index(post_ids)
+    Post.objects.using(using).filter(pk__in=post_ids).touch()
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, using, **kwargs):
+    get_search_backend(using).index([instance.pk])
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, using, **kwargs):
+    get_search_backend(using).remove([instance.pk])
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_post_tags(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Post):
+        tags_changed([instance.pk], using)
+    elif pk_set:
+        tags_changed(pk_set, using)
+
+def tagged_post_ids(tag, using):
+    return list(TaggedPost.objects.using(using).filter(tag=tag).values_list('content_object_id', flat=True))
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, using, **kwargs):
+    if not created:
+        tags_changed(tagged_post_ids(instance, using), using)
+
+@receiver(pre_delete, sender=Tag)
+def remember_deleted_tag_posts(sender, instance, using, **kwargs):
+    instance._search_post_ids = tagged_post_ids(instance, using)
+
+@receiver(post_delete, sender=Tag)
+def reindex_deleted_tag_posts(sender, instance, using, **kwargs):
+    tags_changed(getattr(instance, '_search_post_ids', []), using)
+
+# TagCount (the tag cloud) follows posts gaining and losing tags. Deleted tags
+# take their TagCount row with them.
+
+def post_tag_ids(post, using):
+    return list(TaggedPost.objects.using(using).filter(content_object=post).values_list('tag_id', flat=True))
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def count_post_tags(sender, instance, action, pk_set, using, **kwargs):
+    if not isinstance(instance, Post):
+        return
+    if action == 'post_add':
+        TagCount.objects.using(using).record_added(pk_set)
+    elif action == 'post_remove':
+        TagCount.objects.using(using).record_removed(pk_set)
+    elif action == 'pre_clear':
+        instance._cleared_tag_ids = post_tag_ids(instance, using)
+    elif action == 'post_clear':
+        TagCount.objects.using(using).record_removed(instance.__dict__.pop('_cleared_tag_ids', []))
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, using, **kwargs):
+    instance._deleted_tag_ids = post_tag_ids(instance, using)
+
+@receiver(post_delete, sender=Post)
+def uncount_deleted_post_tags(sender, instance, using, **kwargs):
+    TagCount.objects.using(using).record_removed(getattr(instance, '_deleted_tag_ids', []))
+
+# Cached post fragments (blog.fragments) show the author's username but are keyed
+# on Post.updated_at, so renaming a user touches their posts.
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # Deferred loads are skipped: reading the field would cost a query
+    if 'username' not in instance.get_deferred_fields():
+        instance._blog_username = instance.username
+
+@receiver(post_save, sender=User)
+def touch_renamed_author_posts(sender, instance, created, using, update_fields, **kwargs):
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    if getattr(instance, '_blog_username', instance.username) != instance.username:
+        Post.objects.using(using).filter(author=instance).touch()
+    instance._blog_username = instance.username
+
+# Thumbnails for uploaded profile pictures
+track_image_field(Profile, 'profile_picture')
@@ -1,3 +1,664 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.template.base import Template
+from django.test.utils import CaptureQueriesContext
+from django.db import DatabaseError, connection
+from django.urls import reverse
+from django.contrib.auth.models import User
+from taggit.models import Tag
+from .models import Post, Comment, Profile, TagCount, TaggedPost, COMMENTS_PER_PAGE
+from .fragments import get_stats, reset_stats
+from .images import submit
+from .instrumentation import QueryBudgetTestMixin, QueryCollector
+from .search import get_search_backend, SQLiteFTSSearchBackend
+from .view_counts import buffer as view_buffer
+from .views import PostByTagListView, PostDetailView, PostListView
+from .management.commands.index_audit import full_scans
 
-# Create your tests here.
+# Queries a post listing may issue regardless of how many posts it shows:
+# posts joined with authors, plus one prefetch for all their tags.
+POST_LIST_QUERY_BUDGET = 2
+# Search adds a match count and the ranked page of ids from the full-text index.
+SEARCH_QUERY_BUDGET = 4
+
+# Views recorded by test requests are flushed only when a test asks for it, so a
+# flush never lands inside another test's query count, and are dropped at the end.
+view_count_settings = override_settings(BLOG_VIEW_COUNTS={'FLUSH_INTERVAL': None, 'MAX_PENDING': None})
+
+def setUpModule():
+    view_count_settings.enable()
+
+def tearDownModule():
+    view_count_settings.disable()
+    view_buffer.take()
+
+class PostListQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        authors = [User.objects.create_user(username=f'author{i}', password='pass') for i in range(5)]
+        for i in range(50):
+            post = Post.objects.create(title=f'Post {i}', content='Some content', author=authors[i % 5])
+            post.tags.add('django', f'tag{i % 7}')
+
+    def assertWithinBudget(self, url, budget=POST_LIST_QUERY_BUDGET):
+        get_search_backend()  # warm the search index lookup
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(ctx.captured_queries), budget,
+            f'{url} ran {len(ctx.captured_queries)} queries (budget {budget})',
+        )
+        return response
+
+    def test_post_list_within_budget(self):
+        response = self.assertWithinBudget(reverse('post_list'))
+        self.assertEqual(len(response.context['posts']), 50)
+        self.assertContains(response, 'author3')
+        self.assertContains(response, 'tag6')
+
+    def test_tag_list_within_budget(self):
+        response = self.assertWithinBudget(reverse('tag_list', kwargs={'tag_slug': 'django'}))
+        self.assertEqual(len(response.context['posts']), 50)
+
+    def test_search_within_budget(self):
+        response = self.assertWithinBudget(reverse('search') + '?q=Post', SEARCH_QUERY_BUDGET)
+        self.assertEqual(response.context['page_obj'].paginator.count, 50)
+        self.assertEqual(len(response.context['posts']), 10)
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer', password='pass')
+        cls.title_hit = Post.objects.create(title='Caching in Django', content='Notes.', author=cls.author)
+        cls.content_hit = Post.objects.create(
+            title='Weekly notes', content='A short aside about caching layers.', author=cls.author
+        )
+        cls.other = Post.objects.create(title='Gardening', content='Tomatoes.', author=cls.author)
+
+    def search(self, query):
+        return self.client.get(reverse('search'), {'q': query}).context
+
+    def test_uses_full_text_index(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTSSearchBackend)
+
+    def test_ranks_title_matches_first(self):
+        posts = self.search('caching')['posts']
+        self.assertEqual(posts, [self.title_hit, self.content_hit])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.other.title = 'Caching tomatoes'
+        self.other.save()
+        self.assertIn(self.other, self.search('caching')['posts'])
+        self.other.delete()
+        self.assertEqual(len(self.search('caching')['posts']), 2)
+
+    def test_index_follows_tags(self):
+        self.other.tags.add('vegetables')
+        self.assertEqual(self.search('vegetables')['posts'], [self.other])
+        self.other.tags.clear()
+        self.assertEqual(self.search('vegetables')['posts'], [])
+
+    def test_query_syntax_is_escaped(self):
+        response = self.client.get(reverse('search'), {'q': 'caching" OR NEAR(*'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['posts'], [])
+
+    def test_control_characters_are_ignored(self):
+        self.assertEqual(self.search('gardening\x00')['posts'], [self.other])
+        self.assertEqual(self.search('cach\x00ing')['posts'], [])
+        response = self.client.get(reverse('search'), {'q': '\x00\x1b'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['posts'], [])
+
+    def test_pagination(self):
+        for i in range(12):
+            Post.objects.create(title=f'Caching part {i}', content='More.', author=self.author)
+        page_two = self.client.get(reverse('search'), {'q': 'caching', 'page': 2}).context
+        self.assertEqual(page_two['page_obj'].paginator.count, 14)
+        self.assertEqual(len(page_two['posts']), 4)
+
+class CommentStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer', password='pass')
+        cls.reader = User.objects.create_user(username='reader', password='pass')
+        cls.quiet = Post.objects.create(title='Quiet', content='...', author=cls.author)
+        cls.busy = Post.objects.create(title='Busy', content='...', author=cls.author)
+
+    def comment(self, post, content='Nice post'):
+        self.client.force_login(self.reader)
+        self.client.post(reverse('comment_create', kwargs={'pk': post.pk}), {'content': content})
+        return Comment.objects.filter(post=post).latest('created_at')
+
+    def test_create_and_delete_maintain_stats(self):
+        first = self.comment(self.busy)
+        second = self.comment(self.busy)
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.comment_count, 2)
+        self.assertEqual(self.busy.last_comment_at, second.created_at)
+
+        self.client.post(reverse('comment_delete', kwargs={'post_id': self.busy.pk, 'pk': second.pk}))
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.comment_count, 1)
+        self.assertEqual(self.busy.last_comment_at, first.created_at)
+
+        self.client.post(reverse('comment_delete', kwargs={'post_id': self.busy.pk, 'pk': first.pk}))
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.comment_count, 0)
+        self.assertIsNone(self.busy.last_comment_at)
+
+    def test_editing_post_keeps_stats(self):
+        stale = Post.objects.get(pk=self.busy.pk)
+        self.comment(self.busy)
+        stale.title = 'Busy (edited)'
+        stale.save()
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.title, 'Busy (edited)')
+        self.assertEqual(self.busy.comment_count, 1)
+
+    def test_sorted_listings(self):
+        self.comment(self.busy)
+        self.comment(self.busy)
+        self.comment(self.quiet)
+        discussed = self.client.get(reverse('post_list'), {'sort': 'discussed'}).context['posts']
+        self.assertEqual(list(discussed), [self.busy, self.quiet])
+        active = self.client.get(reverse('post_list'), {'sort': 'active'}).context['posts']
+        self.assertEqual(list(active), [self.quiet, self.busy])
+
+    def test_recompute_command(self):
+        Comment.objects.create(post=self.quiet, author=self.reader, content='Added without the view')
+        call_command('recompute_comment_stats', batch_size=1, stdout=StringIO())
+        self.quiet.refresh_from_db()
+        self.busy.refresh_from_db()
+        self.assertEqual(self.quiet.comment_count, 1)
+        self.assertIsNotNone(self.quiet.last_comment_at)
+        self.assertEqual(self.busy.comment_count, 0)
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer', password='pass')
+        cls.post = Post.objects.create(title='Hot post', content='...', author=cls.author)
+        cls.post.tags.add('hot')
+        commenters = [User.objects.create_user(username=f'reader{i}', password='pass') for i in range(5)]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=commenters[i % 5], content=f'Comment {i}')
+            for i in range(COMMENTS_PER_PAGE * 2 + 5)
+        )
+
+    def setUp(self):
+        cache.clear()  # the first detail render must miss the fragment cache
+
+    def test_detail_loads_first_page_in_constant_queries(self):
+        # post + author, tags, one page of comments + authors
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk}))
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+        self.assertContains(response, 'Load more comments')
+
+    def test_walk_all_pages(self):
+        response = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk}))
+        seen = [comment.content for comment in response.context['comments']]
+        cursor = response.context['next_cursor']
+        while cursor:
+            with self.assertNumQueries(1):
+                page = self.client.get(reverse('comment_page', kwargs={'pk': self.post.pk}), {'after': cursor})
+            seen += [comment.content for comment in page.context['comments']]
+            cursor = page.context['next_cursor']
+        self.assertEqual(seen, [f'Comment {i}' for i in range(COMMENTS_PER_PAGE * 2 + 5)])
+
+    def test_invalid_cursor(self):
+        url = reverse('comment_page', kwargs={'pk': self.post.pk})
+        for cursor in ('nope', '99999999999999999999999-1', '1-99999999999999999999999'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(url, {'after': cursor}).status_code, 404)
+
+    def test_missing_post(self):
+        response = self.client.get(reverse('comment_page', kwargs={'pk': self.post.pk + 1000}))
+        self.assertEqual(response.status_code, 404)
+        empty = Post.objects.create(title='Quiet', content='...', author=self.post.author)
+        response = self.client.get(reverse('comment_page', kwargs={'pk': empty.pk}))
+        self.assertEqual(response.status_code, 200)
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer', password='pass')
+        cls.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        cls.post = Post.objects.create(title='Cached post', content=' '.join(['word'] * 500), author=cls.author)
+        cls.post.tags.add('cached')
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+
+    def test_excerpt_matches_truncatewords(self):
+        self.assertEqual(self.post.excerpt, ' '.join(['word'] * 30) + ' …')
+        self.post.content = 'Short now'
+        self.client.get(reverse('post_list'))
+        self.post.save(update_fields=['content'])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).excerpt, 'Short now')
+        response = self.client.get(reverse('post_list'))
+        self.assertContains(response, '<p>Short now</p>')
+        self.assertEqual(get_stats()['hits'], 0)
+
+    def test_renamed_author_renders_a_new_fragment(self):
+        url = reverse('post_detail', kwargs={'pk': self.post.pk})
+        self.client.get(reverse('post_list'))
+        self.client.get(url)
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        author.save()
+        self.assertContains(self.client.get(reverse('post_list')), 'By renamed')
+        self.assertContains(self.client.get(url), 'By renamed')
+        self.assertEqual(get_stats()['hits'], 0)
+        # Other saves, such as logging in, leave the posts alone
+        updated_at = Post.objects.get(pk=self.post.pk).updated_at
+        self.client.force_login(author)
+        author.save(update_fields=['last_login'])
+        author.first_name = 'Ren'
+        author.save()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).updated_at, updated_at)
+
+    def test_cached_list_skips_rendering_and_tag_query(self):
+        self.client.get(reverse('post_list'))
+        with mock.patch('blog.fragments.render_to_string') as render, self.assertNumQueries(1):
+            response = self.client.get(reverse('post_list'))
+        render.assert_not_called()
+        self.assertContains(response, 'Cached post')
+        self.assertContains(response, 'cached</a>')
+        self.assertEqual(get_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_changes_render_a_new_fragment(self):
+        self.client.force_login(self.author)
+        self.client.get(reverse('post_list'))
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = 'Renamed post'
+        post.save()
+        self.assertContains(self.client.get(reverse('post_list')), 'Renamed post')
+        self.post.tags.add('fresh')
+        self.assertContains(self.client.get(reverse('post_list')), 'fresh</a>')
+        self.client.post(reverse('comment_create', kwargs={'pk': self.post.pk}), {'content': 'First'})
+        self.assertContains(self.client.get(reverse('post_list')), '1 comment')
+        self.assertEqual(get_stats()['hits'], 0)
+
+    def test_detail_fragment(self):
+        url = reverse('post_detail', kwargs={'pk': self.post.pk})
+        self.client.get(url)
+        with mock.patch('blog.fragments.render_to_string') as render:
+            response = self.client.get(url)
+        render.assert_not_called()
+        self.assertContains(response, '<h2>Cached post</h2>')
+
+    def test_stats_view_is_staff_only(self):
+        self.client.get(reverse('post_list'))
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(reverse('fragment_cache_stats')).status_code, 302)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('fragment_cache_stats')).json()['misses'], 1)
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer', password='pass')
+        cls.reader = User.objects.create_user(username='reader', password='pass')
+        cls.post = Post.objects.create(title='Polled post', content='...', author=cls.author)
+        cls.url = reverse('post_detail', kwargs={'pk': cls.post.pk})
+
+    def test_not_modified_skips_rendering(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with mock.patch.object(PostDetailView, 'get_context_data') as get_context_data, self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        get_context_data.assert_not_called()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_logged_in_not_modified_is_one_query(self):
+        self.client.force_login(self.reader)
+        self.client.get(self.url)  # sets the CSRF cookie the comment form needs
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_etag_depends_on_session(self):
+        anonymous = self.client.get(self.url)['ETag']
+        self.client.force_login(self.reader)
+        self.assertNotEqual(self.client.get(self.url)['ETag'], anonymous)
+
+    def assertChanged(self, change):
+        etag = self.client.get(self.url)['ETag']
+        change()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_page_changes_invalidate(self):
+        self.client.force_login(self.author)
+        self.client.get(self.url)
+        self.assertChanged(lambda: Post.objects.get(pk=self.post.pk).save())
+        self.assertChanged(lambda: self.post.tags.add('polling'))
+
+        self.assertChanged(lambda: self.client.post(reverse('comment_create', kwargs={'pk': self.post.pk}), {'content': 'Hi'}))
+        comment = Comment.objects.get(post=self.post)
+        kwargs = {'post_id': self.post.pk, 'pk': comment.pk}
+        self.assertChanged(lambda: self.client.post(reverse('comment_update', kwargs=kwargs), {'content': 'Edited'}))
+        self.assertChanged(lambda: self.client.post(reverse('comment_delete', kwargs=kwargs)))
+
+    def test_save_with_update_fields_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = 'Renamed post'
+        post.save(update_fields=['title'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed post')
+
+    def test_missing_post_is_404(self):
+        response = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk + 1}), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+class TagCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='tagger', password='pass')
+
+    def counts(self):
+        return dict(TagCount.objects.filter(post_count__gt=0).values_list('tag__name', 'post_count'))
+
+    def assertCounts(self, expected):
+        self.assertEqual(self.counts(), expected)
+        TagCount.objects.rebuild()
+        self.assertEqual(self.counts(), expected)
+
+    def test_counts_follow_tag_changes(self):
+        first = Post.objects.create(title='First', content='...', author=self.author)
+        second = Post.objects.create(title='Second', content='...', author=self.author)
+        first.tags.add('django', 'python')
+        first.tags.add('django')
+        second.tags.add('django')
+        self.assertCounts({'django': 2, 'python': 1})
+        first.tags.remove('python')
+        self.assertCounts({'django': 2})
+        second.tags.set(['caching'])
+        self.assertCounts({'django': 1, 'caching': 1})
+        second.tags.clear()
+        self.assertCounts({'django': 1})
+        first.delete()
+        self.assertCounts({})
+        second.tags.add('caching')
+        Tag.objects.get(name='caching').delete()
+        self.assertCounts({})
+
+    def test_tagged_post_copies_published_date(self):
+        post = Post.objects.create(title='Dated', content='...', author=self.author)
+        post.tags.add('django')
+        self.assertEqual(TaggedPost.objects.get(content_object=post).published_date, post.published_date)
+
+    def test_tag_cloud(self):
+        for i in range(8):
+            post = Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+            post.tags.add('common', *(['rare'] if i == 0 else []))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tag_cloud'))
+        cloud = response.context['tags']
+        self.assertEqual([(count.tag.name, count.post_count, count.weight) for count in cloud], [
+            ('common', 8, 5), ('rare', 1, 1),
+        ])
+        self.assertContains(response, 'class="tag-weight-5"')
+
+    def test_tag_listing_reads_index_in_order(self):
+        posts = [Post.objects.create(title=f'Post {i}', content='...', author=self.author) for i in range(3)]
+        for post in posts:
+            post.tags.add('django')
+        Post.objects.create(title='Untagged', content='...', author=self.author)
+        response = self.client.get(reverse('tag_list', kwargs={'tag_slug': 'django'}))
+        self.assertEqual(list(response.context['posts']), posts[::-1])
+        if connection.vendor != 'sqlite':
+            return
+        queryset = PostByTagListView(kwargs={'tag_slug': 'django'}).get_queryset()[:10]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('blog_taggedpost_listing_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_rebuild_command(self):
+        post = Post.objects.create(title='Post', content='...', author=self.author)
+        post.tags.add('django')
+        TagCount.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_tag_counts', stdout=out)
+        self.assertIn('Rebuilt post counts for 1 tags.', out.getvalue())
+        self.assertEqual(self.counts(), {'django': 1})
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='viewed', password='pass')
+        cls.posts = [Post.objects.create(title=f'Post {i}', content='...', author=cls.author) for i in range(3)]
+
+    def setUp(self):
+        view_buffer.take()
+
+    def view(self, post, times=1):
+        for _ in range(times):
+            self.assertEqual(self.client.get(reverse('post_detail', kwargs={'pk': post.pk})).status_code, 200)
+
+    def view_counts(self):
+        return list(Post.objects.order_by('pk').values_list('view_count', flat=True))
+
+    def test_views_are_buffered_then_flushed_in_one_update(self):
+        self.view(self.posts[0], 3)
+        self.view(self.posts[1])
+        self.assertEqual(self.view_counts(), [0, 0, 0])
+        with self.assertNumQueries(1):
+            self.assertEqual(view_buffer.flush(), 2)
+        self.assertEqual(self.view_counts(), [3, 1, 0])
+        self.view(self.posts[0])
+        view_buffer.flush()
+        self.assertEqual(self.view_counts(), [4, 1, 0])
+
+    def test_revalidation_is_not_a_view(self):
+        url = reverse('post_detail', kwargs={'pk': self.posts[0].pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(view_buffer.counts, {self.posts[0].pk: 1})
+
+    def test_flush_after_request_once_due(self):
+        with override_settings(BLOG_VIEW_COUNTS={'FLUSH_INTERVAL': None, 'MAX_PENDING': 2}):
+            self.view(self.posts[0])
+            self.assertEqual(self.view_counts(), [0, 0, 0])
+            self.view(self.posts[0])
+            self.assertEqual(self.view_counts(), [2, 0, 0])
+        with override_settings(BLOG_VIEW_COUNTS={'FLUSH_INTERVAL': 0, 'MAX_PENDING': None}):
+            self.view(self.posts[1])
+        self.assertEqual(self.view_counts(), [2, 1, 0])
+
+    def test_flush_after_request_closes_the_connection_it_opened(self):
+        due = override_settings(BLOG_VIEW_COUNTS={'FLUSH_INTERVAL': 0, 'MAX_PENDING': None})
+        for open_before, closed_after in ((False, True), (True, False)):
+            with self.subTest(open_before=open_before), due:
+                # Stands in for the request's connection as Django left it at request_finished
+                tracked = mock.Mock(connection=object() if open_before else None)
+                with mock.patch('blog.view_counts.connections', {'default': tracked}):
+                    self.view(self.posts[0])
+                self.assertEqual(tracked.close.called, closed_after)
+        self.assertEqual(self.view_counts(), [2, 0, 0])
+
+    def test_buffer_is_thread_safe(self):
+        def hit():
+            for _ in range(500):
+                view_buffer.add(self.posts[0].pk)
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((view_buffer.counts[self.posts[0].pk], view_buffer.pending), (4000, 4000))
+
+    def test_failed_flush_keeps_views(self):
+        view_buffer.add(self.posts[0].pk, 5)
+        with mock.patch.object(Post.objects, 'add_views', side_effect=DatabaseError):
+            with self.assertLogs('blog.view_counts', 'ERROR'):
+                self.assertEqual(view_buffer.flush(), 0)
+        self.assertEqual(view_buffer.pending, 5)
+        view_buffer.flush()
+        self.assertEqual(self.view_counts(), [5, 0, 0])
+
+    def test_editing_a_post_keeps_its_view_count(self):
+        post = Post.objects.get(pk=self.posts[0].pk)
+        Post.objects.add_views({post.pk: 7})
+        post.title = 'Edited'
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).view_count, 7)
+
+    def test_popular_posts(self):
+        Post.objects.add_views({self.posts[0].pk: 2, self.posts[2].pk: 9})
+        response = self.client.get(reverse('popular_posts'))
+        self.assertEqual(list(response.context['posts']), [self.posts[2], self.posts[0]])
+        self.assertContains(response, 'Popular Posts')
+
+def make_image(size, image_format='PNG', mode='RGB', name='avatar.png'):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+class ProfilePictureTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pictured', password='pass')
+        Profile.objects.create(user=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, BLOG_IMAGES={'WORKERS': 0, 'MAX_UPLOAD_SIZE': 64 * 1024})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_login(self.user)
+
+    def upload(self, picture):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('profile'), {'bio': 'Hi', 'profile_picture': picture})
+
+    def test_upload_renders_thumbnails(self):
+        self.assertEqual(self.upload(make_image((800, 600))).status_code, 302)
+        profile = Profile.objects.get(user=self.user)
+        thumbnails = profile.profile_picture_thumbnails
+        self.assertEqual(set(thumbnails), {'small', 'medium'})
+        storage = profile.profile_picture.storage
+        for label, size in (('small', 64), ('medium', 256)):
+            for extension, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with storage.open(thumbnails[label][extension]) as file, Image.open(file) as image:
+                    self.assertEqual((image.format, image.size), (image_format, (size, size)))
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, f'srcset="{storage.url(thumbnails["medium"]["webp"])}"')
+
+    def test_transparent_fallback_is_png(self):
+        self.upload(make_image((100, 100), mode='RGBA'))
+        thumbnails = Profile.objects.get(user=self.user).profile_picture_thumbnails
+        self.assertEqual(set(thumbnails['small']), {'webp', 'png'})
+
+    def test_replacing_picture_drops_old_thumbnails(self):
+        self.upload(make_image((100, 100)))
+        old = Profile.objects.get(user=self.user)
+        self.upload(make_image((100, 100), name='new.png'))
+        new = Profile.objects.get(user=self.user)
+        self.assertNotEqual(new.profile_picture_thumbnails, old.profile_picture_thumbnails)
+        self.assertFalse(old.profile_picture.storage.exists(old.profile_picture_thumbnails['small']['webp']))
+        self.assertTrue(new.profile_picture.storage.exists(new.profile_picture_thumbnails['small']['webp']))
+
+    def assertRejected(self, picture):
+        response = self.upload(picture)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['profile_picture'])
+        self.assertFalse(Profile.objects.get(user=self.user).profile_picture)
+
+    def test_oversized_dimensions_are_rejected(self):
+        self.assertRejected(make_image((5000, 10)))
+
+    def test_large_file_is_rejected_while_streaming(self):
+        self.assertRejected(SimpleUploadedFile('big.png', b'\0' * (128 * 1024)))
+
+    def test_non_image_is_rejected(self):
+        self.assertRejected(SimpleUploadedFile('fake.png', b'not an image'))
+
+    def test_thumbnails_render_in_worker_threads(self):
+        with override_settings(BLOG_IMAGES={'WORKERS': 1}):
+            future = submit(lambda: threading.current_thread().name)
+        self.assertTrue(future.result(timeout=5).startswith('blog-images'))
+
+class IndexAuditTests(TestCase):
+    def test_views_do_not_scan_tables(self):
+        out = StringIO()
+        call_command('index_audit', stdout=out)
+        self.assertIn('No full table scans.', out.getvalue())
+
+    def test_unindexed_lookup_is_flagged(self):
+        plan, scans = full_scans(Post.objects.filter(title__icontains='django').order_by('pk'))
+        if plan is None:
+            self.skipTest('index audit does not support this database backend')
+        self.assertEqual(scans, ['blog_post'])
+
+class RequestMetricsTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='pass')
+        cls.post = Post.objects.create(title='Post', content='Some content', author=cls.user)
+        cls.post.tags.add('django')
+        for i in range(3):
+            Comment.objects.create(post=cls.post, author=cls.user, content=f'Comment {i}')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_views_stay_within_declared_budgets(self):
+        self.assertWithinQueryBudget(self.client.get(reverse('post_list')))
+        self.assertWithinQueryBudget(self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk})))
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse('post_list'))
+        metrics = response.wsgi_request.request_metrics
+        self.assertEqual(metrics['view'], 'post_list')
+        self.assertEqual(metrics['budget'], PostListView.query_budget)
+        self.assertGreater(metrics['queries'], 0)
+        self.assertEqual(metrics['duplicate_queries'], 0)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=')
+
+    def test_render_shortcut_views_are_timed(self):
+        render = Template.render
+
+        def slow(template, context):
+            time.sleep(0.02)
+            return render(template, context)
+
+        with mock.patch.object(Template, 'render', slow):
+            response = self.client.get(reverse('comment_page', kwargs={'pk': self.post.pk}))
+        self.assertGreaterEqual(response.wsgi_request.request_metrics['render_ms'], 20)
+
+    def test_over_budget_fails(self):
+        response = self.client.get(reverse('post_list'))
+        with self.assertRaises(AssertionError):
+            self.assertWithinQueryBudget(response, budget=1)
+
+    def test_collector_reports_duplicates(self):
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            for comment in Comment.objects.all():
+                comment.author.username  # N+1: one identical user query per comment
+        self.assertEqual(collector.count, 4)
+        self.assertEqual(list(collector.duplicates.values()), [3])
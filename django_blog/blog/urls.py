@@ -9,13 +9,17 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('profile/', views.profile, name='profile'),
     path('posts/', views.PostListView.as_view(), name='post_list'),
+    path('posts/popular/', views.PopularPostListView.as_view(), name='popular_posts'),
     path('post/<int:pk>/', views.PostDetailView.as_view(), name='post_detail'),
     path('post/new/', views.PostCreateView.as_view(), name='post_create'),
     path('post/<int:pk>/update/', views.PostUpdateView.as_view(), name='post_update'),
     path('post/<int:pk>/delete/', views.PostDeleteView.as_view(), name='post_delete'),
     path('post/<int:pk>/comments/new/', views.CommentCreateView.as_view(), name='comment_create'),
+    path('post/<int:pk>/comments/', views.comment_page, name='comment_page'),
     path('post/<int:post_id>/comment/<int:pk>/update/', views.CommentUpdateView.as_view(), name='comment_update'),
     path('post/<int:post_id>/comment/<int:pk>/delete/', views.CommentDeleteView.as_view(), name='comment_delete'),
+    path('tags/', views.tag_cloud, name='tag_cloud'),
     path('tags/<slug:tag_slug>/', views.PostByTagListView.as_view(), name='tag_list'),
     path('search/', views.search, name='search'),
+    path('stats/fragments/', views.fragment_cache_stats, name='fragment_cache_stats'),
 ]
\ No newline at end of file
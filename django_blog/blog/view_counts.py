@@ -0,0 +1,116 @@
+"""
+Write-behind counter behind Post.view_count and the popular posts listing.
+
+PostDetailView calls record_view(post_id) instead of writing to the post
+row. Hits are summed in an in-process buffer under a lock, and the buffer is
+written out as one batched UPDATE (view_count + CASE per post) for every
+post viewed since the last flush. Popular posts therefore cost one
+statement per flush interval instead of a contended row write per hit.
+Processes keep separate buffers; their UPDATEs add up because they add
+deltas rather than setting totals.
+
+A flush happens at the end of a request (request_finished, after the
+response is handed to the server) once FLUSH_INTERVAL seconds have passed
+or MAX_PENDING views are buffered, and once more at interpreter exit.
+Nothing runs on a timer: an idle process flushes on its next request or at
+exit, however long ago FLUSH_INTERVAL ran out. Django has already closed the
+request's database connection by then, so a flush that has to reopen it
+closes it again; persistent connections (CONN_MAX_AGE) are left open.
+Views still in the buffer when a process dies are lost. Raise the two
+settings to write less often; lower them to lose less. FLUSH_INTERVAL = 0
+writes on every request; None turns that trigger off. A failed flush puts
+its counts back in the buffer.
+
+BLOG_VIEW_COUNTS = {'FLUSH_INTERVAL': 10, 'MAX_PENDING': 1000} in settings.py.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections, router
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_INTERVAL': 10,  # seconds
+    'MAX_PENDING': 1000,  # buffered views that force a flush
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_VIEW_COUNTS', {})}
+
+class ViewCountBuffer:
+    """Thread-safe {post id: views since the last flush}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Held for a whole flush, so two threads never write the same batch
+        self.flush_lock = threading.Lock()
+        self.counts = Counter()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, post_id, views=1):
+        with self.lock:
+            self.counts[post_id] += views
+            self.pending += views
+
+    def due(self):
+        config = get_config()
+        interval, max_pending = config['FLUSH_INTERVAL'], config['MAX_PENDING']
+        return bool(self.pending) and (
+            (max_pending is not None and self.pending >= max_pending)
+            or (interval is not None and time.monotonic() - self.last_flush >= interval)
+        )
+
+    def take(self):
+        with self.lock:
+            counts, self.counts, self.pending = self.counts, Counter(), 0
+            self.last_flush = time.monotonic()
+        return counts
+
+    def flush(self):
+        """Write the buffered views to the database; returns the number of posts updated."""
+        from .models import Post
+        with self.flush_lock:
+            counts = self.take()
+            if not counts:
+                return 0
+            try:
+                return Post.objects.add_views(counts)
+            except DatabaseError:
+                logger.exception('Flushing %d post view counts failed; keeping them for the next flush', len(counts))
+                for post_id, views in counts.items():
+                    self.add(post_id, views)
+                return 0
+
+buffer = ViewCountBuffer()
+
+def record_view(post_id):
+    buffer.add(post_id)
+
+def flush_if_due(**kwargs):
+    from .models import Post
+    if not buffer.due():
+        return
+    connection = connections[router.db_for_write(Post)]
+    # Django closed it at request_finished unless it is persistent; don't leave a
+    # connection opened here behind on an idle worker thread.
+    reopened = connection.connection is None
+    try:
+        buffer.flush()
+    finally:
+        if reopened:
+            connection.close()
+
+def flush_at_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception('Flushing post view counts at exit failed')
+
+request_finished.connect(flush_if_due, dispatch_uid=f'{__name__}.flush_if_due')
+atexit.register(flush_at_exit)
@@ -1,13 +1,25 @@
-from django.shortcuts import render, redirect
+import hashlib
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db.models import Q
-from .models import Post, Comment
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from .models import Post, Comment, TagCount
 from .forms import CustomUserCreationForm, ProfileForm, PostForm, CommentForm
+from .search import search_posts
+from .fragments import get_stats, render_post_fragments
+from .images import StreamingImageUploadHandler
+from .view_counts import record_view
 
 def home(request):
     return render(request, 'blog/base.html')
@@ -27,9 +39,20 @@ def register(request):
     return render(request, 'blog/register.html', {'form': form})
 
 @login_required
+@csrf_exempt
 def profile(request):
+    # Upload handlers must be swapped in before anything reads request.POST, and
+    # CsrfViewMiddleware would; the CSRF check runs in _profile instead.
+    upload_handler = StreamingImageUploadHandler(request)
+    request.upload_handlers = [upload_handler]
+    return _profile(request, upload_handler)
+
+@csrf_protect
+def _profile(request, upload_handler):
     if request.method == 'POST':
         form = ProfileForm(request.POST, request.FILES, instance=request.user.profile)
+        for field_name in upload_handler.rejected:
+            form.add_error(field_name, f'Images must be at most {upload_handler.max_size // (1024 * 1024)} MB.')
         if form.is_valid():
             form.save()
             messages.success(request, 'Profile updated successfully.')
@@ -45,16 +68,110 @@ class PostListView(ListView):
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
     ordering = ['-published_date']
+    # Session and user, posts joined with authors, one tag prefetch (skipped when every
+    # post's fragment is cached)
+    query_budget = 4
+    # ?sort= listings, each served by an index on Post
+    sort_orderings = {
+        'discussed': ['-comment_count', '-id'],
+        'active': ['-last_comment_at', '-id'],
+    }
+
+    def get_ordering(self):
+        return self.sort_orderings.get(self.request.GET.get('sort'), self.ordering)
+
+    def get_queryset(self):
+        # Listings show the excerpt, so the full content is never loaded. Tags are
+        # prefetched by render_post_fragments, for uncached posts only.
+        queryset = super().get_queryset().select_related('author').defer('content')
+        if self.request.GET.get('sort') == 'active':
+            queryset = queryset.filter(last_comment_at__isnull=False)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['posts'] = render_post_fragments(list(context['posts']), 'list', 'blog/post_list_item.html')
+        return context
+
+class PopularPostListView(PostListView):
+    """Most viewed posts first, read in order off blog_post_popular_idx."""
+    ordering = ['-view_count', '-id']
+    sort_orderings = {}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(view_count__gt=0)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['popular'] = True
+        return context
+
+def post_etag(request, pk, updated_at):
+    """
+    ETag of a post page. The page also shows the visitor's login state and a CSRF
+    token, so the session and CSRF cookies are part of it; reading cookies costs no query.
+    """
+    parts = (pk, updated_at, request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+             request.COOKIES.get(settings.CSRF_COOKIE_NAME))
+    return '"{}"'.format(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
 
 class PostDetailView(DetailView):
     model = Post
     template_name = 'blog/post_detail.html'
+    # Session and user, the post with its author, its tags, one page of comments,
+    # plus the updated_at check when a stale copy is revalidated
+    query_budget = 6
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('author')
+
+    def get(self, request, *args, **kwargs):
+        # Polling clients revalidate with If-None-Match/If-Modified-Since: check them
+        # against Post.updated_at in one query, before loading or rendering anything.
+        if 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers:
+            updated_at = Post.objects.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+            if updated_at is not None:
+                response = get_conditional_response(
+                    request,
+                    etag=post_etag(request, kwargs['pk'], updated_at),
+                    last_modified=int(updated_at.timestamp()),
+                )
+                if response is not None:
+                    return self.add_validators(response, request, kwargs['pk'], updated_at)
+        response = super().get(request, *args, **kwargs)
+        # Buffered in memory and written in batches (blog.view_counts); revalidations are not views
+        record_view(self.object.pk)
+        return self.add_validators(response, request, self.object.pk, self.object.updated_at)
+
+    def add_validators(self, response, request, pk, updated_at):
+        response['ETag'] = post_etag(request, pk, updated_at)
+        response['Last-Modified'] = http_date(updated_at.timestamp())
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        render_post_fragments([self.object], 'detail', 'blog/post_detail_article.html')
         context['comment_form'] = CommentForm()
+        # Only the first page of comments; the rest load through comment_page.
+        context['comments'], context['next_cursor'] = Comment.objects.thread_page(self.object.pk)
+        context['post_id'] = self.object.pk
         return context
 
+def comment_page(request, pk):
+    """Next page of a post's comments as an HTML fragment, for incremental loading."""
+    try:
+        comments, next_cursor = Comment.objects.thread_page(pk, cursor=request.GET.get('after'))
+    except ValueError:
+        raise Http404('Invalid comment cursor.')
+    # A missing post has no comments; only an empty page costs the extra lookup.
+    if not comments and not Post.objects.filter(pk=pk).exists():
+        raise Http404('No post found matching the query.')
+    return render(request, 'blog/comment_list.html', {
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'post_id': pk,
+    })
+
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
     form_class = PostForm
@@ -89,8 +206,11 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        form.instance.post = Post.objects.get(pk=self.kwargs['pk'])
-        return super().form_valid(form)
+        form.instance.post = get_object_or_404(Post, pk=self.kwargs['pk'])
+        with transaction.atomic():
+            response = super().form_valid(form)
+            Post.objects.record_comment_added(self.object.post_id, self.object.created_at)
+        return response
 
     def get_success_url(self):
         return reverse_lazy('post_detail', kwargs={'pk': self.kwargs['pk']})
@@ -104,6 +224,12 @@ class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         comment = self.get_object()
         return self.request.user == comment.author
 
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            Post.objects.filter(pk=self.object.post_id).touch()
+        return response
+
     def get_success_url(self):
         return reverse_lazy('post_detail', kwargs={'pk': self.object.post.pk})
 
@@ -115,6 +241,12 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         comment = self.get_object()
         return self.request.user == comment.author
 
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            Post.objects.record_comment_removed(self.object.post_id)
+        return response
+
     def get_success_url(self):
         return reverse_lazy('post_detail', kwargs={'pk': self.object.post.pk})
 
@@ -124,19 +256,36 @@ class PostByTagListView(ListView):
     context_object_name = 'posts'
 
     def get_queryset(self):
+        # Filtering and ordering on blog_taggedpost's own columns makes this a range
+        # scan of blog_taggedpost_listing_idx, joined to posts by primary key.
         tag_slug = self.kwargs['tag_slug']
-        return Post.objects.filter(tags__slug=tag_slug).order_by('-published_date')
+        return (
+            Post.objects.filter(tagged_items__tag__slug=tag_slug).select_related('author').defer('content')
+            .order_by('-tagged_items__published_date', '-tagged_items__content_object')
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['posts'] = render_post_fragments(list(context['posts']), 'list', 'blog/post_list_item.html')
         context['tag_name'] = self.kwargs['tag_slug']
         return context
 
+def tag_cloud(request):
+    return render(request, 'blog/tag_cloud.html', {'tags': TagCount.objects.cloud()})
+
+SEARCH_RESULTS_PER_PAGE = 10
+
 def search(request):
     query = request.GET.get('q', '')
-    posts = Post.objects.filter(
-        Q(title__icontains=query) |
-        Q(content__icontains=query) |
-        Q(tags__name__icontains=query)
-    ).distinct().order_by('-published_date')
-    return render(request, 'blog/search_results.html', {'posts': posts, 'query': query})
\ No newline at end of file
+    paginator = Paginator(search_posts(query), SEARCH_RESULTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'blog/search_results.html', {
+        'posts': page_obj.object_list,
+        'page_obj': page_obj,
+        'query': query,
+    })
+
+@staff_member_required
+def fragment_cache_stats(request):
+    """Hit/miss counters of the post fragment cache (blog.fragments), as JSON."""
+    return JsonResponse(get_stats())
@@ -10,6 +10,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so session/auth queries are counted too; see blog/instrumentation.py
+    'blog.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -21,7 +23,7 @@ MIDDLEWARE = [
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'blog.instrumentation.TimedDjangoTemplates',  # DjangoTemplates, timed for Server-Timing
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -55,4 +57,28 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 LOGIN_REDIRECT_URL = 'profile'
-LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'
+
+# Rendered post fragments (see blog/fragments.py). Keys carry Post.updated_at,
+# so edits never serve stale markup; TIMEOUT only bounds memory.
+BLOG_FRAGMENT_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 60 * 24,
+}
+
+# Post view counter (see blog/view_counts.py): views are buffered per process and
+# written in one batched UPDATE once FLUSH_INTERVAL seconds pass or MAX_PENDING
+# views are waiting. Both bound how many views a crashed process can lose.
+BLOG_VIEW_COUNTS = {
+    'FLUSH_INTERVAL': 10,
+    'MAX_PENDING': 1000,
+}
+
+# Profile picture uploads (see blog/images.py): streamed to disk, checked from
+# the image header, thumbnailed to WebP + JPEG/PNG in a thread pool.
+BLOG_IMAGES = {
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,
+    'MAX_DIMENSION': 4096,
+    'SIZES': {'small': 64, 'medium': 256},
+    'WORKERS': 2,
+}